@@ -0,0 +1,136 @@
+"""
+Adaptive refresh intervals for scheduled jobs: push more often while the
+weather is changing, less often when it is stable or it is night locally
+"""
+
+import logging
+from datetime import datetime
+from dataclasses import dataclass
+from typing import Dict, Any, Optional
+
+import pytz
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class WeatherSnapshot:
+    """The signals an interval is chosen from, taken from one WeatherAPI response"""
+    temp_c: Optional[float]
+    condition: str
+    rain_chance: Optional[float]
+    tz_id: str
+
+    @classmethod
+    def from_weather(cls, weather_data: Dict[str, Any]) -> "WeatherSnapshot":
+        current = weather_data.get("current", {})
+        forecast_days = weather_data.get("forecast", {}).get("forecastday", [])
+        today = forecast_days[0].get("day", {}) if forecast_days else {}
+        return cls(
+            temp_c=current.get("temp_c"),
+            condition=current.get("condition", {}).get("text", ""),
+            rain_chance=today.get("daily_chance_of_rain"),
+            tz_id=weather_data.get("location", {}).get("tz_id", "")
+        )
+
+
+class AdaptiveIntervalPolicy:
+    """Picks each job's next interval from how much its weather changed since the last push.
+
+    Changes are scored in steps: `temp_step_c` degrees or `rain_step` points
+    of rain chance per configured interval, or a different condition text,
+    each count as one. A score of one step or more shortens the interval to
+    job.interval / (1 + score). Below `stable_score` the interval grows by
+    `backoff` per push, and at local night (from location.tz_id) it goes
+    straight to the maximum. Changes in between keep the configured interval.
+    The result is clamped to [min_interval, max_interval], widened to take in
+    the job's own interval: a job configured below the minimum or above the
+    maximum keeps its configured cadence as a bound.
+
+    Calls saved are counted against the configured (fixed) interval: each
+    chosen interval stands for chosen / job.interval fixed-cadence pushes.
+    """
+
+    def __init__(self, min_interval: float = 600, max_interval: float = 7200, night_start_hour: int = 23,
+                 night_end_hour: int = 6, temp_step_c: float = 2.0, rain_step: float = 20.0,
+                 stable_score: float = 0.5, backoff: float = 1.5):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.night_start_hour = night_start_hour
+        self.night_end_hour = night_end_hour
+        self.temp_step_c = temp_step_c
+        self.rain_step = rain_step
+        self.stable_score = stable_score
+        self.backoff = backoff
+        self._snapshots: Dict[str, WeatherSnapshot] = {}
+        self.stats = {
+            "decisions": 0,
+            "shortened": 0,
+            "lengthened": 0,
+            "night": 0,
+            "fixed_equivalent_calls": 0.0,
+        }
+
+    def volatility(self, previous: WeatherSnapshot, current: WeatherSnapshot, rate: float = 1.0) -> float:
+        """Change between two snapshots, in steps; `rate` scales the gradual changes to a common period"""
+        score = 0.0
+        if previous.temp_c is not None and current.temp_c is not None:
+            score += abs(current.temp_c - previous.temp_c) / self.temp_step_c * rate
+        if previous.rain_chance is not None and current.rain_chance is not None:
+            score += abs(current.rain_chance - previous.rain_chance) / self.rain_step * rate
+        if previous.condition and current.condition and previous.condition.lower() != current.condition.lower():
+            score += 1.0
+        return score
+
+    def is_night(self, tz_id: str, now: Optional[datetime] = None) -> bool:
+        try:
+            tz = pytz.timezone(tz_id)
+        except pytz.UnknownTimeZoneError:
+            return False
+        hour = (now or datetime.now(pytz.UTC)).astimezone(tz).hour
+        if self.night_start_hour <= self.night_end_hour:
+            return self.night_start_hour <= hour < self.night_end_hour
+        return hour >= self.night_start_hour or hour < self.night_end_hour
+
+    def next_interval(self, job, weather_data: Dict[str, Any], now: Optional[datetime] = None) -> float:
+        """The interval until `job`'s next push, given the data it just pushed"""
+        current = WeatherSnapshot.from_weather(weather_data)
+        previous = self._snapshots.get(job.job_id)
+        self._snapshots[job.job_id] = current
+        # Temperature and rain changes are rates per configured interval, so pushing more often
+        # during a steady change does not make it look stable
+        score = self.volatility(previous, current, job.interval / job.current_interval) if previous else 0.0
+        # The bounds never override the job's own configured interval
+        lowest, highest = min(self.min_interval, job.interval), max(self.max_interval, job.interval)
+
+        if score >= 1.0:
+            interval = job.interval / (1.0 + score)
+            self.stats["shortened"] += 1
+        elif current.tz_id and self.is_night(current.tz_id, now):
+            interval = highest
+            self.stats["night"] += 1
+        elif previous and score < self.stable_score:
+            interval = max(job.current_interval, job.interval) * self.backoff
+            self.stats["lengthened"] += 1
+        else:
+            interval = job.interval
+        interval = min(max(interval, lowest), highest)
+
+        self.stats["decisions"] += 1
+        self.stats["fixed_equivalent_calls"] += interval / job.interval
+        if interval != job.current_interval:
+            logger.info(f"⏱️ Scheduled job {job.job_id}: next push in {interval / 60:.1f} min "
+                        f"(volatility {score:.1f})")
+        return interval
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Decisions made and upstream calls saved against the fixed cadence"""
+        fixed = self.stats["fixed_equivalent_calls"]
+        return {
+            **self.stats,
+            "fixed_equivalent_calls": round(fixed, 1),
+            "adaptive_calls": self.stats["decisions"],
+            "calls_saved": round(fixed - self.stats["decisions"], 1),
+            "min_interval_seconds": self.min_interval,
+            "max_interval_seconds": self.max_interval,
+        }
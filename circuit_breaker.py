@@ -0,0 +1,113 @@
+"""
+Per-upstream circuit breaker: stop calling an upstream that keeps failing and
+probe it again after a cool-down
+"""
+
+import time
+import logging
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised when a call is refused because the upstream's breaker is open"""
+
+    def __init__(self, name: str, retry_in: float):
+        super().__init__(f"Circuit breaker for {name} is open (retry in {retry_in:.0f}s)")
+        self.name = name
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    """Closed / open / half-open circuit breaker.
+
+    Closed: calls flow, consecutive failures are counted.
+    Open: calls are refused until `recovery_timeout` has passed.
+    Half-open: up to `half_open_max_calls` probe calls are let through; a
+    successful probe closes the breaker, a failed one re-opens it.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, recovery_timeout: float = 30.0,
+                 half_open_max_calls: int = 1):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self._opened_at: Optional[float] = None
+        self._probes_in_flight = 0
+        self.stats = {
+            "successes": 0,
+            "failures": 0,
+            "rejected": 0,
+            "times_opened": 0,
+        }
+
+    def _transition(self, state: str) -> None:
+        if state != self.state:
+            logger.warning(f"⚡ Circuit breaker for {self.name}: {self.state} -> {state}")
+            self.state = state
+
+    def allow_request(self) -> bool:
+        """Whether a call may go upstream now; reserves a probe slot when half-open"""
+        if self.state == OPEN:
+            if time.monotonic() - self._opened_at < self.recovery_timeout:
+                self.stats["rejected"] += 1
+                return False
+            self._transition(HALF_OPEN)
+            self._probes_in_flight = 0
+        if self.state == HALF_OPEN:
+            if self._probes_in_flight >= self.half_open_max_calls:
+                self.stats["rejected"] += 1
+                return False
+            self._probes_in_flight += 1
+        return True
+
+    def check(self) -> None:
+        """Raise CircuitOpenError if a call may not go upstream now"""
+        if not self.allow_request():
+            raise CircuitOpenError(self.name, self.retry_in())
+
+    def retry_in(self) -> float:
+        """Seconds until the breaker will next let a probe through"""
+        if self.state != OPEN or self._opened_at is None:
+            return 0.0
+        return max(0.0, self.recovery_timeout - (time.monotonic() - self._opened_at))
+
+    def record_success(self) -> None:
+        self.stats["successes"] += 1
+        self.consecutive_failures = 0
+        if self.state == HALF_OPEN:
+            self._probes_in_flight = max(0, self._probes_in_flight - 1)
+        self._transition(CLOSED)
+
+    def record_failure(self) -> None:
+        self.stats["failures"] += 1
+        self.consecutive_failures += 1
+        if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            self._probes_in_flight = 0
+            self._opened_at = time.monotonic()
+            self.stats["times_opened"] += self.state != OPEN
+            self._transition(OPEN)
+
+    @staticmethod
+    def is_failure_status(status_code: int) -> bool:
+        """Responses that indicate an unhealthy upstream (client errors do not)"""
+        return status_code >= 500 or status_code == 429
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get breaker state and counters"""
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "failure_threshold": self.failure_threshold,
+            "recovery_timeout": self.recovery_timeout,
+            "retry_in": round(self.retry_in(), 1),
+            **self.stats,
+        }
@@ -14,8 +14,25 @@ class Settings:
     
     # Weather API Configuration
     WEATHER_API_KEY: str = os.getenv("WEATHER_API_KEY", "")
-    WEATHER_API_BASE_URL: str = "http://api.weatherapi.com/v1"
+    WEATHER_API_BASE_URL: str = os.getenv("WEATHER_API_BASE_URL", "https://api.weatherapi.com/v1")
     DEFAULT_LOCATION: str = os.getenv("DEFAULT_LOCATION", "London")
+    # Serve current-weather requests from a forecast fetched within this many seconds
+    CURRENT_FROM_FORECAST_MAX_AGE_SECONDS: int = int(os.getenv("CURRENT_FROM_FORECAST_MAX_AGE_SECONDS", "600"))
+    # Cached responses expire when WeatherAPI is next expected to update (last_updated_epoch + interval + grace)
+    WEATHER_UPDATE_INTERVAL_SECONDS: float = float(os.getenv("WEATHER_UPDATE_INTERVAL_SECONDS", "900"))
+    WEATHER_CACHE_GRACE_SECONDS: float = float(os.getenv("WEATHER_CACHE_GRACE_SECONDS", "60"))
+    WEATHER_CACHE_MIN_TTL_SECONDS: float = float(os.getenv("WEATHER_CACHE_MIN_TTL_SECONDS", "60"))
+    # Byte budget for cached responses; new locations only displace ones requested less often
+    WEATHER_CACHE_MAX_BYTES: int = int(os.getenv("WEATHER_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+    # Locations WeatherAPI cannot resolve (error 1006) are answered with a 400 from memory for this long
+    WEATHER_NEGATIVE_CACHE_TTL_SECONDS: float = float(os.getenv("WEATHER_NEGATIVE_CACHE_TTL_SECONDS", "3600"))
+    # Learned aliases from free-form location queries to canonical WeatherAPI locations
+    LOCATION_INDEX_MAX_ALIASES: int = int(os.getenv("LOCATION_INDEX_MAX_ALIASES", "10000"))
+    # "lat,lon" queries are snapped to the centre of a geohash cell of this precision (6 is ~1.2 x 0.6 km, 0 disables)
+    GEO_GRID_PRECISION: int = int(os.getenv("GEO_GRID_PRECISION", "6"))
+    # Bulk requests (q=bulk) are only available on some WeatherAPI plans; unsupported plans fall back automatically
+    WEATHER_BULK_ENABLED: bool = os.getenv("WEATHER_BULK_ENABLED", "true").lower() == "true"
+    WEATHER_BULK_MAX_LOCATIONS: int = int(os.getenv("WEATHER_BULK_MAX_LOCATIONS", "50"))
     
     # Gemini API Configuration
     GEMINI_API_KEY: str = os.getenv("GEMINI_API_KEY", "your_gemini_api_key_here")
@@ -32,12 +49,95 @@ class Settings:
     DEBUG: bool = os.getenv("DEBUG", "False").lower() == "true"
     
     # API Configuration
-    REQUEST_TIMEOUT: int = 30
-    MAX_RETRIES: int = 3
+    REQUEST_TIMEOUT: int = int(os.getenv("REQUEST_TIMEOUT", "30"))
+    MAX_RETRIES: int = int(os.getenv("MAX_RETRIES", "3"))
+    RETRY_BASE_DELAY: float = float(os.getenv("RETRY_BASE_DELAY", "0.5"))
+    RETRY_MAX_DELAY: float = float(os.getenv("RETRY_MAX_DELAY", "10"))
+    # Process-wide retry budget: retries earned per request, plus a steady trickle per second
+    RETRY_BUDGET_RATIO: float = float(os.getenv("RETRY_BUDGET_RATIO", "0.2"))
+    RETRY_BUDGET_MIN_PER_SECOND: float = float(os.getenv("RETRY_BUDGET_MIN_PER_SECOND", "0.1"))
     
+    # Circuit Breaker Configuration (per upstream)
+    BREAKER_FAILURE_THRESHOLD: int = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5"))
+    BREAKER_RECOVERY_SECONDS: float = float(os.getenv("BREAKER_RECOVERY_SECONDS", "30"))
+    BREAKER_HALF_OPEN_PROBES: int = int(os.getenv("BREAKER_HALF_OPEN_PROBES", "1"))
+    
+    # Hedged WeatherAPI Requests Configuration
+    WEATHER_HEDGING_ENABLED: bool = os.getenv("WEATHER_HEDGING_ENABLED", "false").lower() == "true"
+    HEDGE_PERCENTILE: float = float(os.getenv("HEDGE_PERCENTILE", "95"))
+    HEDGE_MIN_SAMPLES: int = int(os.getenv("HEDGE_MIN_SAMPLES", "20"))
+    HEDGE_MAX_RATIO: float = float(os.getenv("HEDGE_MAX_RATIO", "0.05"))  # Max extra calls as a fraction of traffic
+    
+    # Upstream Quota Configuration (0 = no limit)
+    WEATHERAPI_QUOTA_PER_MINUTE: int = int(os.getenv("WEATHERAPI_QUOTA_PER_MINUTE", "0"))
+    WEATHERAPI_QUOTA_PER_DAY: int = int(os.getenv("WEATHERAPI_QUOTA_PER_DAY", "0"))
+    WEATHERAPI_QUOTA_PER_MONTH: int = int(os.getenv("WEATHERAPI_QUOTA_PER_MONTH", "1000000"))
+    GEMINI_QUOTA_PER_MINUTE: int = int(os.getenv("GEMINI_QUOTA_PER_MINUTE", "15"))
+    GEMINI_QUOTA_PER_DAY: int = int(os.getenv("GEMINI_QUOTA_PER_DAY", "1500"))
+    GEMINI_QUOTA_PER_MONTH: int = int(os.getenv("GEMINI_QUOTA_PER_MONTH", "0"))
+    # Share of each window kept for user-facing calls; background work is paced within the rest
+    QUOTA_BACKGROUND_RESERVE: float = float(os.getenv("QUOTA_BACKGROUND_RESERVE", "0.2"))
+    QUOTA_MAX_BACKGROUND_WAIT_SECONDS: float = float(os.getenv("QUOTA_MAX_BACKGROUND_WAIT_SECONDS", "60"))
+
+    # Outbound HTTP Connection Pool Configuration
+    HTTP_MAX_CONNECTIONS: int = int(os.getenv("HTTP_MAX_CONNECTIONS", "20"))
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "10"))
+    HTTP_KEEPALIVE_EXPIRY: float = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+    # Per-host connection caps, e.g. "usetrmnl.com=4,api.weatherapi.com=20"
+    HTTP_HOST_CONNECTION_LIMITS: str = os.getenv("HTTP_HOST_CONNECTION_LIMITS", "")
+    # Multiplex concurrent requests over one HTTP/2 connection per host (needs httpx[http2])
+    HTTP2_ENABLED: bool = os.getenv("HTTP2_ENABLED", "false").lower() == "true"
+
+    # TRMNL View Configuration: GET /weather/trmnl-view is served from memory,
+    # refreshed in the background after the soft TTL and rebuilt inline after the hard TTL
+    TRMNL_VIEW_SOFT_TTL_SECONDS: float = float(os.getenv("TRMNL_VIEW_SOFT_TTL_SECONDS", "300"))
+    TRMNL_VIEW_HARD_TTL_SECONDS: float = float(os.getenv("TRMNL_VIEW_HARD_TTL_SECONDS", "1800"))
+    # Transformed payloads kept per location, view and upstream version (rebuilt when a quote changes)
+    PAYLOAD_CACHE_MAX_ENTRIES: int = int(os.getenv("PAYLOAD_CACHE_MAX_ENTRIES", "500"))
+
+    # Persistent Cache Configuration: weather responses, TRMNL views and quotes survive restarts
+    PERSISTENT_CACHE_ENABLED: bool = os.getenv("PERSISTENT_CACHE_ENABLED", "true").lower() == "true"
+    PERSISTENT_CACHE_PATH: str = os.getenv("PERSISTENT_CACHE_PATH", "data/cache.sqlite3")
+    # "sqlite" (PERSISTENT_CACHE_PATH) or "redis" (CACHE_REDIS_URL); workers using the same store share cached data
+    CACHE_BACKEND: str = os.getenv("CACHE_BACKEND", "sqlite").lower()
+    CACHE_REDIS_URL: str = os.getenv("CACHE_REDIS_URL", "redis://localhost:6379/0")
+    # Longest a cache read may wait for a SQLite lock held by another worker (writes are committed in the background)
+    CACHE_SQLITE_TIMEOUT_SECONDS: float = float(os.getenv("CACHE_SQLITE_TIMEOUT_SECONDS", "0.1"))
+    # Longest a cache read may wait on Redis (reads block the event loop; writes are sent in the background)
+    CACHE_REDIS_TIMEOUT_SECONDS: float = float(os.getenv("CACHE_REDIS_TIMEOUT_SECONDS", "0.1"))
+    # Entries expired longer than this are not reloaded and are compacted away
+    PERSISTENT_CACHE_RETENTION_SECONDS: float = float(os.getenv("PERSISTENT_CACHE_RETENTION_SECONDS", "86400"))
+
     # Scheduled Updates Configuration
     UPDATE_INTERVAL_MINUTES: int = int(os.getenv("UPDATE_INTERVAL_MINUTES", "30"))
     ENABLE_SCHEDULED_UPDATES: bool = os.getenv("ENABLE_SCHEDULED_UPDATES", "true").lower() == "true"
+    # JSON file with one job per plugin instance (location, webhook_url, view, interval_minutes);
+    # when unset, the only job is DEFAULT_LOCATION -> TRMNL_WEBHOOK_URL every UPDATE_INTERVAL_MINUTES
+    SCHEDULE_JOBS_FILE: str = os.getenv("SCHEDULE_JOBS_FILE", "")
+    SCHEDULER_MAX_CONCURRENCY: int = int(os.getenv("SCHEDULER_MAX_CONCURRENCY", "10"))
+    # Run on wall-clock boundaries (multiples of each job's interval) plus an offset, e.g. 60 to
+    # push a minute after WeatherAPI's 15 minute updates
+    SCHEDULE_ALIGN_TO_WALL_CLOCK: bool = os.getenv("SCHEDULE_ALIGN_TO_WALL_CLOCK", "true").lower() == "true"
+    SCHEDULE_OFFSET_SECONDS: float = float(os.getenv("SCHEDULE_OFFSET_SECONDS", "0"))
+    # Spread jobs sharing an interval across it (stable per-job phase), plus up to this much random delay per run
+    SCHEDULE_STAGGER: bool = os.getenv("SCHEDULE_STAGGER", "true").lower() == "true"
+    SCHEDULE_JITTER_SECONDS: float = float(os.getenv("SCHEDULE_JITTER_SECONDS", "10"))
+    # Push every job once at startup instead of waiting for its first aligned/staggered deadline
+    SCHEDULE_RUN_ON_STARTUP: bool = os.getenv("SCHEDULE_RUN_ON_STARTUP", "true").lower() == "true"
+    # Fetch the locations of jobs starting together, and of those due within this many seconds, in one
+    # WeatherAPI bulk request (when WEATHER_BULK_ENABLED); 0 batches only jobs that start together
+    SCHEDULE_PREFETCH_WINDOW_SECONDS: float = float(os.getenv("SCHEDULE_PREFETCH_WINDOW_SECONDS", "60"))
+    # Shorten intervals while the weather changes, lengthen them while it is stable and at local night
+    SCHEDULE_ADAPTIVE_INTERVALS: bool = os.getenv("SCHEDULE_ADAPTIVE_INTERVALS", "true").lower() == "true"
+    SCHEDULE_MIN_INTERVAL_MINUTES: float = float(os.getenv("SCHEDULE_MIN_INTERVAL_MINUTES", "10"))
+    SCHEDULE_MAX_INTERVAL_MINUTES: float = float(os.getenv("SCHEDULE_MAX_INTERVAL_MINUTES", "120"))
+    SCHEDULE_NIGHT_START_HOUR: int = int(os.getenv("SCHEDULE_NIGHT_START_HOUR", "23"))
+    SCHEDULE_NIGHT_END_HOUR: int = int(os.getenv("SCHEDULE_NIGHT_END_HOUR", "6"))
+    # Only the holder of a lease in this SQLite file runs scheduled pushes and quote refreshes; every
+    # worker/replica must see the same file. A dead leader is replaced within the TTL plus a third of it
+    LEADER_ELECTION_ENABLED: bool = os.getenv("LEADER_ELECTION_ENABLED", "true").lower() == "true"
+    LEADER_LEASE_PATH: str = os.getenv("LEADER_LEASE_PATH", "data/leader.sqlite3")
+    LEADER_LEASE_TTL_SECONDS: float = float(os.getenv("LEADER_LEASE_TTL_SECONDS", "15"))
     
     def validate(self) -> bool:
         """Validate required configuration"""
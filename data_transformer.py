@@ -3,18 +3,68 @@ Data transformation service to convert WeatherAPI.com responses
 into simplified format for TRMNL view
 """
 
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Awaitable, Callable, Optional
 from datetime import datetime
 import pytz
 from gemini_service import GeminiQuoteService, WeatherQuote
+from location_index import canonical_id
+from payload_cache import PayloadCache, PayloadKey
 
 class WeatherDataTransformer:
     """Transform WeatherAPI.com data into TRMNL view format"""
     
-    def __init__(self, gemini_service: Optional[GeminiQuoteService] = None):
+    def __init__(self, gemini_service: Optional[GeminiQuoteService] = None,
+                 payloads: Optional[PayloadCache] = None):
         self.gemini_service = gemini_service
+        self.payloads = payloads or PayloadCache()
+        if gemini_service:
+            # A new or refreshed quote changes the payloads of its location
+            gemini_service.add_quote_listener(self.payloads.invalidate_location)
+    
+    @staticmethod
+    def payload_key(view: str, data: Dict[str, Any]) -> Optional[PayloadKey]:
+        """Cache key for the payload built from a response, or None if it has no version"""
+        current = data.get('current', {})
+        version = current.get('last_updated_epoch')
+        location_id = canonical_id(data.get('location', {}))
+        if not isinstance(version, int) or location_id is None:
+            return None
+        return (location_id, view, 'air_quality' in current, version)
+    
+    async def _cached(self, view: str, data: Dict[str, Any],
+                      build: Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+        key = self.payload_key(view, data)
+        if key is None:
+            payload = await build(data)
+        else:
+            payload = self.payloads.get(key)
+            if payload is None:
+                payload = await build(data)
+                # A payload missing its quote (Gemini paced, over quota or down) is rebuilt next time
+                if self.gemini_service is None or 'weather_quote' in payload:
+                    self.payloads.put(key, payload)
+        return self._mark_stale(payload, data)
+    
+    @staticmethod
+    def _mark_stale(payload: Dict[str, Any], data: Dict[str, Any]) -> Dict[str, Any]:
+        """Carry the stale marker of data served while WeatherAPI is unavailable into the payload.
+        
+        Stale data is the last good response, so its payload is the cached
+        one for the same version; only the marker differs, added to a copy.
+        """
+        if not data.get('stale'):
+            return payload
+        return {**payload, 'stale': True, 'stale_age_seconds': data.get('stale_age_seconds')}
     
     async def transform_current_weather(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Transform current weather data for TRMNL view (built once per upstream update)"""
+        return await self._cached('current', data, self._transform_current_weather)
+    
+    async def transform_forecast(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Transform forecast data for TRMNL view (built once per upstream update)"""
+        return await self._cached('forecast', data, self._transform_forecast)
+    
+    async def _transform_current_weather(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """Transform current weather data for TRMNL view"""
         location = data.get('location', {})
         current = data.get('current', {})
@@ -37,7 +87,8 @@ class WeatherDataTransformer:
                     {
                         'condition_text': current.get('condition', {}).get('text', ''),
                         'temp_c': current.get('temp_c', 0),
-                        'wind_kph': current.get('wind_kph', 0)
+                        'wind_kph': current.get('wind_kph', 0),
+                        'location_id': canonical_id(location)
                     }
                 )
                 if quote:
@@ -45,7 +96,8 @@ class WeatherDataTransformer:
                         'quote': quote.quote,
                         'author': quote.author,
                         'work': quote.work,
-                        'weather_condition': quote.weather_condition
+                        'weather_condition': quote.weather_condition,
+                        'stale': quote.stale
                     }
             except Exception as e:
                 print(f"Error getting weather quote: {e}")
@@ -100,7 +152,7 @@ class WeatherDataTransformer:
         
         return result
     
-    async def transform_forecast(self, data: Dict[str, Any]) -> Dict[str, Any]:
+    async def _transform_forecast(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """Transform forecast data for TRMNL view"""
         location = data.get('location', {})
         current = data.get('current', {})
@@ -124,7 +176,8 @@ class WeatherDataTransformer:
                     {
                         'condition_text': current.get('condition', {}).get('text', ''),
                         'temp_c': current.get('temp_c', 0),
-                        'wind_kph': current.get('wind_kph', 0)
+                        'wind_kph': current.get('wind_kph', 0),
+                        'location_id': canonical_id(location)
                     }
                 )
                 if quote:
@@ -132,7 +185,8 @@ class WeatherDataTransformer:
                         'quote': quote.quote,
                         'author': quote.author,
                         'work': quote.work,
-                        'weather_condition': quote.weather_condition
+                        'weather_condition': quote.weather_condition,
+                        'stale': quote.stale
                     }
             except Exception as e:
                 print(f"Error getting weather quote: {e}")
@@ -0,0 +1,93 @@
+"""
+Named WeatherAPI fetch profiles: the query options each consumer actually needs,
+so upstream responses do not carry data that is thrown away
+"""
+
+from dataclasses import dataclass, replace
+from typing import Dict, Any, Optional
+
+from hedging import LatencyTracker
+
+# Hour requested when hourly data is not needed: `hour=` cuts each
+# forecastday's hourly array from 24 entries down to this one
+LEAN_HOUR = 12
+
+
+@dataclass(frozen=True)
+class FetchProfile:
+    """WeatherAPI query options for one kind of consumer"""
+    name: str
+    endpoint: str  # "current" or "forecast"
+    days: int = 1
+    aqi: bool = False
+    alerts: bool = False
+    hourly: bool = True
+
+    @property
+    def is_forecast(self) -> bool:
+        return self.endpoint == "forecast"
+
+    def params(self) -> Dict[str, Any]:
+        """Query parameters for this profile (without key and q)"""
+        params: Dict[str, Any] = {"aqi": "yes" if self.aqi else "no"}
+        if self.is_forecast:
+            params["days"] = min(self.days, 14)  # API limit is 14 days
+            params["alerts"] = "yes" if self.alerts else "no"
+            if not self.hourly:
+                params["hour"] = LEAN_HOUR
+        return params
+
+    def key(self, normalized_location: str) -> tuple:
+        """Request key used for coalescing and last-good data"""
+        days = min(self.days, 14) if self.is_forecast else None
+        hourly = self.hourly and self.is_forecast
+        return (self.endpoint, normalized_location, days, self.aqi, hourly, self.alerts)
+
+
+# Profile per consumer. Endpoints that take request options override days/aqi.
+PROFILES: Dict[str, FetchProfile] = {
+    # Raw API endpoints return everything the caller asked for
+    "current": FetchProfile("current", "current"),
+    "forecast": FetchProfile("forecast", "forecast"),
+    # TRMNL views only read current conditions, air quality and today's day/astro block
+    "trmnl_view": FetchProfile("trmnl_view", "forecast", days=1, aqi=True, hourly=False),
+    "trmnl_view_current": FetchProfile("trmnl_view_current", "current", aqi=True),
+    # Quotes only need condition, temperature and wind
+    "quote": FetchProfile("quote", "current"),
+}
+
+
+def get_profile(name: str, **overrides) -> FetchProfile:
+    """Look up a profile by name, optionally overriding some of its options"""
+    profile = PROFILES[name]
+    return replace(profile, **overrides) if overrides else profile
+
+
+class ProfileStats:
+    """Upstream response size and latency per fetch profile"""
+
+    def __init__(self, window: int = 200):
+        self.window = window
+        self._stats: Dict[str, Dict[str, Any]] = {}
+        self._latencies: Dict[str, LatencyTracker] = {}
+
+    def record(self, profile: str, size: int, seconds: float) -> None:
+        stats = self._stats.setdefault(profile, {"fetches": 0, "bytes": 0, "max_bytes": 0})
+        stats["fetches"] += 1
+        stats["bytes"] += size
+        stats["max_bytes"] = max(stats["max_bytes"], size)
+        self._latencies.setdefault(profile, LatencyTracker(self.window)).record(seconds)
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        def ms(seconds: Optional[float]) -> Optional[float]:
+            return round(seconds * 1000, 1) if seconds is not None else None
+
+        return {
+            name: {
+                **stats,
+                "avg_bytes": stats["bytes"] // stats["fetches"],
+                "latency_p50_ms": ms(self._latencies[name].percentile(50)),
+                "latency_p95_ms": ms(self._latencies[name].percentile(95)),
+            }
+            for name, stats in self._stats.items()
+        }
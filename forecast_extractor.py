@@ -0,0 +1,124 @@
+"""
+Selective extraction of WeatherAPI forecast responses: drops the hourly
+arrays straight from the raw response bytes so they are never parsed
+"""
+
+import re
+import json
+from typing import Dict, Any
+
+# Start of an hourly array inside a forecastday entry
+HOUR_ARRAY = re.compile(rb'"hour"\s*:\s*\[')
+# Bytes that matter while skipping an array: string delimiters, escapes and brackets
+SKIP_TOKENS = re.compile(rb'["\\\[\]]')
+QUOTE, BACKSLASH, OPEN, CLOSE = ord('"'), ord('\\'), ord('['), ord(']')
+
+
+class ForecastExtractor:
+    """Incrementally strip `"hour": [...]` arrays from forecast JSON bytes.
+
+    Feed the response body in chunks of any size with feed(), then call
+    result() to parse what is left. Everything the TRMNL transformer reads
+    (location, current, forecastday day/astro) is kept; each hourly array is
+    replaced by an empty list. Skipped bytes are scanned, not parsed: the
+    common case (no escapes or nested arrays) is handled with C-level
+    bytes.find/count calls, with a precise scanner as the fallback.
+    """
+
+    def __init__(self):
+        self._kept = bytearray()
+        self._search_from = 0
+        self._skipping = False
+        # Scanner state while skipping, carried across chunk boundaries
+        self._in_string = False
+        self._escape = False
+        self._depth = 0
+        self.skipped_bytes = 0
+
+    def feed(self, chunk: bytes) -> None:
+        """Consume the next chunk of the response body"""
+        data = bytes(chunk)
+        while data:
+            if self._skipping:
+                end = self._find_array_end(data)
+                if end < 0:
+                    self.skipped_bytes += len(data)
+                    return
+                self.skipped_bytes += end - 1
+                self._kept += b"]"
+                self._skipping = False
+                self._search_from = len(self._kept)
+                data = data[end:]
+                continue
+
+            self._kept += data
+            data = b""
+            match = HOUR_ARRAY.search(self._kept, self._search_from)
+            if match is None:
+                # Keep a small overlap so a key split across chunks is still found
+                self._search_from = max(self._search_from, len(self._kept) - 16)
+                return
+            data = bytes(self._kept[match.end():])
+            del self._kept[match.end():]
+            self._skipping = True
+            self._in_string = False
+            self._escape = False
+            self._depth = 0
+
+    def _find_array_end(self, data: bytes) -> int:
+        """Return the index just past the `]` closing the skipped array, or -1 if not in data"""
+        pos = 0
+        if self._escape:
+            self._escape = False
+            pos = 1
+        while True:
+            close = data.find(b"]", pos)
+            segment = data[pos:] if close < 0 else data[pos:close]
+            if b"\\" in segment or b"[" in segment or self._depth:
+                return self._scan(data, pos)
+            if segment.count(b'"') % 2:
+                self._in_string = not self._in_string
+            if close < 0:
+                return -1
+            if not self._in_string:
+                return close + 1
+            pos = close + 1  # That `]` was inside a string value
+
+    def _scan(self, data: bytes, pos: int) -> int:
+        """Precise byte scanner for segments with escapes or nested arrays"""
+        skip_until = pos
+        for match in SKIP_TOKENS.finditer(data, pos):
+            i = match.start()
+            if i < skip_until:
+                continue
+            byte = data[i]
+            if self._in_string:
+                if byte == BACKSLASH:
+                    skip_until = i + 2
+                    if i + 1 == len(data):
+                        self._escape = True
+                elif byte == QUOTE:
+                    self._in_string = False
+            elif byte == QUOTE:
+                self._in_string = True
+            elif byte == OPEN:
+                self._depth += 1
+            elif byte == CLOSE:
+                if self._depth == 0:
+                    return i + 1
+                self._depth -= 1
+        return -1
+
+    def result(self) -> Dict[str, Any]:
+        """Parse the kept bytes once the whole body has been fed"""
+        if self._skipping:
+            raise ValueError("Forecast JSON ended inside an hourly array")
+        return json.loads(bytes(self._kept))
+
+
+def extract_forecast_summary(body: bytes, chunk_size: int = 65536) -> Dict[str, Any]:
+    """Parse a forecast response body without its hourly arrays"""
+    extractor = ForecastExtractor()
+    for start in range(0, len(body), chunk_size):
+        extractor.feed(body[start:start + chunk_size])
+    return extractor.result()
@@ -0,0 +1,53 @@
+"""
+Count-min sketch of recent access frequencies, used by the response cache
+to decide whether a new entry is worth evicting existing ones (TinyLFU)
+"""
+
+from typing import Hashable
+
+# Four rows keep the overestimate from hash collisions small at a fixed memory cost
+DEPTH = 4
+MAX_COUNT = 15
+
+
+class FrequencySketch:
+    """Approximate per-key access counts in a fixed amount of memory.
+
+    Counts saturate at 15 and are all halved after `sample_size` increments,
+    so the sketch tracks recent popularity rather than all-time totals.
+    """
+
+    def __init__(self, width: int = 4096, sample_size: int = 40960):
+        # A power of two width turns the modulo into a mask
+        self.width = 1 << max(width - 1, 1).bit_length()
+        self.sample_size = sample_size
+        self._mask = self.width - 1
+        self._rows = [bytearray(self.width) for _ in range(DEPTH)]
+        self._additions = 0
+        self.resets = 0
+
+    def _indexes(self, key: Hashable):
+        h = hash(key)
+        for row in range(DEPTH):
+            # Double hashing: row i probes h1 + i * h2
+            yield row, (h + row * ((h >> 16) | 1)) & self._mask
+
+    def increment(self, key: Hashable) -> None:
+        """Record one access to a key"""
+        for row, index in self._indexes(key):
+            if self._rows[row][index] < MAX_COUNT:
+                self._rows[row][index] += 1
+        self._additions += 1
+        if self._additions >= self.sample_size:
+            self._reset()
+
+    def estimate(self, key: Hashable) -> int:
+        """Estimated recent access count for a key (never an underestimate before aging)"""
+        return min(self._rows[row][index] for row, index in self._indexes(key))
+
+    def _reset(self) -> None:
+        """Halve every counter so old popularity fades"""
+        for row in self._rows:
+            row[:] = bytes(count >> 1 for count in row)
+        self._additions //= 2
+        self.resets += 1
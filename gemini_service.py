@@ -5,10 +5,17 @@ Gemini API service for fetching weather-matching quotes from classic literature
 import httpx
 import json
 import logging
-from typing import Dict, Any, Optional
+import time
+from typing import Dict, Any, Callable, List, Optional
 from datetime import datetime, timedelta
 import asyncio
-from dataclasses import dataclass
+from dataclasses import dataclass, replace, asdict
+from http_clients import HTTPClientPool
+from retry_policy import RetryPolicy
+from circuit_breaker import CircuitBreaker, CircuitOpenError
+from quota import UpstreamQuota, QuotaExceededError
+from persistent_store import PersistentStore
+from location_index import LocationIndex
 
 logger = logging.getLogger(__name__)
 
@@ -21,30 +28,94 @@ class WeatherQuote:
     weather_condition: str
     timestamp: datetime
     location: str
+    stale: bool = False  # Served from cache because Gemini is unavailable
 
 class GeminiQuoteService:
     """Service for fetching weather-matching quotes from Gemini AI"""
     
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, http_pool: Optional[HTTPClientPool] = None,
+                 retry_policy: Optional[RetryPolicy] = None, breaker: Optional[CircuitBreaker] = None,
+                 request_timeout: float = 30.0, quota: Optional[UpstreamQuota] = None,
+                 locations: Optional[LocationIndex] = None):
         self.api_key = api_key
         self.base_url = "https://generativelanguage.googleapis.com/v1beta"
+        self.http_pool = http_pool or HTTPClientPool()
+        self.retry_policy = retry_policy or RetryPolicy("gemini")
+        self.breaker = breaker or CircuitBreaker("gemini")
+        self.request_timeout = request_timeout
+        self.quota = quota or UpstreamQuota("gemini")
+        self.locations = locations or LocationIndex()  # Quote cache keys use canonical location ids
+        self.last_good_quotes: Dict[str, WeatherQuote] = {}  # Per location id, served (marked stale) while the breaker is open
+        self.stale_served = 0
         self.quotes_cache: Dict[str, WeatherQuote] = {}
         self.last_update: Dict[str, datetime] = {}
         self.update_interval = timedelta(hours=2)  # Increased from 30 minutes to 2 hours
         self.fallback_quotes: Dict[str, WeatherQuote] = {}  # Fallback quotes for when API fails
+        self.store: Optional[PersistentStore] = None  # Write-through copy of quotes_cache
+        self.shared_hits = 0  # Fresh quotes another worker generated, read from the store
+        self.quote_listeners: List[Callable[[str], None]] = []  # Called with a location id when its quote changes
         self._initialize_fallback_quotes()  # Initialize fallback quotes
     
+    def attach_store(self, store: PersistentStore) -> int:
+        """Reload cached quotes from a persistent store and write through to it from now on"""
+        self.store = store
+        rows = store.load("quotes")
+        for cache_key, value, stored_at, _ in rows:
+            quote = WeatherQuote(**{**value, "timestamp": datetime.fromisoformat(value["timestamp"])})
+            self.quotes_cache[cache_key] = quote
+            self.last_update[cache_key] = datetime.utcfromtimestamp(stored_at)
+            self.last_good_quotes[cache_key.rsplit('_', 1)[0]] = quote
+        return len(rows)
+    
+    def _persist_quote(self, cache_key: str, quote: WeatherQuote) -> None:
+        if self.store is None:
+            return
+        stored_at = (self.last_update[cache_key] - datetime(1970, 1, 1)).total_seconds()
+        self.store.put(
+            "quotes", cache_key,
+            {**asdict(quote), "timestamp": quote.timestamp.isoformat()},
+            stored_at, stored_at + self.update_interval.total_seconds()
+        )
+    
+    def add_quote_listener(self, listener: Callable[[str], None]) -> None:
+        """Register a callback run with the location id whenever a location's quote changes"""
+        self.quote_listeners.append(listener)
+    
+    def _notify_quote_change(self, cache_key: str) -> None:
+        # Cache keys are "<location id>_<condition>"; conditions never contain underscores
+        location_id = cache_key.rsplit('_', 1)[0]
+        for listener in self.quote_listeners:
+            listener(location_id)
+    
+    def _read_through(self, cache_key: str) -> None:
+        """Pick up a fresh quote another worker stored for this key"""
+        row = self.store.get("quotes", cache_key)
+        if row is None or time.time() >= row[2]:
+            return
+        value, stored_at, _ = row
+        self.quotes_cache[cache_key] = WeatherQuote(**{**value, "timestamp": datetime.fromisoformat(value["timestamp"])})
+        self.last_update[cache_key] = datetime.utcfromtimestamp(stored_at)
+        self.shared_hits += 1
+        self._notify_quote_change(cache_key)
+    
     async def get_weather_quote(self, location: str, weather_data: Dict[str, Any]) -> Optional[WeatherQuote]:
-        """Get a weather-matching quote for the given location and weather data"""
-        cache_key = f"{location}_{weather_data.get('condition_text', 'unknown')}"
+        """Get a weather-matching quote for the given location and weather data.
+        
+        weather_data may carry the canonical 'location_id' of the WeatherAPI
+        response; otherwise the location is resolved through the alias index.
+        """
+        location_id = weather_data.get('location_id') or self.locations.resolve(location)
+        cache_key = f"{location_id}_{weather_data.get('condition_text', 'unknown')}"
         
-        # Check if we have a recent quote in cache
+        # Check if we have a recent quote in cache (ours or, with a shared store, another worker's)
+        if not self._is_quote_fresh(cache_key) and self.store is not None:
+            self._read_through(cache_key)
         if self._is_quote_fresh(cache_key):
             logger.info(f"Returning cached quote for {location}")
             return self.quotes_cache.get(cache_key)
         
         # Check if we have any cached quote for this location (even if stale)
-        location_cache_key = f"{location}_"
+        location_cache_key = f"{location_id}_"
         for key in self.quotes_cache.keys():
             if key.startswith(location_cache_key):
                 logger.info(f"Returning stale cached quote for {location} (API call avoided)")
@@ -56,12 +127,22 @@ class GeminiQuoteService:
             logger.info(f"Returning fallback quote for {location}")
             return self.fallback_quotes[fallback_key]
         
+        # Fail fast while Gemini's circuit breaker is open or its quota is used up
+        try:
+            await self.quota.acquire()
+            self.breaker.check()
+        except (CircuitOpenError, QuotaExceededError) as e:
+            return self._serve_stale(location, location_id, e)
+        
         # Only generate new quote if we have no cached data at all
         try:
             quote = await self._generate_quote(location, weather_data)
             if quote:
                 self.quotes_cache[cache_key] = quote
                 self.last_update[cache_key] = datetime.utcnow()
+                self.last_good_quotes[location_id] = quote
+                self._persist_quote(cache_key, quote)
+                self._notify_quote_change(cache_key)
                 logger.info(f"Generated new quote for {location}: {weather_data.get('condition_text', 'unknown')}")
                 return quote
         except Exception as e:
@@ -73,6 +154,17 @@ class GeminiQuoteService:
         
         return None
     
+    def _serve_stale(self, location: str, location_id: str, error: Exception) -> Optional[WeatherQuote]:
+        """Return this location's last good quote, marked as stale, instead of calling Gemini"""
+        last_good = self.last_good_quotes.get(location_id)
+        if last_good is None:
+            # Never another location's quote: it would name the wrong place and weather
+            logger.warning(f"{error}, no stale quote available for {location}")
+            return None
+        self.stale_served += 1
+        logger.warning(f"{error}, serving stale quote for {location}")
+        return replace(last_good, stale=True)
+    
     def _is_quote_fresh(self, cache_key: str) -> bool:
         """Check if the cached quote is still fresh"""
         if cache_key not in self.quotes_cache or cache_key not in self.last_update:
@@ -91,8 +183,11 @@ class GeminiQuoteService:
         prompt = self._create_weather_prompt(location, condition, temp_c, wind_speed)
         
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
+            # generateContent has no side effects, so it is safe to repeat
+            def send():
+                self.quota.record_call()
+                return self.http_pool.request(
+                    "POST",
                     f"{self.base_url}/models/gemini-1.5-flash:generateContent",
                     headers={
                         "Content-Type": "application/json",
@@ -111,13 +206,23 @@ class GeminiQuoteService:
                             "maxOutputTokens": 300
                         }
                     },
-                    timeout=30.0
+                    timeout=self.request_timeout
                 )
-                response.raise_for_status()
-                
-                result = response.json()
-                return self._parse_gemini_response(result, condition, location, weather_data)
-                
+            
+            try:
+                response = await self.retry_policy.call(send, idempotent=True)
+            except Exception:
+                self.breaker.record_failure()
+                raise
+            if self.breaker.is_failure_status(response.status_code):
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+            response.raise_for_status()
+            
+            result = response.json()
+            return self._parse_gemini_response(result, condition, location, weather_data)
+            
         except httpx.HTTPStatusError as e:
             logger.error(f"Gemini API error: {e.response.status_code} - {e.response.text}")
             return None
@@ -373,11 +478,15 @@ Focus on quotes that evoke the feeling, atmosphere, or mood of this specific wea
                 del self.quotes_cache[key]
             if key in self.last_update:
                 del self.last_update[key]
+            if self.store is not None:
+                self.store.delete("quotes", key)
+            self._notify_quote_change(key)
     
     def get_cache_stats(self) -> Dict[str, Any]:
         """Get statistics about the quote cache"""
         return {
             "total_cached_quotes": len(self.quotes_cache),
+            "shared_hits": self.shared_hits,
             "cache_keys": list(self.quotes_cache.keys()),
             "last_updates": {k: v.isoformat() for k, v in self.last_update.items()}
         }
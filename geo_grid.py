@@ -0,0 +1,123 @@
+"""
+Geo-grid quantization: snap "lat,lon" location queries to the centre of a
+geohash cell so nearby devices share one cached upstream response
+"""
+
+import re
+import math
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+
+GEOHASH_ALPHABET = "0123456789bcdefghjkmnpqrstuvwxyz"
+LAT_LON = re.compile(r'^\s*(-?\d{1,2}(?:\.\d+)?)\s*,\s*(-?\d{1,3}(?:\.\d+)?)\s*$')
+EARTH_RADIUS_KM = 6371.0
+
+
+def parse_lat_lon(location: str) -> Optional[Tuple[float, float]]:
+    """Return (lat, lon) for a "lat,lon" query, or None for anything else"""
+    match = LAT_LON.match(location)
+    if not match:
+        return None
+    lat, lon = float(match.group(1)), float(match.group(2))
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        return None
+    return lat, lon
+
+
+def geohash_encode(lat: float, lon: float, precision: int) -> str:
+    """Standard base-32 geohash of a coordinate"""
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, value, even = [], 0, 0, True
+    while len(chars) < precision:
+        rng, coordinate = (lon_range, lon) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        value <<= 1
+        if coordinate >= mid:
+            value |= 1
+            rng[0] = mid
+        else:
+            rng[1] = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(GEOHASH_ALPHABET[value])
+            bits, value = 0, 0
+    return "".join(chars)
+
+
+def geohash_center(geohash: str) -> Tuple[float, float]:
+    """Centre (lat, lon) of a geohash cell"""
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    even = True
+    for char in geohash:
+        value = GEOHASH_ALPHABET.index(char)
+        for shift in range(4, -1, -1):
+            rng = lon_range if even else lat_range
+            mid = (rng[0] + rng[1]) / 2
+            if value >> shift & 1:
+                rng[0] = mid
+            else:
+                rng[1] = mid
+            even = not even
+    return (lat_range[0] + lat_range[1]) / 2, (lon_range[0] + lon_range[1]) / 2
+
+
+def haversine_km(a: Tuple[float, float], b: Tuple[float, float]) -> float:
+    """Great-circle distance between two (lat, lon) points"""
+    lat1, lon1, lat2, lon2 = map(math.radians, (*a, *b))
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(h))
+
+
+class GeoGrid:
+    """Quantize coordinate queries to geohash cells of a given precision.
+
+    Precision 5 is a ~4.9 x 4.9 km cell, 6 is ~1.2 x 0.6 km, 7 is ~150 x 150 m;
+    0 disables quantization. Named locations pass through unchanged.
+    """
+
+    def __init__(self, precision: int = 6, max_tracked_cells: int = 10000):
+        self.precision = precision
+        self.max_tracked_cells = max_tracked_cells
+        self._cells: "OrderedDict[str, int]" = OrderedDict()
+        self.stats = {
+            "coordinate_queries": 0,
+            "shared_cell_queries": 0,
+        }
+        self._error_total_km = 0.0
+        self._error_max_km = 0.0
+
+    def quantize(self, location: str) -> str:
+        """Return the query to send upstream: the cell centre for coordinates, else the location"""
+        if self.precision <= 0:
+            return location
+        point = parse_lat_lon(location)
+        if point is None:
+            return location
+
+        cell = geohash_encode(*point, self.precision)
+        center = geohash_center(cell)
+        error = haversine_km(point, center)
+        self.stats["coordinate_queries"] += 1
+        self._error_total_km += error
+        self._error_max_km = max(self._error_max_km, error)
+        if cell in self._cells:
+            self.stats["shared_cell_queries"] += 1
+            self._cells.move_to_end(cell)
+        self._cells[cell] = self._cells.get(cell, 0) + 1
+        while len(self._cells) > self.max_tracked_cells:
+            self._cells.popitem(last=False)
+        # Six decimals (~0.1 m) is finer than any practical cell, so the query is stable per cell
+        return f"{center[0]:.6f},{center[1]:.6f}"
+
+    def get_stats(self) -> Dict[str, Any]:
+        """How often coordinate queries shared a cell, and the distance error introduced"""
+        queries = self.stats["coordinate_queries"]
+        return {
+            "precision": self.precision,
+            **self.stats,
+            "cells": len(self._cells),
+            "shared_cell_ratio": round(self.stats["shared_cell_queries"] / queries, 3) if queries else 0.0,
+            "avg_error_km": round(self._error_total_km / queries, 3) if queries else 0.0,
+            "max_error_km": round(self._error_max_km, 3),
+        }
@@ -0,0 +1,122 @@
+"""
+Hedged requests: when an idempotent upstream call runs past the observed tail
+latency, fire a second identical call and take whichever answers first
+"""
+
+import time
+import asyncio
+import logging
+from collections import deque
+from typing import Dict, Any, Optional, Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+
+class LatencyTracker:
+    """Rolling window of recent latencies with percentile lookups"""
+
+    def __init__(self, window: int = 200):
+        self.samples = deque(maxlen=window)
+
+    def record(self, seconds: float) -> None:
+        self.samples.append(seconds)
+
+    def percentile(self, percentile: float) -> Optional[float]:
+        """Nearest-rank percentile of the window, or None if it is empty"""
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        index = max(0, min(len(ordered) - 1, int(round(percentile / 100 * len(ordered))) - 1))
+        return ordered[index]
+
+
+class HedgePolicy:
+    """Fire a backup request once the primary passes a latency percentile.
+
+    The hedge rate is capped with a token bucket: every call earns
+    `max_hedge_ratio` tokens and every hedge spends one, so hedging can never
+    add more than that fraction of extra upstream calls (and quota usage).
+    """
+
+    def __init__(self, percentile: float = 95, window: int = 200, min_samples: int = 20,
+                 max_hedge_ratio: float = 0.05, min_delay: float = 0.05, max_tokens: float = 5.0):
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.max_hedge_ratio = max_hedge_ratio
+        self.min_delay = min_delay
+        self.max_tokens = max_tokens
+        self.tokens = 0.0
+        self.latencies = LatencyTracker(window)
+        self.stats = {
+            "calls": 0,
+            "hedged": 0,
+            "hedge_wins": 0,
+            "rate_limited": 0,
+        }
+
+    def hedge_delay(self) -> Optional[float]:
+        """How long to wait for the primary before hedging, or None if not enough data yet"""
+        if len(self.latencies.samples) < self.min_samples:
+            return None
+        return max(self.min_delay, self.latencies.percentile(self.percentile))
+
+    def _try_take_token(self) -> bool:
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return True
+        self.stats["rate_limited"] += 1
+        return False
+
+    async def _timed(self, fn: Callable[[], Awaitable[Any]]) -> Any:
+        start = time.monotonic()
+        result = await fn()
+        self.latencies.record(time.monotonic() - start)
+        return result
+
+    async def run(self, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Run fn(), hedging with a second fn() call if it is slower than the tail threshold"""
+        self.stats["calls"] += 1
+        self.tokens = min(self.max_tokens, self.tokens + self.max_hedge_ratio)
+        delay = self.hedge_delay()
+        if delay is None:
+            return await self._timed(fn)
+
+        primary = asyncio.ensure_future(self._timed(fn))
+        tasks = [primary]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if done or not self._try_take_token():
+                return await primary
+
+            logger.info(f"🏇 Primary request exceeded p{self.percentile:g} ({delay * 1000:.0f}ms), sending hedge")
+            self.stats["hedged"] += 1
+            hedge = asyncio.ensure_future(self._timed(fn))
+            tasks.append(hedge)
+
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            self.stats["hedge_wins"] += 1
+                        return task.result()
+            # Both attempts failed; surface the primary's error
+            return primary.result()
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hedging statistics and the current latency thresholds"""
+        def ms(value: Optional[float]) -> Optional[float]:
+            return round(value * 1000, 1) if value is not None else None
+        return {
+            **self.stats,
+            "samples": len(self.latencies.samples),
+            "p50_ms": ms(self.latencies.percentile(50)),
+            "p99_ms": ms(self.latencies.percentile(99)),
+            "hedge_after_ms": ms(self.hedge_delay()),
+            "max_hedge_ratio": self.max_hedge_ratio,
+        }
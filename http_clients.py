@@ -0,0 +1,169 @@
+"""
+Shared HTTP client pool for outbound calls to WeatherAPI, Gemini and TRMNL
+"""
+
+import httpx
+import logging
+import importlib.util
+from typing import Dict, Any, Optional, Iterable
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+
+def parse_host_limits(value: str) -> Dict[str, int]:
+    """Parse a "host=limit,host=limit" string into a per-host connection cap map"""
+    limits: Dict[str, int] = {}
+    for item in (value or "").split(","):
+        item = item.strip()
+        if not item or "=" not in item:
+            continue
+        host, limit = item.split("=", 1)
+        try:
+            limits[host.strip().lower()] = int(limit)
+        except ValueError:
+            logger.warning(f"Ignoring invalid connection limit for {host.strip()}: {limit}")
+    return limits
+
+
+def http2_available() -> bool:
+    """Check whether the optional 'h2' package needed for HTTP/2 is installed"""
+    return importlib.util.find_spec("h2") is not None
+
+
+class HTTPClientPool:
+    """One pooled httpx.AsyncClient per upstream host, shared by all services"""
+
+    def __init__(
+        self,
+        max_connections: int = 20,
+        max_keepalive_connections: int = 10,
+        keepalive_expiry: float = 30.0,
+        host_limits: Optional[Dict[str, int]] = None,
+        http2: bool = False,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        client_options: Optional[Dict[str, Any]] = None,
+    ):
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.keepalive_expiry = keepalive_expiry
+        self.host_limits = {k.lower(): v for k, v in (host_limits or {}).items()}
+        self.http2 = http2
+        if http2 and not http2_available():
+            logger.warning("HTTP/2 requested but the 'h2' package is not installed, using HTTP/1.1")
+            self.http2 = False
+        self.transport = transport  # Only used by tests and benchmarks to stub upstreams
+        self.client_options = client_options or {}
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self._stats: Dict[str, Dict[str, Any]] = {}
+
+    @staticmethod
+    def _origin(url: str) -> str:
+        """Return the scheme://host:port origin a URL belongs to"""
+        parts = urlsplit(url)
+        scheme = parts.scheme or "http"
+        port = parts.port or (443 if scheme == "https" else 80)
+        return f"{scheme}://{(parts.hostname or '').lower()}:{port}"
+
+    def _limits_for(self, host: str) -> httpx.Limits:
+        """Build connection limits for a host, applying any per-host cap"""
+        max_connections = self.host_limits.get(host, self.max_connections)
+        return httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=min(self.max_keepalive_connections, max_connections),
+            keepalive_expiry=self.keepalive_expiry,
+        )
+
+    def _build_client(self, origin: str) -> httpx.AsyncClient:
+        host = urlsplit(origin).hostname or ""
+        # With http2=True httpx negotiates HTTP/2 via ALPN on https:// origins and
+        # falls back to HTTP/1.1 when the server (or a plain http:// origin) lacks it
+        kwargs: Dict[str, Any] = {"limits": self._limits_for(host), "http2": self.http2}
+        kwargs.update(self.client_options)
+        if self.transport is not None:
+            kwargs["transport"] = self.transport
+        return httpx.AsyncClient(**kwargs)
+
+    def start(self, urls: Iterable[str]) -> None:
+        """Create clients up front for the upstreams we know we will call"""
+        for url in urls:
+            if url:
+                self.get_client(url)
+        logger.info(f"🔌 HTTP client pool ready for {len(self._clients)} upstream host(s)")
+
+    def get_client(self, url: str) -> httpx.AsyncClient:
+        """Get (or lazily create) the pooled client for the host of a URL"""
+        origin = self._origin(url)
+        client = self._clients.get(origin)
+        if client is None or client.is_closed:
+            client = self._build_client(origin)
+            self._clients[origin] = client
+            self._stats.setdefault(origin, {
+                "requests": 0,
+                "errors": 0,
+                "in_flight": 0,
+                "peak_in_flight": 0,
+                "http_versions": {},
+            })
+        return client
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """Send a request through the pooled client for the URL's host"""
+        client = self.get_client(url)
+        stats = self._stats[self._origin(url)]
+        stats["requests"] += 1
+        stats["in_flight"] += 1
+        stats["peak_in_flight"] = max(stats["peak_in_flight"], stats["in_flight"])
+        try:
+            response = await client.request(method, url, **kwargs)
+            versions = stats["http_versions"]
+            versions[response.http_version] = versions.get(response.http_version, 0) + 1
+            return response
+        except Exception:
+            stats["errors"] += 1
+            raise
+        finally:
+            stats["in_flight"] -= 1
+
+    async def close(self) -> None:
+        """Close every pooled client"""
+        for origin, client in list(self._clients.items()):
+            try:
+                await client.aclose()
+            except Exception as e:
+                logger.error(f"Error closing HTTP client for {origin}: {str(e)}")
+        self._clients.clear()
+        logger.info("🔌 HTTP client pool closed")
+
+    @staticmethod
+    def _connection_counts(client: httpx.AsyncClient) -> Dict[str, int]:
+        """Read open/idle connection counts from httpx's transport, if available"""
+        pool = getattr(getattr(client, "_transport", None), "_pool", None)
+        connections = getattr(pool, "connections", None)
+        if connections is None:
+            return {}
+        return {
+            "open_connections": len(connections),
+            "idle_connections": sum(1 for conn in connections if conn.is_idle()),
+        }
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get per-host pool usage statistics"""
+        hosts: Dict[str, Any] = {}
+        for origin, stats in self._stats.items():
+            host = urlsplit(origin).hostname or ""
+            entry: Dict[str, Any] = dict(stats)
+            entry["http_versions"] = dict(stats["http_versions"])
+            entry["max_connections"] = self.host_limits.get(host, self.max_connections)
+            client = self._clients.get(origin)
+            entry["active"] = client is not None and not client.is_closed
+            if entry["active"]:
+                entry.update(self._connection_counts(client))
+            hosts[origin] = entry
+        return {
+            "max_connections": self.max_connections,
+            "max_keepalive_connections": self.max_keepalive_connections,
+            "keepalive_expiry": self.keepalive_expiry,
+            "http2": self.http2,
+            "hosts": hosts,
+        }
@@ -0,0 +1,153 @@
+"""
+Lease-based leader election over a shared SQLite file, so that with several
+workers or replicas only one runs the scheduled pushes and quote refreshes
+"""
+
+import os
+import time
+import socket
+import asyncio
+import sqlite3
+import logging
+from typing import Dict, Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class LeaseElection:
+    """Holds a named lease row while this process is the leader.
+
+    Every candidate calls poll() each `renew_interval` seconds. The leader
+    extends its lease to now + `ttl`; the others take the lease over only once
+    it has expired, so a leader that dies is replaced within ttl +
+    renew_interval, and one that shuts down cleanly (release) within
+    renew_interval. A leader that cannot renew, or finds another holder,
+    steps down at once. Each change of holder increments the lease's term.
+
+    Expiry times are wall-clock, since they are compared across processes
+    (and hosts, when the file is on a shared volume).
+    """
+
+    def __init__(self, path: str, lease_name: str = "scheduler", node_id: Optional[str] = None,
+                 ttl: float = 15.0, renew_interval: Optional[float] = None,
+                 clock: Callable[[], float] = time.time):
+        self.path = path
+        self.lease_name = lease_name
+        self.node_id = node_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.ttl = ttl
+        self.renew_interval = renew_interval if renew_interval is not None else ttl / 3
+        self.clock = clock
+        self.is_leader = False
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path, isolation_level=None, timeout=1.0, check_same_thread=False)
+        try:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS leases ("
+                " name TEXT PRIMARY KEY, holder TEXT NOT NULL, term INTEGER NOT NULL,"
+                " acquired_at REAL NOT NULL, expires_at REAL NOT NULL)"
+            )
+        except sqlite3.Error:
+            self._db.close()
+            raise
+        self.stats = {
+            "elected": 0,
+            "deposed": 0,
+            "renewals": 0,
+            "errors": 0,
+        }
+
+    def try_acquire(self) -> bool:
+        """Take or renew the lease if it is free, expired or ours; True if we hold it afterwards"""
+        now = self.clock()
+        # IMMEDIATE takes the write lock up front, so two candidates cannot both see the lease as free
+        self._db.execute("BEGIN IMMEDIATE")
+        try:
+            row = self._db.execute(
+                "SELECT holder, term, acquired_at, expires_at FROM leases WHERE name = ?", (self.lease_name,)
+            ).fetchone()
+            if row is not None and row[0] != self.node_id and row[3] > now:
+                self._db.execute("COMMIT")
+                return False
+            if row is not None and row[0] == self.node_id:
+                term, acquired_at = row[1], row[2]
+                self.stats["renewals"] += 1
+            else:
+                term, acquired_at = (row[1] + 1 if row else 1), now
+            self._db.execute(
+                "INSERT OR REPLACE INTO leases (name, holder, term, acquired_at, expires_at) VALUES (?, ?, ?, ?, ?)",
+                (self.lease_name, self.node_id, term, acquired_at, now + self.ttl)
+            )
+            self._db.execute("COMMIT")
+            return True
+        except BaseException:
+            self._db.execute("ROLLBACK")
+            raise
+
+    def release(self) -> None:
+        """Give the lease up (on shutdown) so another candidate takes over at its next poll"""
+        try:
+            self._db.execute("DELETE FROM leases WHERE name = ? AND holder = ?", (self.lease_name, self.node_id))
+        except sqlite3.Error as e:
+            logger.error(f"❌ Failed to release the {self.lease_name} lease: {str(e)}")
+        self.is_leader = False
+
+    def current_leader(self) -> Optional[Dict[str, Any]]:
+        """The live lease, whoever holds it (None if it is free or expired)"""
+        row = self._db.execute(
+            "SELECT holder, term, acquired_at, expires_at FROM leases WHERE name = ?", (self.lease_name,)
+        ).fetchone()
+        now = self.clock()
+        if row is None or row[3] <= now:
+            return None
+        return {
+            "node_id": row[0],
+            "term": row[1],
+            "leader_for_seconds": round(now - row[2], 1),
+            "expires_in_seconds": round(row[3] - now, 1),
+        }
+
+    def poll(self, on_elected: Callable[[], None], on_deposed: Callable[[], None]) -> bool:
+        """Acquire or renew once, calling on_elected/on_deposed when leadership changes"""
+        was_leader = self.is_leader
+        try:
+            self.is_leader = self.try_acquire()
+        except sqlite3.Error as e:
+            # Could not confirm the lease: step down rather than risk two leaders
+            self.stats["errors"] += 1
+            logger.error(f"❌ Leader lease check failed: {str(e)}")
+            self.is_leader = False
+        if self.is_leader and not was_leader:
+            self.stats["elected"] += 1
+            logger.info(f"👑 {self.node_id} is now the {self.lease_name} leader")
+            on_elected()
+        elif was_leader and not self.is_leader:
+            self.stats["deposed"] += 1
+            logger.warning(f"🔻 {self.node_id} is no longer the {self.lease_name} leader")
+            on_deposed()
+        return self.is_leader
+
+    async def run(self, on_elected: Callable[[], None], on_deposed: Callable[[], None]) -> None:
+        """Poll every renew_interval for as long as the process runs"""
+        while True:
+            self.poll(on_elected, on_deposed)
+            await asyncio.sleep(self.renew_interval)
+
+    def close(self) -> None:
+        self._db.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        try:
+            leader = self.current_leader()
+        except sqlite3.Error:
+            leader = None
+        return {
+            **self.stats,
+            "node_id": self.node_id,
+            "is_leader": self.is_leader,
+            "leader": leader,
+            "ttl_seconds": self.ttl,
+            "renew_interval_seconds": self.renew_interval,
+        }
@@ -0,0 +1,123 @@
+"""
+Location canonicalization: map free-form location queries ("London",
+"london ", "London, UK", "51.51,-0.13") to one canonical WeatherAPI location
+so every cache shares entries between them
+"""
+
+import time
+import logging
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+
+from persistent_store import PersistentStore
+
+logger = logging.getLogger(__name__)
+
+# Aliases are facts about WeatherAPI's geocoder, so they are kept for a long time
+ALIAS_TTL_SECONDS = 365 * 86400
+
+
+def normalize_location(location: str) -> str:
+    """Collapse whitespace and case"""
+    return " ".join(location.split()).lower()
+
+
+def canonical_id(location_block: Dict[str, Any]) -> Optional[str]:
+    """Canonical id for the `location` block of a WeatherAPI response.
+
+    search.json results carry a numeric id; current/forecast responses do
+    not, so the resolved name, region and country identify the place.
+    """
+    if location_block.get("id") is not None:
+        return f"id:{location_block['id']}"
+    name = location_block.get("name")
+    if not name:
+        return None
+    parts = [name, location_block.get("region", ""), location_block.get("country", "")]
+    return normalize_location("|".join(parts))
+
+
+class LocationIndex:
+    """Alias index from normalized location queries to canonical ids.
+
+    Unknown queries resolve to their normalized form. Once WeatherAPI has
+    answered a query, learn() maps it (and the place's full
+    "name, region, country") to the canonical id, so later lookups for any
+    of those spellings skip resolution and share cache entries.
+    """
+
+    def __init__(self, max_aliases: int = 10000):
+        self.max_aliases = max_aliases
+        self._aliases: "OrderedDict[str, str]" = OrderedDict()
+        self.store: Optional[PersistentStore] = None
+        self.stats = {
+            "resolved": 0,
+            "unresolved": 0,
+            "learned": 0,
+            "shared_hits": 0,
+        }
+
+    def attach_store(self, store: PersistentStore) -> int:
+        """Reload the alias index from a persistent store and write through to it from now on"""
+        self.store = store
+        rows = store.load("locations")
+        for alias, canonical, _, _ in rows:
+            self._aliases[alias] = canonical
+        return len(rows)
+
+    def resolve(self, location: str) -> str:
+        """Canonical id for a location query (its normalized form if not learned yet)"""
+        normalized = normalize_location(location)
+        canonical = self._aliases.get(normalized)
+        if canonical is None and self.store is not None:
+            canonical = self._read_through(normalized)
+        if canonical is None:
+            self.stats["unresolved"] += 1
+            return normalized
+        self._aliases.move_to_end(normalized)
+        self.stats["resolved"] += 1
+        return canonical
+
+    def _read_through(self, alias: str) -> Optional[str]:
+        """An alias another worker learned, from the shared store"""
+        row = self.store.get("locations", alias)
+        if row is None:
+            return None
+        self._aliases[alias] = row[0]
+        self.stats["shared_hits"] += 1
+        return row[0]
+
+    def learn(self, location: str, data: Dict[str, Any]) -> str:
+        """Record which canonical location a query resolved to; returns the canonical id"""
+        block = data.get("location") or {}
+        canonical = canonical_id(block)
+        if canonical is None:
+            return normalize_location(location)
+        aliases = [normalize_location(location)]
+        full_name = ", ".join(part for part in (block.get("name"), block.get("region"), block.get("country")) if part)
+        aliases.append(normalize_location(full_name))
+        for alias in aliases:
+            self._add(alias, canonical)
+        return canonical
+
+    def _add(self, alias: str, canonical: str) -> None:
+        if self._aliases.get(alias) == canonical:
+            self._aliases.move_to_end(alias)
+            return
+        self._aliases[alias] = canonical
+        self.stats["learned"] += 1
+        if self.store is not None:
+            now = time.time()
+            self.store.put("locations", alias, canonical, now, now + ALIAS_TTL_SECONDS)
+        # Local only: the stored alias stays for other workers and expires on its own
+        while len(self._aliases) > self.max_aliases:
+            self._aliases.popitem(last=False)
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.stats["resolved"] + self.stats["unresolved"]
+        return {
+            **self.stats,
+            "aliases": len(self._aliases),
+            "canonical_locations": len(set(self._aliases.values())),
+            "resolved_ratio": round(self.stats["resolved"] / lookups, 3) if lookups else 0.0,
+        }
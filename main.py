@@ -2,15 +2,35 @@ from fastapi import FastAPI, HTTPException, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 import httpx
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 import logging
 from datetime import datetime
 import asyncio
+import time
 import pytz
 import os
+import sqlite3
 from config import settings
 from data_transformer import WeatherDataTransformer
 from gemini_service import GeminiQuoteService
+from http_clients import HTTPClientPool, parse_host_limits
+from singleflight import SingleFlight
+from retry_policy import RetryPolicy, RetryBudget
+from circuit_breaker import CircuitBreaker, CircuitOpenError
+from hedging import HedgePolicy
+from quota import UpstreamQuota, QuotaExceededError, background
+from forecast_extractor import extract_forecast_summary
+from fetch_profiles import FetchProfile, ProfileStats, get_profile
+from weather_cache import WeatherCache, NegativeCache
+from swr_cache import StaleWhileRevalidateCache
+from payload_cache import PayloadCache
+from persistent_store import PersistentStore
+from redis_store import RedisStore
+from location_index import LocationIndex, canonical_id
+from geo_grid import GeoGrid
+from scheduler import JobScheduler, ScheduledJob, load_jobs
+from adaptive_interval import AdaptiveIntervalPolicy
+from leader_election import LeaseElection
 
 # Custom formatter for local timezone
 class LocalTimeFormatter(logging.Formatter):
@@ -80,60 +100,403 @@ class TRMNLResponse(BaseModel):
     success: bool
     data: Optional[Dict[str, Any]] = None
     error: Optional[str] = None
+    data_age_seconds: Optional[int] = None  # Set when data is served from memory
+
+# WeatherAPI error code returned when the plan does not include a feature (e.g. bulk requests)
+WEATHER_API_PLAN_ERROR_CODE = 2009
+# WeatherAPI error code (and message) when no location matches the query
+WEATHER_API_UNKNOWN_LOCATION_CODE = 1006
+UNKNOWN_LOCATION_MESSAGE = "No matching location found."
+# WeatherAPI's code for an internal error, also used for failures with no upstream error body
+WEATHER_API_INTERNAL_ERROR_CODE = 9999
+
+class BulkUnsupportedError(Exception):
+    """Raised when the WeatherAPI plan does not allow bulk requests"""
+
+class WeatherAPIError(HTTPException):
+    """An error response from WeatherAPI, keeping its own error code and message"""
+    def __init__(self, status_code: int, error_code: int, message: str, detail: Optional[str] = None):
+        super().__init__(status_code=status_code, detail=detail or message)
+        self.error_code = error_code
+        self.message = message
+
+class UnknownLocationError(WeatherAPIError):
+    """Raised (as a 400) when WeatherAPI cannot resolve a location"""
+    def __init__(self, message: str):
+        super().__init__(400, WEATHER_API_UNKNOWN_LOCATION_CODE, message)
 
 # Weather API service
 class WeatherAPIService:
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, http_pool: Optional[HTTPClientPool] = None,
+                 retry_policy: Optional[RetryPolicy] = None, breaker: Optional[CircuitBreaker] = None,
+                 hedge_policy: Optional[HedgePolicy] = None, quota: Optional[UpstreamQuota] = None,
+                 locations: Optional[LocationIndex] = None, geo_grid: Optional[GeoGrid] = None):
         self.api_key = api_key
         self.base_url = settings.WEATHER_API_BASE_URL
+        self.http_pool = http_pool or HTTPClientPool()
+        self.retry_policy = retry_policy or RetryPolicy("weatherapi", max_retries=settings.MAX_RETRIES)
+        self.breaker = breaker or CircuitBreaker("weatherapi")
+        self.hedge_policy = hedge_policy  # Hedging is opt-in
+        self.quota = quota or UpstreamQuota("weatherapi")
+        self.locations = locations or LocationIndex()  # Request keys use canonical location ids
+        self.geo_grid = geo_grid or GeoGrid(settings.GEO_GRID_PRECISION)  # Nearby coordinates share a query
+        self.single_flight = SingleFlight()
+        # Responses per request key; expired entries are still served (marked stale) while the breaker is open
+        self.cache = WeatherCache(
+            update_interval=settings.WEATHER_UPDATE_INTERVAL_SECONDS,
+            grace=settings.WEATHER_CACHE_GRACE_SECONDS,
+            min_ttl=settings.WEATHER_CACHE_MIN_TTL_SECONDS,
+            max_bytes=settings.WEATHER_CACHE_MAX_BYTES
+        )
+        self.negative_cache = NegativeCache(ttl=settings.WEATHER_NEGATIVE_CACHE_TTL_SECONDS)
+        self.stale_served = 0
+        self.derived_current = {"hits": 0, "misses": 0}
+        self.bulk_supported = settings.WEATHER_BULK_ENABLED
+        self.bulk_stats = {"bulk_requests": 0, "bulk_locations": 0, "per_location_fallbacks": 0}
+        self.profile_stats = ProfileStats()
+    
+    async def fetch(self, location: str, profile: FetchProfile) -> Dict[str, Any]:
+        """Fetch weather for a location with the query options of a fetch profile"""
+        return await self._fetch_location(self.geo_grid.quantize(location), profile)
+    
+    def data_age(self, location: str, profile: FetchProfile) -> Optional[float]:
+        """Seconds since the response fetch() serves for this location was fetched upstream.
+        
+        Stale data is the last good entry, so its age is reported too.
+        """
+        entry = self.cache.get_entry(profile.key(self.locations.resolve(self.geo_grid.quantize(location))))
+        return time.time() - entry.fetched_at if entry is not None else None
+    
+    async def _fetch_location(self, location: str, profile: FetchProfile) -> Dict[str, Any]:
+        """fetch() for an already quantized location query"""
+        location_id = self.locations.resolve(location)
+        unknown = self.negative_cache.get(location_id)
+        if unknown is not None:
+            raise UnknownLocationError(unknown)
+        key = profile.key(location_id)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        
+        if not profile.is_forecast:
+            derived = self._current_from_forecast(location_id, profile.aqi)
+            if derived is not None:
+                return derived
+        
+        params = {"q": location, **profile.params()}
+        return await self.single_flight.do(key, lambda: self._fetch(key, profile, params))
     
     async def get_current_weather(self, location: str, include_air_quality: bool = False) -> Dict[str, Any]:
         """Fetch current weather data for a location"""
-        url = f"{self.base_url}/current.json"
-        params = {
-            "key": self.api_key,
-            "q": location,
-            "aqi": "yes" if include_air_quality else "no"
-        }
+        return await self.fetch(location, get_profile("current", aqi=include_air_quality))
+    
+    async def get_forecast(self, location: str, days: int = 1, include_air_quality: bool = False,
+                           hourly: bool = True) -> Dict[str, Any]:
+        """Fetch weather forecast for a location.
         
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.get(url, params=params)
-                response.raise_for_status()
-                return response.json()
-            except httpx.HTTPStatusError as e:
-                logger.error(f"Weather API error: {e.response.status_code} - {e.response.text}")
-                raise HTTPException(status_code=e.response.status_code, detail="Weather API error")
-            except Exception as e:
-                logger.error(f"Unexpected error fetching weather: {str(e)}")
-                raise HTTPException(status_code=500, detail="Internal server error")
+        With hourly=False the hourly arrays are skipped while reading the
+        response (each forecastday gets "hour": []), which is all the TRMNL
+        views need and avoids parsing hundreds of hour objects.
+        """
+        return await self.fetch(
+            location, get_profile("forecast", days=days, aqi=include_air_quality, hourly=hourly)
+        )
     
-    async def get_forecast(self, location: str, days: int = 1, include_air_quality: bool = False) -> Dict[str, Any]:
-        """Fetch weather forecast for a location"""
-        url = f"{self.base_url}/forecast.json"
-        params = {
-            "key": self.api_key,
-            "q": location,
-            "days": min(days, 14),  # API limit is 14 days
-            "aqi": "yes" if include_air_quality else "no"
-        }
+    async def get_current_weather_bulk(self, locations: List[str], include_air_quality: bool = False) -> Dict[str, Dict[str, Any]]:
+        """Fetch current weather for many locations, keyed by the location strings passed in"""
+        return await self.fetch_many(locations, get_profile("current", aqi=include_air_quality))
+    
+    async def get_forecast_bulk(self, locations: List[str], days: int = 1,
+                                include_air_quality: bool = False) -> Dict[str, Dict[str, Any]]:
+        """Fetch forecasts for many locations, keyed by the location strings passed in"""
+        return await self.fetch_many(locations, get_profile("forecast", days=days, aqi=include_air_quality))
+    
+    async def fetch_many(self, locations: List[str], profile: FetchProfile) -> Dict[str, Dict[str, Any]]:
+        """Fetch many locations with WeatherAPI bulk requests, falling back to per-location calls.
+        
+        Locations the upstream could not resolve come back as {"error": {...}}
+        entries in WeatherAPI's own error format.
+        """
+        # Resolve once up front: learning aliases mid-call must not change the keys
+        queries = {location: self.geo_grid.quantize(location) for location in dict.fromkeys(locations)}
+        resolved = {location: self.locations.resolve(query) for location, query in queries.items()}
+        unique: Dict[str, str] = {}
+        for location in locations:
+            unique.setdefault(resolved[location], queries[location])
+        
+        results: Dict[str, Dict[str, Any]] = {}
+        for location_id in unique:
+            unknown = self.negative_cache.get(location_id)
+            if unknown is not None:
+                results[location_id] = {"error": {"code": WEATHER_API_UNKNOWN_LOCATION_CODE, "message": unknown}}
+                continue
+            cached = self.cache.get(profile.key(location_id))
+            if cached is not None:
+                results[location_id] = cached
         
-        async with httpx.AsyncClient() as client:
+        to_fetch = {location_id: location for location_id, location in unique.items() if location_id not in results}
+        if self.bulk_supported and len(to_fetch) > 1:
+            size = settings.WEATHER_BULK_MAX_LOCATIONS
+            items = list(to_fetch.items())
+            chunks = [items[i:i + size] for i in range(0, len(items), size)]
+            outcomes = await asyncio.gather(
+                *[self._bulk_request(profile, chunk) for chunk in chunks],
+                return_exceptions=True
+            )
+            for outcome in outcomes:
+                if isinstance(outcome, BulkUnsupportedError):
+                    logger.warning("📦 WeatherAPI plan does not support bulk requests, using per-location calls")
+                    self.bulk_supported = False
+                elif isinstance(outcome, Exception):
+                    logger.error(f"📦 Bulk {profile.endpoint} request failed, retrying per location: {str(outcome)}")
+                else:
+                    for location_id, data in outcome.items():
+                        results[location_id] = data
+                        if data.get("error", {}).get("code") == WEATHER_API_UNKNOWN_LOCATION_CODE:
+                            self.negative_cache.put(location_id, data["error"].get("message", UNKNOWN_LOCATION_MESSAGE))
+                        elif "error" not in data:
+                            canonical = self.locations.learn(unique[location_id], data)
+                            self.cache.put(profile.key(canonical), data)
+        
+        missing = [location_id for location_id in unique if location_id not in results]
+        if missing:
+            if len(to_fetch) > 1:
+                self.bulk_stats["per_location_fallbacks"] += len(missing)
+            
+            async def fetch_or_error(location: str) -> Dict[str, Any]:
+                # Same error format as the bulk results: WeatherAPI's code, not the HTTP status
+                try:
+                    return await self._fetch_location(location, profile)
+                except WeatherAPIError as e:
+                    return {"error": {"code": e.error_code, "message": e.message}}
+                except HTTPException as e:
+                    return {"error": {"code": WEATHER_API_INTERNAL_ERROR_CODE, "message": e.detail}}
+            
+            fetched = await asyncio.gather(*[fetch_or_error(unique[location_id]) for location_id in missing])
+            results.update(zip(missing, fetched))
+        
+        return {location: results[resolved[location]] for location in locations}
+    
+    async def _bulk_request(self, profile: FetchProfile, chunk: List[tuple]) -> Dict[str, Dict[str, Any]]:
+        """Send one bulk request (q=bulk) for a chunk of (location id, original) locations"""
+        url = f"{self.base_url}/{profile.endpoint}.json"
+        body = {"locations": [{"q": original, "custom_id": str(i)} for i, (_, original) in enumerate(chunk)]}
+        
+        def send():
+            # WeatherAPI counts every location in a bulk request as a call
+            self.quota.record_call(len(chunk))
+            return self.http_pool.request(
+                "POST", url,
+                params={"key": self.api_key, "q": "bulk", **profile.params()},
+                json=body,
+                timeout=settings.REQUEST_TIMEOUT
+            )
+        
+        await self.quota.acquire()
+        self.breaker.check()
+        started = time.monotonic()
+        try:
+            # Bulk lookups are read-only POSTs, so they are safe to retry
+            response = await self.retry_policy.call(send, idempotent=True)
+        except Exception:
+            self.breaker.record_failure()
+            raise
+        
+        if self.breaker.is_failure_status(response.status_code):
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        
+        if response.status_code in (400, 403):
+            if self._error_code(response) == WEATHER_API_PLAN_ERROR_CODE:
+                raise BulkUnsupportedError(response.text)
+        response.raise_for_status()
+        
+        self.profile_stats.record(f"{profile.name}_bulk", len(response.content), time.monotonic() - started)
+        self.bulk_stats["bulk_requests"] += 1
+        self.bulk_stats["bulk_locations"] += len(chunk)
+        results: Dict[str, Dict[str, Any]] = {}
+        for entry in response.json().get("bulk", []):
+            query = entry.get("query", {})
             try:
-                response = await client.get(url, params=params)
-                response.raise_for_status()
-                return response.json()
-            except httpx.HTTPStatusError as e:
-                logger.error(f"Weather API error: {e.response.status_code} - {e.response.text}")
-                raise HTTPException(status_code=e.response.status_code, detail="Weather API error")
-            except Exception as e:
-                logger.error(f"Unexpected error fetching forecast: {str(e)}")
-                raise HTTPException(status_code=500, detail="Internal server error")
+                location_id = chunk[int(query.get("custom_id"))][0]
+            except (TypeError, ValueError, IndexError):
+                continue
+            if "error" in query:
+                results[location_id] = {"error": query["error"]}
+            else:
+                results[location_id] = {k: v for k, v in query.items() if k not in ("custom_id", "q")}
+        return results
+    
+    def _current_from_forecast(self, location_id: str, include_air_quality: bool) -> Optional[Dict[str, Any]]:
+        """Answer a current-weather request from a fresh forecast for the same location.
+        
+        forecast.json returns the same `current` block as current.json, so a
+        cached forecast that has not expired yet saves a whole upstream call.
+        A forecast fetched with air quality can also serve a request without it.
+        """
+        now = time.time()
+        best = None
+        for (_, _, _, aqi, _, _), entry in self.cache.fresh_items(("forecast", location_id)):
+            if aqi != include_air_quality and not aqi:
+                continue
+            if now - entry.fetched_at > settings.CURRENT_FROM_FORECAST_MAX_AGE_SECONDS:
+                continue
+            if best is None or entry.fetched_at > best.fetched_at:
+                best = entry
+        
+        if best is None:
+            self.derived_current["misses"] += 1
+            return None
+        
+        data = best.data
+        current = data.get("current", {})
+        if not include_air_quality and "air_quality" in current:
+            current = {k: v for k, v in current.items() if k != "air_quality"}
+        self.derived_current["hits"] += 1
+        logger.info(f"♻️ Serving current weather for {location_id} from a {int(now - best.fetched_at)}s old forecast")
+        return {"location": data.get("location", {}), "current": current}
+    
+    @staticmethod
+    def _error(response: httpx.Response) -> Dict[str, Any]:
+        """WeatherAPI's own error object ({"code", "message"}) from an error response body"""
+        try:
+            error = response.json().get("error")
+        except Exception:
+            return {}
+        return error if isinstance(error, dict) else {}
+    
+    @classmethod
+    def _error_code(cls, response: httpx.Response) -> Optional[int]:
+        """WeatherAPI's own error code from an error response body"""
+        return cls._error(response).get("code")
+    
+    @staticmethod
+    def _parse_forecast_summary(response: httpx.Response) -> Dict[str, Any]:
+        """Parse a forecast body without its hourly arrays"""
+        try:
+            return extract_forecast_summary(response.content)
+        except ValueError as e:
+            logger.warning(f"Selective forecast parse failed, parsing full body: {str(e)}")
+            data = response.json()
+            for day in data.get("forecast", {}).get("forecastday", []):
+                day["hour"] = []
+            return data
+    
+    async def _fetch(self, key: tuple, profile: FetchProfile, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Fetch from WeatherAPI, serving the last good data while the breaker is open or quota is used up"""
+        try:
+            data = await self._request(profile, params)
+        except (CircuitOpenError, QuotaExceededError) as e:
+            return self._serve_stale(key, e)
+        except UnknownLocationError as e:
+            self.negative_cache.put(key[1], e.detail)
+            logger.warning(f"🚫 WeatherAPI has no location matching {params['q']!r}, remembering it")
+            raise
+        # Store under the canonical location so every spelling of it shares the entry
+        canonical = self.locations.learn(params["q"], data)
+        self.cache.put(profile.key(canonical), data)
+        return data
+    
+    def _serve_stale(self, key: tuple, error: Exception) -> Dict[str, Any]:
+        """Return the last good response for a key, marked as stale"""
+        last_good = self.cache.get_entry(key)
+        if last_good is None:
+            logger.warning(f"⚡ {error}, no stale data for {key[1]}")
+            if isinstance(error, QuotaExceededError) and error.paced:
+                # Budget left, but not this soon: a temporary condition, unlike an exhausted window
+                raise HTTPException(status_code=503,
+                                    detail=f"Weather API calls are being paced, retry in {error.retry_in:.0f}s",
+                                    headers={"Retry-After": str(max(int(error.retry_in), 1))})
+            if isinstance(error, QuotaExceededError):
+                raise HTTPException(status_code=429, detail="Weather API quota exhausted",
+                                    headers={"Retry-After": str(max(int(error.retry_in), 1))})
+            raise HTTPException(status_code=503, detail="Weather API temporarily unavailable")
+        self.stale_served += 1
+        logger.warning(f"⚡ {error}, serving stale {key[0]} data for {key[1]}")
+        return {**last_good.data, "stale": True, "stale_age_seconds": int(time.time() - last_good.fetched_at)}
+    
+    async def _request(self, profile: FetchProfile, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Make a single upstream WeatherAPI request (with retries) through the circuit breaker"""
+        url = f"{self.base_url}/{profile.endpoint}.json"
+        description = "forecast" if profile.is_forecast else "weather"
+        
+        def send():
+            self.quota.record_call()
+            return self.http_pool.request(
+                "GET", url,
+                params={"key": self.api_key, **params},
+                timeout=settings.REQUEST_TIMEOUT
+            )
+        
+        attempt = send
+        if self.hedge_policy:
+            attempt = lambda: self.hedge_policy.run(send)
+        
+        await self.quota.acquire()
+        self.breaker.check()
+        started = time.monotonic()
+        try:
+            response = await self.retry_policy.call(attempt, idempotent=True)
+        except Exception as e:
+            self.breaker.record_failure()
+            logger.error(f"Unexpected error fetching {description}: {str(e)}")
+            raise HTTPException(status_code=500, detail="Internal server error")
+        
+        if self.breaker.is_failure_status(response.status_code):
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        
+        try:
+            response.raise_for_status()
+            self.profile_stats.record(profile.name, len(response.content), time.monotonic() - started)
+            if profile.is_forecast and not profile.hourly:
+                return self._parse_forecast_summary(response)
+            return response.json()
+        except httpx.HTTPStatusError as e:
+            logger.error(f"Weather API error: {e.response.status_code} - {e.response.text}")
+            error = self._error(e.response)
+            if error.get("code") == WEATHER_API_UNKNOWN_LOCATION_CODE:
+                raise UnknownLocationError(error.get("message", UNKNOWN_LOCATION_MESSAGE))
+            raise WeatherAPIError(
+                e.response.status_code,
+                error.get("code", WEATHER_API_INTERNAL_ERROR_CODE),
+                error.get("message", "Weather API error"),
+                detail="Weather API error"
+            )
+        except Exception as e:
+            logger.error(f"Unexpected error fetching {description}: {str(e)}")
+            raise HTTPException(status_code=500, detail="Internal server error")
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get statistics about upstream WeatherAPI usage"""
+        return {
+            "coalescing": self.single_flight.get_stats(),
+            "retries": self.retry_policy.get_stats(),
+            "breaker": self.breaker.get_stats(),
+            "stale_served": self.stale_served,
+            "cache": self.cache.get_stats(),
+            "negative_cache": self.negative_cache.get_stats(),
+            "locations": self.locations.get_stats(),
+            "geo_grid": self.geo_grid.get_stats(),
+            "current_from_forecast": {
+                **self.derived_current,
+                "upstream_calls_saved": self.derived_current["hits"]
+            },
+            "hedging": self.hedge_policy.get_stats() if self.hedge_policy else {"enabled": False},
+            "bulk": {"supported": self.bulk_supported, **self.bulk_stats},
+            "profiles": self.profile_stats.get_stats()
+        }
 
 # TRMNL webhook service
 class TRMNLWebhookService:
-    def __init__(self, webhook_url: str):
+    def __init__(self, webhook_url: str, http_pool: Optional[HTTPClientPool] = None,
+                 retry_policy: Optional[RetryPolicy] = None, breaker: Optional[CircuitBreaker] = None):
         self.webhook_url = webhook_url
+        self.http_pool = http_pool or HTTPClientPool()
+        self.retry_policy = retry_policy or RetryPolicy("trmnl", max_retries=settings.MAX_RETRIES)
+        self.breaker = breaker or CircuitBreaker("trmnl")
     
     async def send_weather_data(self, weather_data: Dict[str, Any]) -> bool:
         """Send weather data to TRMNL webhook"""
@@ -145,87 +508,250 @@ class TRMNLWebhookService:
         logger.info(f"📊 Payload keys: {list(payload.keys())}")
         logger.info(f"📊 Weather data keys: {list(weather_data.keys()) if weather_data else 'None'}")
         
-        async with httpx.AsyncClient() as client:
-            try:
-                logger.info(f"🌐 Making HTTP POST request to TRMNL...")
-                response = await client.post(
+        if not self.breaker.allow_request():
+            logger.error(f"❌ {self.breaker.name} webhook circuit breaker is open, skipping push (retry in {self.breaker.retry_in():.0f}s)")
+            return False
+        
+        try:
+            logger.info(f"🌐 Making HTTP POST request to TRMNL...")
+            # Webhook pushes are only retried when TRMNL cannot have processed them
+            response = await self.retry_policy.call(
+                lambda: self.http_pool.request(
+                    "POST",
                     self.webhook_url,
                     json=payload,
                     headers={"Content-Type": "application/json"},
-                    timeout=30.0
-                )
-                
-                logger.info(f"📡 TRMNL webhook response status: {response.status_code}")
-                logger.info(f"📡 Response headers: {dict(response.headers)}")
-                
-                response.raise_for_status()
-                logger.info(f"✅ Successfully sent weather data to TRMNL webhook: {response.status_code}")
-                
-                # Log response body for debugging
-                try:
-                    response_json = response.json()
-                    logger.info(f"📄 TRMNL response body: {response_json}")
-                except Exception as json_e:
-                    logger.info(f"📄 TRMNL response body (text): {response.text}")
-                
-                return True
-            except httpx.HTTPStatusError as e:
-                logger.error(f"❌ TRMNL webhook HTTP error: {e.response.status_code}")
-                logger.error(f"❌ Error response text: {e.response.text}")
-                logger.error(f"❌ Request URL: {self.webhook_url}")
-                return False
-            except Exception as e:
-                logger.error(f"❌ Unexpected error sending to TRMNL webhook: {str(e)}")
-                logger.error(f"❌ Error type: {type(e).__name__}")
-                return False
-
-# Initialize services
-weather_service = WeatherAPIService(settings.WEATHER_API_KEY)
-trmnl_service = TRMNLWebhookService(settings.TRMNL_WEBHOOK_URL)
-gemini_service = GeminiQuoteService(settings.GEMINI_API_KEY)
-data_transformer = WeatherDataTransformer(gemini_service)
-
-# Scheduled task for automatic webhook updates
-async def scheduled_weather_update():
-    """Send weather data to TRMNL webhook at configured intervals"""
-    while True:
-        try:
-            logger.info(f"🔄 Running scheduled weather update (every {settings.UPDATE_INTERVAL_MINUTES} minutes)...")
-            logger.info(f"📍 Default location: {settings.DEFAULT_LOCATION}")
-            logger.info(f"🔗 TRMNL webhook URL: {settings.TRMNL_WEBHOOK_URL}")
-            
-            # Get forecast data for default location (includes current + tomorrow's forecast)
-            logger.info(f"🌤️ Fetching forecast data for {settings.DEFAULT_LOCATION}...")
-            weather_data = await weather_service.get_forecast(
-                settings.DEFAULT_LOCATION,
-                days=1,
-                include_air_quality=True
+                    timeout=settings.REQUEST_TIMEOUT
+                ),
+                idempotent=False
             )
-            logger.info(f"📊 Raw weather data received: {list(weather_data.keys()) if weather_data else 'None'}")
             
-            # Transform data for TRMNL view
-            logger.info(f"🔄 Transforming weather data for TRMNL view...")
-            trmnl_data = await data_transformer.transform_forecast(weather_data)
-            logger.info(f"📱 Transformed data keys: {list(trmnl_data.keys()) if trmnl_data else 'None'}")
-            
-            # Send to TRMNL webhook
-            logger.info(f"📤 Sending transformed data to TRMNL webhook...")
-            success = await trmnl_service.send_weather_data(trmnl_data)
+            logger.info(f"📡 TRMNL webhook response status: {response.status_code}")
+            logger.info(f"📡 Response headers: {dict(response.headers)}")
             
-            if success:
-                logger.info(f"✅ Scheduled update sent successfully for {settings.DEFAULT_LOCATION}")
+            if self.breaker.is_failure_status(response.status_code):
+                self.breaker.record_failure()
             else:
-                logger.error("❌ Scheduled update failed to send to TRMNL webhook")
-                
+                self.breaker.record_success()
+            
+            response.raise_for_status()
+            logger.info(f"✅ Successfully sent weather data to TRMNL webhook: {response.status_code}")
+            
+            # Log response body for debugging
+            try:
+                response_json = response.json()
+                logger.info(f"📄 TRMNL response body: {response_json}")
+            except Exception as json_e:
+                logger.info(f"📄 TRMNL response body (text): {response.text}")
+            
+            return True
+        except httpx.HTTPStatusError as e:
+            logger.error(f"❌ TRMNL webhook HTTP error: {e.response.status_code}")
+            logger.error(f"❌ Error response text: {e.response.text}")
+            logger.error(f"❌ Request URL: {self.webhook_url}")
+            return False
         except Exception as e:
-            logger.error(f"❌ Error in scheduled weather update: {str(e)}")
+            self.breaker.record_failure()
+            logger.error(f"❌ Unexpected error sending to TRMNL webhook: {str(e)}")
             logger.error(f"❌ Error type: {type(e).__name__}")
-            import traceback
-            logger.error(f"❌ Traceback: {traceback.format_exc()}")
-        
-        # Wait for configured interval (convert minutes to seconds)
-        logger.info(f"⏰ Waiting {settings.UPDATE_INTERVAL_MINUTES} minutes until next update...")
-        await asyncio.sleep(settings.UPDATE_INTERVAL_MINUTES * 60)
+            return False
+
+# Initialize services
+http_pool = HTTPClientPool(
+    max_connections=settings.HTTP_MAX_CONNECTIONS,
+    max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+    keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY,
+    host_limits=parse_host_limits(settings.HTTP_HOST_CONNECTION_LIMITS),
+    http2=settings.HTTP2_ENABLED
+)
+retry_budget = RetryBudget(
+    ratio=settings.RETRY_BUDGET_RATIO,
+    min_per_second=settings.RETRY_BUDGET_MIN_PER_SECOND
+)
+
+def make_breaker(name: str) -> CircuitBreaker:
+    """Create a circuit breaker for an upstream"""
+    return CircuitBreaker(
+        name,
+        failure_threshold=settings.BREAKER_FAILURE_THRESHOLD,
+        recovery_timeout=settings.BREAKER_RECOVERY_SECONDS,
+        half_open_max_calls=settings.BREAKER_HALF_OPEN_PROBES
+    )
+
+def make_quota(name: str, per_minute: int, per_day: int, per_month: int) -> UpstreamQuota:
+    """Create the call budget for an upstream API key"""
+    return UpstreamQuota(
+        name,
+        per_minute=per_minute,
+        per_day=per_day,
+        per_month=per_month,
+        background_reserve=settings.QUOTA_BACKGROUND_RESERVE,
+        max_background_wait=settings.QUOTA_MAX_BACKGROUND_WAIT_SECONDS
+    )
+
+def make_retry_policy(name: str) -> RetryPolicy:
+    """Create a retry policy for an upstream that draws on the shared retry budget"""
+    return RetryPolicy(
+        name,
+        max_retries=settings.MAX_RETRIES,
+        base_delay=settings.RETRY_BASE_DELAY,
+        max_delay=settings.RETRY_MAX_DELAY,
+        budget=retry_budget
+    )
+
+# Shared by every cache so all of them are keyed on canonical locations
+location_index = LocationIndex(max_aliases=settings.LOCATION_INDEX_MAX_ALIASES)
+weather_service = WeatherAPIService(
+    settings.WEATHER_API_KEY,
+    http_pool,
+    make_retry_policy("weatherapi"),
+    make_breaker("weatherapi"),
+    HedgePolicy(
+        percentile=settings.HEDGE_PERCENTILE,
+        min_samples=settings.HEDGE_MIN_SAMPLES,
+        max_hedge_ratio=settings.HEDGE_MAX_RATIO
+    ) if settings.WEATHER_HEDGING_ENABLED else None,
+    quota=make_quota(
+        "weatherapi",
+        settings.WEATHERAPI_QUOTA_PER_MINUTE,
+        settings.WEATHERAPI_QUOTA_PER_DAY,
+        settings.WEATHERAPI_QUOTA_PER_MONTH
+    ),
+    locations=location_index
+)
+trmnl_service = TRMNLWebhookService(
+    settings.TRMNL_WEBHOOK_URL,
+    http_pool,
+    make_retry_policy("trmnl"),
+    make_breaker("trmnl")
+)
+# Webhook services per URL for scheduled jobs (each plugin instance has its own webhook)
+webhook_services: Dict[str, TRMNLWebhookService] = {settings.TRMNL_WEBHOOK_URL: trmnl_service}
+
+def get_webhook_service(job: ScheduledJob) -> TRMNLWebhookService:
+    """The webhook service for a job's URL, created on first use with a breaker named after the job"""
+    service = webhook_services.get(job.webhook_url)
+    if service is None:
+        # Named after the job, not the URL: webhook URLs carry the plugin's secret UUID
+        name = f"trmnl:{job.job_id}"
+        service = TRMNLWebhookService(job.webhook_url, http_pool, make_retry_policy(name), make_breaker(name))
+        webhook_services[job.webhook_url] = service
+    return service
+gemini_service = GeminiQuoteService(
+    settings.GEMINI_API_KEY,
+    http_pool,
+    make_retry_policy("gemini"),
+    make_breaker("gemini"),
+    request_timeout=settings.REQUEST_TIMEOUT,
+    quota=make_quota(
+        "gemini",
+        settings.GEMINI_QUOTA_PER_MINUTE,
+        settings.GEMINI_QUOTA_PER_DAY,
+        settings.GEMINI_QUOTA_PER_MONTH
+    ),
+    locations=location_index
+)
+data_transformer = WeatherDataTransformer(gemini_service, PayloadCache(settings.PAYLOAD_CACHE_MAX_ENTRIES))
+# Transformed TRMNL views served from memory and refreshed in the background
+trmnl_view_cache = StaleWhileRevalidateCache(
+    soft_ttl=settings.TRMNL_VIEW_SOFT_TTL_SECONDS,
+    hard_ttl=settings.TRMNL_VIEW_HARD_TTL_SECONDS
+)
+# Persistent copy of the caches above, shared by every worker using the same
+# backend and opened on startup (see PERSISTENT_CACHE_ENABLED and CACHE_BACKEND)
+persistent_store: Optional[PersistentStore] = None
+
+def make_cache_store() -> PersistentStore:
+    """Create the configured cache store: a SQLite file or a Redis-protocol server"""
+    if settings.CACHE_BACKEND == "redis":
+        return RedisStore(settings.CACHE_REDIS_URL, retention=settings.PERSISTENT_CACHE_RETENTION_SECONDS,
+                          timeout=settings.CACHE_REDIS_TIMEOUT_SECONDS)
+    return PersistentStore(
+        settings.PERSISTENT_CACHE_PATH,
+        retention=settings.PERSISTENT_CACHE_RETENTION_SECONDS,
+        timeout=settings.CACHE_SQLITE_TIMEOUT_SECONDS
+    )
+
+def open_persistent_store() -> Optional[PersistentStore]:
+    """Open the cache store and reload the in-memory caches from it"""
+    try:
+        store = make_cache_store()
+    except Exception as e:
+        logger.error(f"💾 Could not open {settings.CACHE_BACKEND} cache store: {str(e)}")
+        return None
+    aliases = location_index.attach_store(store)
+    weather_entries = weather_service.cache.attach_store(store, "weather")
+    views = trmnl_view_cache.attach_store(store, "trmnl_view")
+    quotes = gemini_service.attach_store(store)
+    logger.info(f"💾 Restored {aliases} location aliases, {weather_entries} weather responses, "
+                f"{views} TRMNL views and {quotes} quotes")
+    return store
+
+# Scheduled webhook updates: one job per plugin instance, all served by one scheduler task
+def load_scheduled_jobs() -> List[ScheduledJob]:
+    """Jobs from SCHEDULE_JOBS_FILE, or the single default job from DEFAULT_LOCATION and TRMNL_WEBHOOK_URL"""
+    default_job = ScheduledJob(
+        "default",
+        settings.DEFAULT_LOCATION,
+        settings.TRMNL_WEBHOOK_URL,
+        view="forecast",
+        interval=settings.UPDATE_INTERVAL_MINUTES * 60
+    )
+    if not settings.SCHEDULE_JOBS_FILE:
+        return [default_job]
+    try:
+        jobs = load_jobs(settings.SCHEDULE_JOBS_FILE)
+    except (OSError, ValueError) as e:
+        logger.error(f"❌ Could not load scheduled jobs from {settings.SCHEDULE_JOBS_FILE}, using the default job: {str(e)}")
+        return [default_job]
+    logger.info(f"📋 Loaded {len(jobs)} scheduled jobs from {settings.SCHEDULE_JOBS_FILE}")
+    return jobs
+
+async def run_scheduled_job(job: ScheduledJob) -> bool:
+    """Fetch, transform and push one job's view to its webhook"""
+    logger.info(f"🔄 Running scheduled job {job.job_id}: {job.view} view for {job.location}")
+    if job.view == "current":
+        weather_data = await weather_service.fetch(job.location, get_profile("trmnl_view_current"))
+        trmnl_data = await data_transformer.transform_current_weather(weather_data)
+    else:
+        # Forecast data includes current conditions plus today's forecast
+        weather_data = await weather_service.fetch(job.location, get_profile("trmnl_view"))
+        trmnl_data = await data_transformer.transform_forecast(weather_data)
+    
+    success = await get_webhook_service(job).send_weather_data(trmnl_data)
+    if success:
+        logger.info(f"✅ Scheduled update sent successfully for {job.location} ({job.job_id})")
+        if adaptive_intervals:
+            job_scheduler.set_interval(job, adaptive_intervals.next_interval(job, weather_data))
+    else:
+        logger.error(f"❌ Scheduled update for {job.location} ({job.job_id}) failed to send to TRMNL webhook")
+    return success
+
+async def prefetch_scheduled_jobs(jobs: List[ScheduledJob]) -> None:
+    """Warm the weather cache for a batch of jobs with bulk requests, so each run's fetch is a cache hit"""
+    for view, profile in (("forecast", get_profile("trmnl_view")), ("current", get_profile("trmnl_view_current"))):
+        locations = [job.location for job in jobs if job.view == view]
+        if len(locations) > 1:
+            await weather_service.fetch_many(locations, profile)
+
+adaptive_intervals = AdaptiveIntervalPolicy(
+    min_interval=settings.SCHEDULE_MIN_INTERVAL_MINUTES * 60,
+    max_interval=settings.SCHEDULE_MAX_INTERVAL_MINUTES * 60,
+    night_start_hour=settings.SCHEDULE_NIGHT_START_HOUR,
+    night_end_hour=settings.SCHEDULE_NIGHT_END_HOUR
+) if settings.SCHEDULE_ADAPTIVE_INTERVALS else None
+
+job_scheduler = JobScheduler(
+    run_scheduled_job,
+    max_concurrency=settings.SCHEDULER_MAX_CONCURRENCY,
+    align=settings.SCHEDULE_ALIGN_TO_WALL_CLOCK,
+    offset=settings.SCHEDULE_OFFSET_SECONDS,
+    stagger=settings.SCHEDULE_STAGGER,
+    jitter=settings.SCHEDULE_JITTER_SECONDS,
+    immediate_first_run=settings.SCHEDULE_RUN_ON_STARTUP,
+    prefetch=prefetch_scheduled_jobs if settings.WEATHER_BULK_ENABLED else None,
+    prefetch_window=settings.SCHEDULE_PREFETCH_WINDOW_SECONDS
+)
 
 
 @app.get("/")
@@ -305,6 +831,14 @@ async def send_weather_to_trmnl(request: WeatherRequest, background_tasks: Backg
         logger.error(f"Unexpected error in send_weather_to_trmnl: {str(e)}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
+async def build_trmnl_view(location: str) -> Dict[str, Any]:
+    """Fetch and transform the TRMNL view for a location"""
+    # Get forecast data (includes current + tomorrow's forecast)
+    weather_data = await weather_service.fetch(location, get_profile("trmnl_view"))
+    
+    # Transform data for TRMNL view
+    return await data_transformer.transform_forecast(weather_data)
+
 @app.get("/weather/trmnl-view")
 async def get_weather_trmnl_view_default(background_tasks: BackgroundTasks):
     """Get TRMNL view with default location"""
@@ -312,20 +846,21 @@ async def get_weather_trmnl_view_default(background_tasks: BackgroundTasks):
         # Use default location from config
         location = settings.DEFAULT_LOCATION
         
-        # Get forecast data (includes current + tomorrow's forecast)
-        weather_data = await weather_service.get_forecast(
-            location, 
-            days=1,
-            include_air_quality=True
+        # Served from memory; refreshed in the background after the soft TTL
+        transformed_data, age = await trmnl_view_cache.get(
+            ("trmnl_view", location_index.resolve(location)),
+            lambda: build_trmnl_view(location)
         )
         
-        # Transform data for TRMNL view
-        transformed_data = await data_transformer.transform_forecast(weather_data)
+        # The payload is at least as old as the weather data it was built from
+        data_age = weather_service.data_age(location, get_profile("trmnl_view"))
+        if data_age is not None:
+            age = max(age, data_age)
         
         # Send transformed data to TRMNL webhook in background
         background_tasks.add_task(trmnl_service.send_weather_data, transformed_data)
         
-        return TRMNLResponse(success=True, data=transformed_data)
+        return TRMNLResponse(success=True, data=transformed_data, data_age_seconds=int(age))
     except HTTPException:
         raise
     except Exception as e:
@@ -337,17 +872,17 @@ async def get_weather_trmnl_view(request: WeatherRequest, background_tasks: Back
     """Get weather data formatted specifically for TRMNL view"""
     try:
         if request.days >= 1:
-            weather_data = await weather_service.get_forecast(
+            # The view only shows the first forecast day, so one day is always enough
+            weather_data = await weather_service.fetch(
                 request.location,
-                request.days,
-                request.include_air_quality
+                get_profile("trmnl_view", aqi=request.include_air_quality)
             )
             # Transform forecast data for TRMNL view (includes current + forecast)
             trmnl_data = await data_transformer.transform_forecast(weather_data)
         else:
-            weather_data = await weather_service.get_current_weather(
+            weather_data = await weather_service.fetch(
                 request.location,
-                request.include_air_quality
+                get_profile("trmnl_view_current", aqi=request.include_air_quality)
             )
             # Transform current weather data for TRMNL view
             trmnl_data = await data_transformer.transform_current_weather(weather_data)
@@ -367,11 +902,8 @@ async def get_weather_trmnl_view(request: WeatherRequest, background_tasks: Back
 async def get_weather_quote(request: WeatherRequest):
     """Get a weather-matching quote for a location"""
     try:
-        # Get current weather data first
-        weather_data = await weather_service.get_current_weather(
-            request.location,
-            request.include_air_quality
-        )
+        # Get current weather data first (the quote only uses condition, temperature and wind)
+        weather_data = await weather_service.fetch(request.location, get_profile("quote"))
         
         # Get quote
         quote = await gemini_service.get_weather_quote(
@@ -379,7 +911,8 @@ async def get_weather_quote(request: WeatherRequest):
             {
                 'condition_text': weather_data.get('current', {}).get('condition', {}).get('text', ''),
                 'temp_c': weather_data.get('current', {}).get('temp_c', 0),
-                'wind_kph': weather_data.get('current', {}).get('wind_kph', 0)
+                'wind_kph': weather_data.get('current', {}).get('wind_kph', 0),
+                'location_id': canonical_id(weather_data.get('location', {}))
             }
         )
         
@@ -390,7 +923,8 @@ async def get_weather_quote(request: WeatherRequest):
                 'work': quote.work,
                 'weather_condition': quote.weather_condition,
                 'location': quote.location,
-                'timestamp': quote.timestamp.isoformat()
+                'timestamp': quote.timestamp.isoformat(),
+                'stale': quote.stale
             })
         else:
             return TRMNLResponse(success=False, error="Failed to generate weather quote")
@@ -411,6 +945,82 @@ async def get_quote_cache_stats():
         logger.error(f"Error getting cache stats: {str(e)}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
+@app.get("/weather/stats")
+async def get_weather_stats():
+    """Get statistics about upstream WeatherAPI usage"""
+    try:
+        return TRMNLResponse(success=True, data={
+            **weather_service.get_stats(),
+            "trmnl_view": trmnl_view_cache.get_stats(),
+            "payloads": data_transformer.payloads.get_stats()
+        })
+    except Exception as e:
+        logger.error(f"Error getting weather stats: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+@app.get("/upstreams/status")
+async def get_upstreams_status():
+    """Get resilience status (circuit breakers, retries, retry budget) for each upstream"""
+    try:
+        return TRMNLResponse(success=True, data={
+            "retry_budget": retry_budget.get_stats(),
+            "upstreams": {
+                "weatherapi": {
+                    "breaker": weather_service.breaker.get_stats(),
+                    "retries": weather_service.retry_policy.get_stats(),
+                    "stale_served": weather_service.stale_served
+                },
+                "gemini": {
+                    "breaker": gemini_service.breaker.get_stats(),
+                    "retries": gemini_service.retry_policy.get_stats(),
+                    "stale_served": gemini_service.stale_served
+                },
+                # One per webhook: "trmnl" for TRMNL_WEBHOOK_URL, "trmnl:<job id>" for scheduled jobs' own webhooks
+                **{
+                    service.breaker.name: {
+                        "breaker": service.breaker.get_stats(),
+                        "retries": service.retry_policy.get_stats()
+                    }
+                    for service in webhook_services.values()
+                }
+            }
+        })
+    except Exception as e:
+        logger.error(f"Error getting upstream status: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+@app.get("/upstreams/quota")
+async def get_upstreams_quota():
+    """Get call budgets per upstream API key, with projected exhaustion per window"""
+    try:
+        return TRMNLResponse(success=True, data={
+            "weatherapi": weather_service.quota.get_stats(),
+            "gemini": gemini_service.quota.get_stats()
+        })
+    except Exception as e:
+        logger.error(f"Error getting quota stats: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+@app.get("/cache/store-stats")
+async def get_cache_store_stats():
+    """Get statistics about the persistent on-disk cache"""
+    try:
+        if persistent_store is None:
+            return TRMNLResponse(success=True, data={"enabled": False})
+        return TRMNLResponse(success=True, data={"enabled": True, **persistent_store.get_stats()})
+    except Exception as e:
+        logger.error(f"Error getting cache store stats: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+@app.get("/http/pool-stats")
+async def get_http_pool_stats():
+    """Get usage statistics for the shared outbound HTTP connection pool"""
+    try:
+        return TRMNLResponse(success=True, data=http_pool.get_stats())
+    except Exception as e:
+        logger.error(f"Error getting HTTP pool stats: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
 @app.get("/scheduled-updates/status")
 async def get_scheduled_updates_status():
     """Get status of scheduled updates"""
@@ -418,7 +1028,10 @@ async def get_scheduled_updates_status():
         "enabled": settings.ENABLE_SCHEDULED_UPDATES,
         "interval_minutes": settings.UPDATE_INTERVAL_MINUTES,
         "default_location": settings.DEFAULT_LOCATION,
-        "next_update_in": f"~{settings.UPDATE_INTERVAL_MINUTES} minutes"
+        "next_update_in": f"~{settings.UPDATE_INTERVAL_MINUTES} minutes",
+        "scheduler": job_scheduler.get_stats(),
+        "adaptive_intervals": adaptive_intervals.get_stats() if adaptive_intervals else None,
+        "leader_election": leader_election.get_stats() if leader_election else None
     }
 
 @app.post("/scheduled-updates/trigger")
@@ -463,6 +1076,39 @@ async def refresh_quotes_background():
         except Exception as e:
             logger.error(f"Error refreshing quotes: {str(e)}")
 
+# Background work that only the leader runs
+leader_election: Optional[LeaseElection] = None
+leader_tasks: List[asyncio.Task] = []
+
+def start_leader_tasks() -> None:
+    """Start scheduled weather updates and quote refreshes"""
+    # Tasks copy the current context, so their upstream calls are paced as background work
+    with background():
+        if settings.ENABLE_SCHEDULED_UPDATES:
+            leader_tasks.append(asyncio.create_task(job_scheduler.run_forever()))
+            logger.info(f"🚀 Scheduled weather updates started for {len(job_scheduler.jobs())} jobs")
+        leader_tasks.append(asyncio.create_task(refresh_quotes_background()))
+    logger.info("📚 Background quote refresh task started")
+
+def stop_leader_tasks() -> None:
+    """Stop them when leadership is lost (runs already in flight finish)"""
+    if not leader_tasks:
+        return
+    for task in leader_tasks:
+        task.cancel()
+    leader_tasks.clear()
+    logger.info("⏹️ Scheduled weather updates and quote refreshes stopped")
+
+def open_leader_election() -> Optional[LeaseElection]:
+    """Open the leader lease, or None (run the leader tasks in this process) if it cannot be opened"""
+    try:
+        return LeaseElection(settings.LEADER_LEASE_PATH, ttl=settings.LEADER_LEASE_TTL_SECONDS)
+    except (OSError, sqlite3.Error) as e:
+        logger.error(f"❌ Could not open the leader lease at {settings.LEADER_LEASE_PATH}: {str(e)}. "
+                     f"Running scheduled pushes and quote refreshes in this process; with several "
+                     f"workers each one will push")
+        return None
+
 @app.on_event("startup")
 async def startup_event():
     """Start background tasks on startup"""
@@ -472,18 +1118,52 @@ async def startup_event():
     logger.info(f"⏰ Update interval: {settings.UPDATE_INTERVAL_MINUTES} minutes")
     logger.info(f"🔄 Scheduled updates enabled: {settings.ENABLE_SCHEDULED_UPDATES}")
     
-    # Start scheduled weather updates
+    # Reload caches from disk so a restart does not re-fetch everything upstream
+    global persistent_store
+    if settings.PERSISTENT_CACHE_ENABLED:
+        persistent_store = open_persistent_store()
+    
+    jobs = load_scheduled_jobs() if settings.ENABLE_SCHEDULED_UPDATES else []
+    
+    # Open pooled connections to every upstream we talk to
+    http_pool.start([
+        weather_service.base_url,
+        gemini_service.base_url,
+        settings.TRMNL_WEBHOOK_URL,
+        *{job.webhook_url for job in jobs}
+    ])
+    
     if settings.ENABLE_SCHEDULED_UPDATES:
-        logger.info(f"🚀 Starting scheduled weather updates every {settings.UPDATE_INTERVAL_MINUTES} minutes...")
-        asyncio.create_task(scheduled_weather_update())
+        logger.info(f"📋 Scheduling weather updates for {len(jobs)} jobs")
+        for job in jobs:
+            get_webhook_service(job)  # Listed in /upstreams/status before its first push
+            job_scheduler.add(job)
     else:
         logger.info("⏸️  Scheduled updates disabled")
     
-    # Start quote refresh task
-    asyncio.create_task(refresh_quotes_background())
-    logger.info("📚 Background quote refresh task started")
+    # Scheduled pushes and quote refreshes run in the leader only, so webhooks are not pushed once per worker
+    global leader_election
+    if settings.LEADER_ELECTION_ENABLED:
+        leader_election = open_leader_election()
+    if leader_election is not None:
+        asyncio.create_task(leader_election.run(start_leader_tasks, stop_leader_tasks))
+        logger.info(f"🗳️ Leader election started as {leader_election.node_id}")
+    else:
+        start_leader_tasks()
     logger.info("✅ TRMNL Weather Plugin startup complete!")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Hand over leadership and release pooled upstream connections and the cache store on shutdown"""
+    stop_leader_tasks()
+    if leader_election is not None:
+        leader_election.release()
+        leader_election.close()
+    await http_pool.close()
+    if persistent_store is not None:
+        persistent_store.close()
+    logger.info("👋 TRMNL Weather Plugin shut down")
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host=settings.HOST, port=settings.PORT)
@@ -0,0 +1,62 @@
+"""
+Cache of transformed TRMNL payloads, keyed by the upstream data version they
+were built from so transformation and quote lookup run once per update
+"""
+
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+
+# (canonical location id, view, air quality included, current.last_updated_epoch)
+PayloadKey = Tuple[str, str, bool, int]
+
+
+class PayloadCache:
+    """Transformer output per canonical location, view and upstream version.
+
+    An entry never goes stale on its own: a newer WeatherAPI update has a new
+    `last_updated_epoch` and therefore a new key. The only other input, the
+    quote, is handled by invalidate_location() when a quote for the location
+    is generated or refreshed. Least recently used entries are evicted past
+    `max_entries`.
+    """
+
+    def __init__(self, max_entries: int = 500):
+        self.max_entries = max_entries
+        self._payloads: "OrderedDict[PayloadKey, Dict[str, Any]]" = OrderedDict()
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "invalidations": 0,
+        }
+
+    def get(self, key: PayloadKey) -> Optional[Dict[str, Any]]:
+        payload = self._payloads.get(key)
+        if payload is None:
+            self.stats["misses"] += 1
+            return None
+        self._payloads.move_to_end(key)
+        self.stats["hits"] += 1
+        return payload
+
+    def put(self, key: PayloadKey, payload: Dict[str, Any]) -> None:
+        self._payloads[key] = payload
+        self._payloads.move_to_end(key)
+        # Older versions of the same location and view are superseded
+        for old in [k for k in self._payloads if k[:3] == key[:3] and k[3] < key[3]]:
+            del self._payloads[old]
+        while len(self._payloads) > self.max_entries:
+            self._payloads.popitem(last=False)
+
+    def invalidate_location(self, location_id: str) -> None:
+        """Drop every payload for a location (its quote changed)"""
+        for key in [k for k in self._payloads if k[0] == location_id]:
+            del self._payloads[key]
+            self.stats["invalidations"] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "hit_ratio": round(self.stats["hits"] / lookups, 3) if lookups else 0.0,
+            "entries": len(self._payloads),
+        }
@@ -0,0 +1,219 @@
+"""
+Persistent on-disk store (SQLite in WAL mode) backing the in-memory caches,
+so a restart does not start from cold and re-fetch everything upstream
+"""
+
+import os
+import json
+import time
+import queue
+import sqlite3
+import logging
+import threading
+from typing import Dict, Any, List, Hashable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def encode_key(key: Hashable) -> str:
+    return json.dumps(key)
+
+
+def decode_key(raw: str) -> Hashable:
+    """Inverse of encode_key (tuples come back from JSON as lists)"""
+    key = json.loads(raw)
+    return tuple(key) if isinstance(key, list) else key
+
+
+class PersistentStore:
+    """Namespaced key/value rows with a stored time and an expiry time.
+
+    Caches write through on every update and reload their namespace at
+    startup. Rows more than `retention` seconds past their expiry are
+    neither loaded nor kept: compact() deletes them and truncates the WAL.
+    It runs when the store is opened and after every `compact_every` writes.
+
+    Several worker processes can open the same file: caches read through to
+    the store on a local miss (get), so one worker's upstream response serves
+    all of them.
+
+    The caches call the store from the event loop, so, as in RedisStore,
+    writes and deletes are queued and committed by a background thread with
+    its own connection (at most `max_pending` waiting; more are dropped), and
+    a read waits at most `timeout` seconds for a lock held by another worker
+    before counting as a miss.
+    """
+
+    def __init__(self, path: str, retention: float = 86400.0, compact_every: int = 1000,
+                 timeout: float = 0.1, max_pending: int = 10000):
+        self.path = path
+        self.retention = retention
+        self.compact_every = compact_every
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # The writer thread has its own connection and may wait the default busy timeout: it is off the loop
+        self._write_db = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self._write_db.execute("PRAGMA journal_mode=WAL")
+        self._write_db.execute("PRAGMA synchronous=NORMAL")  # Durable across process crashes, fast writes
+        self._write_db.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL,"
+            " stored_at REAL NOT NULL, expires_at REAL NOT NULL,"
+            " PRIMARY KEY (namespace, key))"
+        )
+        self._db = sqlite3.connect(path, isolation_level=None, check_same_thread=False, timeout=timeout)
+        self._writes_since_compact = 0
+        self.stats = {
+            "writes": 0,
+            "deletes": 0,
+            "write_errors": 0,
+            "dropped_writes": 0,
+            "reads": 0,
+            "read_hits": 0,
+            "read_errors": 0,
+            "loaded": 0,
+            "compactions": 0,
+            "compacted_rows": 0,
+        }
+        self._compact()
+        self._pending: "queue.Queue[Optional[Tuple[Any, ...]]]" = queue.Queue(max_pending)
+        self._writer = threading.Thread(target=self._write_loop, name="sqlite-store-writer", daemon=True)
+        self._writer.start()
+
+    def _enqueue(self, command: Tuple[Any, ...]) -> None:
+        try:
+            self._pending.put_nowait(command)
+        except queue.Full:
+            self.stats["dropped_writes"] += 1
+
+    def _write_loop(self) -> None:
+        while True:
+            command = self._pending.get()
+            try:
+                if command is None:
+                    return
+                self._write(*command)
+            finally:
+                self._pending.task_done()
+
+    def _write(self, sql: str, params: Tuple[Any, ...]) -> None:
+        try:
+            self._write_db.execute(sql, params)
+        except sqlite3.Error as e:
+            self.stats["write_errors"] += 1
+            logger.error(f"💾 Failed to persist {params[0]} entry {params[1]}: {str(e)}")
+            return
+        if sql.startswith("DELETE"):
+            self.stats["deletes"] += 1
+            return
+        self.stats["writes"] += 1
+        self._writes_since_compact += 1
+        if self._writes_since_compact >= self.compact_every:
+            self._compact()
+
+    def put(self, namespace: str, key: Hashable, value: Any, stored_at: float, expires_at: float) -> None:
+        """Queue an insert or replace of a row (errors are logged, never raised to the caller)"""
+        try:
+            row = (namespace, encode_key(key), json.dumps(value, default=str), stored_at, expires_at)
+        except (TypeError, ValueError) as e:
+            self.stats["write_errors"] += 1
+            logger.error(f"💾 Failed to encode {namespace} entry {key}: {str(e)}")
+            return
+        self._enqueue((
+            "INSERT OR REPLACE INTO entries (namespace, key, value, stored_at, expires_at) VALUES (?, ?, ?, ?, ?)",
+            row
+        ))
+
+    def delete(self, namespace: str, key: Hashable) -> None:
+        self._enqueue(("DELETE FROM entries WHERE namespace = ? AND key = ?", (namespace, encode_key(key))))
+
+    def get(self, namespace: str, key: Hashable) -> Optional[Tuple[Any, float, float]]:
+        """Return (value, stored_at, expires_at) for one row, or None (errors count as a miss)"""
+        self.stats["reads"] += 1
+        try:
+            row = self._db.execute(
+                "SELECT value, stored_at, expires_at FROM entries WHERE namespace = ? AND key = ?",
+                (namespace, encode_key(key))
+            ).fetchone()
+            if row is None:
+                return None
+            value = json.loads(row[0])
+        except (sqlite3.Error, ValueError) as e:
+            self.stats["read_errors"] += 1
+            logger.error(f"💾 Failed to read {namespace} entry {key}: {str(e)}")
+            return None
+        self.stats["read_hits"] += 1
+        return value, row[1], row[2]
+
+    def load(self, namespace: str) -> List[Tuple[Hashable, Any, float, float]]:
+        """Return (key, value, stored_at, expires_at) rows still within the retention window.
+
+        Runs at startup, after our own queued writes, on the writer's connection (default busy timeout).
+        """
+        self.flush()
+        cutoff = time.time() - self.retention
+        rows = self._write_db.execute(
+            "SELECT key, value, stored_at, expires_at FROM entries"
+            " WHERE namespace = ? AND expires_at > ? ORDER BY stored_at",
+            (namespace, cutoff)
+        ).fetchall()
+        entries = []
+        for raw_key, raw_value, stored_at, expires_at in rows:
+            try:
+                entries.append((decode_key(raw_key), json.loads(raw_value), stored_at, expires_at))
+            except ValueError:
+                logger.warning(f"💾 Skipping unreadable {namespace} entry {raw_key}")
+        self.stats["loaded"] += len(entries)
+        logger.info(f"💾 Loaded {len(entries)} {namespace} entries from {self.path}")
+        return entries
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Wait until queued writes have been committed; False if they are still pending after `timeout`"""
+        deadline = time.monotonic() + timeout
+        while self._pending.unfinished_tasks:
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.001)
+        return True
+
+    def compact(self) -> int:
+        """Delete rows past retention and truncate the write-ahead log (after our own queued writes)"""
+        self.flush()
+        return self._compact()
+
+    def _compact(self) -> int:
+        self._writes_since_compact = 0
+        try:
+            deleted = self._write_db.execute(
+                "DELETE FROM entries WHERE expires_at <= ?", (time.time() - self.retention,)
+            ).rowcount
+            self._write_db.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        except sqlite3.Error as e:
+            logger.error(f"💾 Compaction of {self.path} failed: {str(e)}")
+            return 0
+        self.stats["compactions"] += 1
+        self.stats["compacted_rows"] += deleted
+        return deleted
+
+    def close(self) -> None:
+        """Commit what is still queued (briefly), then stop the writer, compact and close both connections"""
+        self.flush(timeout=2.0)
+        self._enqueue(None)
+        self._writer.join(timeout=1.0)
+        self._compact()
+        self._write_db.close()
+        self._db.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Write/load counters and row counts per namespace"""
+        rows = self._db.execute("SELECT namespace, COUNT(*) FROM entries GROUP BY namespace").fetchall()
+        size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        return {
+            "backend": "sqlite",
+            "path": self.path,
+            **self.stats,
+            "pending_writes": self._pending.unfinished_tasks,
+            "rows": dict(rows),
+            "size_bytes": size,
+        }
@@ -0,0 +1,219 @@
+"""
+Upstream quota budgeting: per-window call counts and a token-bucket rate for
+each upstream API key, with non-urgent work paced across the remaining budget
+"""
+
+import time
+import asyncio
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Dict, Any, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Set for background work (scheduled pushes, quote refresh) so its upstream calls are paced
+_background: ContextVar[bool] = ContextVar("quota_background", default=False)
+
+
+@contextmanager
+def background():
+    """Mark upstream calls made inside this block (and tasks it starts) as non-urgent"""
+    token = _background.set(True)
+    try:
+        yield
+    finally:
+        _background.reset(token)
+
+
+def is_background() -> bool:
+    return _background.get()
+
+
+class QuotaExceededError(Exception):
+    """Raised when a call is refused to keep an upstream within its quota.
+
+    `window` is the exhausted window ("minute", "day" or "month"), or "rate"
+    when the budget is not used up but the call would have to wait longer
+    than allowed for its paced slot (see `paced`).
+    """
+
+    def __init__(self, name: str, window: str, retry_in: float):
+        if window == "rate":
+            message = f"Calls to {name} are paced, next slot in {retry_in:.0f}s"
+        else:
+            message = f"Quota for {name} exhausted ({window}, retry in {retry_in:.0f}s)"
+        super().__init__(message)
+        self.name = name
+        self.window = window
+        self.retry_in = retry_in
+
+    @property
+    def paced(self) -> bool:
+        """True for a pacing rejection: the window still has budget, just not this soon"""
+        return self.window == "rate"
+
+
+def window_bounds(window: str, now: float) -> Tuple[float, float]:
+    """Start and end (epoch seconds) of the UTC calendar window containing now"""
+    if window == "minute":
+        start = now - now % 60
+        return start, start + 60
+    if window == "day":
+        start = now - now % 86400
+        return start, start + 86400
+    moment = datetime.fromtimestamp(now, timezone.utc)
+    start = datetime(moment.year, moment.month, 1, tzinfo=timezone.utc)
+    if moment.month == 12:
+        end = datetime(moment.year + 1, 1, 1, tzinfo=timezone.utc)
+    else:
+        end = datetime(moment.year, moment.month + 1, 1, tzinfo=timezone.utc)
+    return start.timestamp(), end.timestamp()
+
+
+class UpstreamQuota:
+    """Call budget for one upstream API key.
+
+    Limits of 0 mean unlimited. Every request sent is counted against the
+    minute/day/month windows and takes a token from a bucket refilled at
+    `per_minute` so bursts are smoothed. Urgent (user-facing) calls may use
+    the whole budget; background calls are held to `1 - background_reserve`
+    of each window and spaced evenly over the time left in it.
+    """
+
+    def __init__(self, name: str, per_minute: int = 0, per_day: int = 0, per_month: int = 0,
+                 background_reserve: float = 0.2, max_urgent_wait: float = 1.0,
+                 max_background_wait: float = 60.0):
+        self.name = name
+        self.limits = {"minute": per_minute, "day": per_day, "month": per_month}
+        self.background_reserve = background_reserve
+        self.max_urgent_wait = max_urgent_wait
+        self.max_background_wait = max_background_wait
+        self.rate = per_minute / 60.0
+        self.capacity = max(1.0, per_minute / 6.0)  # Up to 10 seconds' worth of calls at once
+        self.tokens = self.capacity
+        self._refilled_at = time.monotonic()
+        self._windows: Dict[str, Dict[str, float]] = {}
+        self._last_background_call = 0.0
+        self.stats = {
+            "calls": 0,
+            "rejected": 0,
+            "paced_rejections": 0,
+            "background_paced": 0,
+            "background_wait_seconds": 0.0,
+        }
+
+    def _window(self, window: str, now: float) -> Dict[str, float]:
+        state = self._windows.get(window)
+        if state is None or now >= state["end"]:
+            start, end = window_bounds(window, now)
+            state = self._windows[window] = {"start": start, "end": end, "count": 0}
+        return state
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._refilled_at) * self.rate)
+        self._refilled_at = now
+
+    def _token_wait(self) -> float:
+        if not self.rate:
+            return 0.0
+        self._refill()
+        return max(0.0, (1.0 - self.tokens) / self.rate)
+
+    def _check_windows(self, share: float) -> Optional[QuotaExceededError]:
+        now = time.time()
+        for window, limit in self.limits.items():
+            if not limit:
+                continue
+            state = self._window(window, now)
+            if state["count"] >= limit * share:
+                return QuotaExceededError(self.name, window, state["end"] - now)
+        return None
+
+    def _pace_delay(self) -> float:
+        """Delay that spreads background calls evenly over what is left of each window"""
+        now = time.time()
+        delay = 0.0
+        for window, limit in self.limits.items():
+            if not limit or window == "minute":
+                continue
+            state = self._window(window, now)
+            remaining = limit * (1 - self.background_reserve) - state["count"]
+            interval = (state["end"] - now) / max(remaining, 1.0)
+            delay = max(delay, self._last_background_call + interval - now)
+        return delay
+
+    def _reject(self, error: QuotaExceededError) -> QuotaExceededError:
+        self.stats["rejected"] += 1
+        if error.paced:
+            self.stats["paced_rejections"] += 1
+        logger.warning(f"🪙 {error}")
+        return error
+
+    async def acquire(self, urgent: Optional[bool] = None) -> None:
+        """Wait until a call fits the budget, or raise QuotaExceededError.
+
+        `urgent` defaults to the caller's context (see background()).
+        """
+        if urgent is None:
+            urgent = not is_background()
+        share = 1.0 if urgent else 1.0 - self.background_reserve
+        error = self._check_windows(share)
+        if error:
+            raise self._reject(error)
+
+        wait = self._token_wait()
+        if not urgent:
+            wait = max(wait, self._pace_delay())
+        if wait > (self.max_urgent_wait if urgent else self.max_background_wait):
+            raise self._reject(QuotaExceededError(self.name, "rate", wait))
+        if not urgent:
+            # Reserve the slot before sleeping (no await since the delay was computed), so
+            # concurrent background callers pace from this call's start, not all from the last one
+            self._last_background_call = time.time() + wait
+        if wait > 0:
+            if not urgent:
+                self.stats["background_paced"] += 1
+                self.stats["background_wait_seconds"] += wait
+            await asyncio.sleep(wait)
+
+    def record_call(self, count: int = 1) -> None:
+        """Count requests actually sent upstream (including retries and hedges)"""
+        now = time.time()
+        self.stats["calls"] += count
+        for window in self.limits:
+            self._window(window, now)["count"] += count
+        if self.rate:
+            self._refill()
+            self.tokens -= count
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Usage per window with projected exhaustion at the current window's rate"""
+        now = time.time()
+        windows = {}
+        for window, limit in self.limits.items():
+            state = self._window(window, now)
+            used = state["count"]
+            elapsed = max(now - state["start"], 1.0)
+            resets_in = state["end"] - now
+            info: Dict[str, Any] = {"limit": limit or None, "used": int(used), "resets_in_seconds": int(resets_in)}
+            if limit:
+                remaining = max(limit - used, 0)
+                rate = used / elapsed
+                exhausted_in = remaining / rate if rate else None
+                info.update({
+                    "remaining": int(remaining),
+                    "projected_exhaustion_seconds": int(exhausted_in) if exhausted_in is not None else None,
+                    "exhausts_before_reset": exhausted_in is not None and exhausted_in < resets_in,
+                })
+            windows[window] = info
+        if self.rate:
+            self._refill()
+        return {
+            **self.stats,
+            "background_wait_seconds": round(self.stats["background_wait_seconds"], 1),
+            "tokens": round(self.tokens, 2) if self.rate else None,
+            "windows": windows,
+        }
@@ -0,0 +1,292 @@
+"""
+Redis-backed cache store: the same interface as PersistentStore, kept on a
+Redis (or any Redis-protocol) server so every worker and replica shares it
+"""
+
+import json
+import time
+import queue
+import socket
+import logging
+import threading
+from urllib.parse import urlparse
+from typing import Dict, Any, List, Hashable, Optional, Tuple
+
+from circuit_breaker import CircuitBreaker
+from persistent_store import encode_key, decode_key
+
+logger = logging.getLogger(__name__)
+
+
+class RESPError(Exception):
+    """Error reply from the server"""
+
+
+class RESPClient:
+    """Minimal blocking Redis protocol (RESP2) client over one connection.
+
+    Every command waits at most `timeout` seconds for the server; the
+    connection is reopened after any error.
+    """
+
+    def __init__(self, host: str = "localhost", port: int = 6379, db: int = 0,
+                 password: Optional[str] = None, timeout: float = 1.0):
+        self.host = host
+        self.port = port
+        self.db = db
+        self.password = password
+        self.timeout = timeout
+        self._sock: Optional[socket.socket] = None
+        self._reader = None
+
+    @classmethod
+    def from_url(cls, url: str, timeout: float = 1.0) -> "RESPClient":
+        """Client for a redis://[:password@]host[:port][/db] URL"""
+        parsed = urlparse(url)
+        db = int(parsed.path.lstrip("/") or 0)
+        return cls(parsed.hostname or "localhost", parsed.port or 6379, db, parsed.password, timeout)
+
+    def _connect(self) -> None:
+        self._sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._reader = self._sock.makefile("rb")
+        if self.password:
+            self._send("AUTH", self.password)
+        if self.db:
+            self._send("SELECT", self.db)
+
+    def _send(self, *args: Any) -> Any:
+        parts = [b"*%d\r\n" % len(args)]
+        for arg in args:
+            data = arg if isinstance(arg, bytes) else str(arg).encode()
+            parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+        self._sock.sendall(b"".join(parts))
+        return self._read_reply()
+
+    def _read_reply(self) -> Any:
+        line = self._reader.readline()
+        if not line:
+            raise ConnectionError("Connection closed by server")
+        kind, rest = line[:1], line[1:-2]
+        if kind == b"+":
+            return rest.decode()
+        if kind == b"-":
+            raise RESPError(rest.decode())
+        if kind == b":":
+            return int(rest)
+        if kind == b"$":
+            length = int(rest)
+            return None if length < 0 else self._reader.read(length + 2)[:-2]
+        if kind == b"*":
+            count = int(rest)
+            return None if count < 0 else [self._read_reply() for _ in range(count)]
+        raise RESPError(f"Unexpected reply {line!r}")
+
+    def command(self, *args: Any) -> Any:
+        """Send one command and return its decoded reply"""
+        if self._sock is None:
+            self._connect()
+        try:
+            return self._send(*args)
+        except (OSError, ConnectionError):
+            self.close()
+            raise
+
+    def close(self) -> None:
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+        self._sock = None
+        self._reader = None
+
+
+class RedisStore:
+    """Namespaced key/value rows in Redis, a drop-in for PersistentStore.
+
+    Each row is one string key `<prefix>:<namespace>:<key>` holding the value
+    and its timestamps as JSON. Redis expires it `retention` seconds after
+    the row's own expiry, so there is nothing to compact. Like
+    PersistentStore, errors are logged and never raised to the caches.
+
+    The caches call the store from the event loop, so it is kept off the
+    request path: writes and deletes are queued and sent by a background
+    thread (at most `max_pending` waiting; more are dropped, as are writes
+    while the writer's own breaker is open), and reads,
+    which the caches only make on a local miss, wait at most `timeout`
+    seconds. After `failure_threshold` failed reads a circuit breaker skips
+    Redis (a local miss) for `recovery_timeout` seconds, so an unreachable
+    or slow server costs the loop a few timeouts, not one per request.
+    """
+
+    def __init__(self, url: str, retention: float = 86400.0, prefix: str = "trmnl",
+                 client: Optional[RESPClient] = None, timeout: float = 0.1, failure_threshold: int = 3,
+                 recovery_timeout: float = 30.0, max_pending: int = 10000):
+        self.client = client or RESPClient.from_url(url, timeout=timeout)
+        self.url = url
+        self.retention = retention
+        self.prefix = prefix
+        self.breaker = CircuitBreaker("redis", failure_threshold, recovery_timeout)
+        self.stats = {
+            "writes": 0,
+            "deletes": 0,
+            "write_errors": 0,
+            "dropped_writes": 0,
+            "reads": 0,
+            "read_hits": 0,
+            "read_errors": 0,
+            "skipped_reads": 0,
+            "loaded": 0,
+        }
+        # The writer thread has its own connection (and breaker); sockets are not shared across threads
+        self._write_client = RESPClient.from_url(url)
+        self._write_client.command("PING")  # Fail at startup, not on the first request
+        self._write_breaker = CircuitBreaker("redis writes", failure_threshold, recovery_timeout)
+        self._pending: "queue.Queue[Optional[Tuple[Any, ...]]]" = queue.Queue(max_pending)
+        self._writer = threading.Thread(target=self._write_loop, name="redis-store-writer", daemon=True)
+        self._writer.start()
+
+    def _key(self, namespace: str, key: Hashable) -> str:
+        return f"{self.prefix}:{namespace}:{encode_key(key)}"
+
+    def _enqueue(self, command: Tuple[Any, ...]) -> None:
+        try:
+            self._pending.put_nowait(command)
+        except queue.Full:
+            self.stats["dropped_writes"] += 1
+
+    def _write_loop(self) -> None:
+        while True:
+            command = self._pending.get()
+            try:
+                if command is None:
+                    return
+                self._write(command)
+            finally:
+                self._pending.task_done()
+
+    def _write(self, command: Tuple[Any, ...]) -> None:
+        if not self._write_breaker.allow_request():
+            self.stats["dropped_writes"] += 1
+            return
+        try:
+            self._write_client.command(*command)
+        except (OSError, ConnectionError, RESPError) as e:
+            self._write_breaker.record_failure()
+            self.stats["write_errors"] += 1
+            logger.error(f"💾 Redis {command[0]} {command[1]} failed: {str(e)}")
+            return
+        self._write_breaker.record_success()
+        self.stats["deletes" if command[0] == "DEL" else "writes"] += 1
+
+    def put(self, namespace: str, key: Hashable, value: Any, stored_at: float, expires_at: float) -> None:
+        """Queue an insert or replace of a row (errors are logged, never raised to the caller)"""
+        ttl_ms = int((expires_at + self.retention - time.time()) * 1000)
+        if ttl_ms <= 0:
+            return
+        try:
+            row = json.dumps({"value": value, "stored_at": stored_at, "expires_at": expires_at}, default=str)
+        except (TypeError, ValueError) as e:
+            self.stats["write_errors"] += 1
+            logger.error(f"💾 Failed to encode {namespace} entry {key} for Redis: {str(e)}")
+            return
+        self._enqueue(("SET", self._key(namespace, key), row, "PX", ttl_ms))
+
+    def delete(self, namespace: str, key: Hashable) -> None:
+        self._enqueue(("DEL", self._key(namespace, key)))
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Wait until queued writes have been sent; False if they are still pending after `timeout`"""
+        deadline = time.monotonic() + timeout
+        while self._pending.unfinished_tasks:
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.001)
+        return True
+
+    @staticmethod
+    def _decode_row(raw: bytes) -> Tuple[Any, float, float]:
+        row = json.loads(raw)
+        return row["value"], row["stored_at"], row["expires_at"]
+
+    def get(self, namespace: str, key: Hashable) -> Optional[Tuple[Any, float, float]]:
+        """Return (value, stored_at, expires_at) for one row, or None (errors and an open breaker count as a miss)"""
+        if not self.breaker.allow_request():
+            self.stats["skipped_reads"] += 1
+            return None
+        self.stats["reads"] += 1
+        try:
+            raw = self.client.command("GET", self._key(namespace, key))
+        except (OSError, ConnectionError, RESPError) as e:
+            self.breaker.record_failure()
+            self.stats["read_errors"] += 1
+            logger.error(f"💾 Failed to read {namespace} entry {key} from Redis: {str(e)}")
+            return None
+        self.breaker.record_success()
+        if raw is None:
+            return None
+        try:
+            row = self._decode_row(raw)
+        except (ValueError, KeyError) as e:
+            self.stats["read_errors"] += 1
+            logger.error(f"💾 Unreadable {namespace} entry {key} in Redis: {str(e)}")
+            return None
+        self.stats["read_hits"] += 1
+        return row
+
+    def load(self, namespace: str) -> List[Tuple[Hashable, Any, float, float]]:
+        """Return (key, value, stored_at, expires_at) rows for a namespace, oldest first.
+
+        Runs at startup, on its own connection with the default (longer) timeout.
+        """
+        pattern = f"{self.prefix}:{namespace}:*"
+        entries = []
+        client = RESPClient.from_url(self.url)
+        try:
+            cursor = b"0"
+            while True:
+                cursor, keys = client.command("SCAN", cursor, "MATCH", pattern, "COUNT", 500)
+                if keys:
+                    for raw_key, raw in zip(keys, client.command("MGET", *keys)):
+                        if raw is None:
+                            continue
+                        try:
+                            key = decode_key(raw_key.decode()[len(pattern) - 1:])
+                            entries.append((key, *self._decode_row(raw)))
+                        except (ValueError, KeyError):
+                            logger.warning(f"💾 Skipping unreadable Redis entry {raw_key!r}")
+                if cursor in (b"0", "0"):
+                    break
+        except (OSError, ConnectionError, RESPError) as e:
+            self.stats["read_errors"] += 1
+            logger.error(f"💾 Failed to load {namespace} entries from Redis: {str(e)}")
+        finally:
+            client.close()
+        entries.sort(key=lambda entry: entry[2])
+        self.stats["loaded"] += len(entries)
+        logger.info(f"💾 Loaded {len(entries)} {namespace} entries from Redis")
+        return entries
+
+    def compact(self) -> int:
+        """Nothing to do: Redis expires rows itself"""
+        return 0
+
+    def close(self) -> None:
+        """Send what is still queued (briefly), then stop the writer and close both connections"""
+        self.flush(timeout=2.0)
+        self._enqueue(None)
+        self._writer.join(timeout=1.0)
+        self._write_client.close()
+        self.client.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Read/write counters and the read breaker"""
+        parsed = urlparse(self.url)
+        return {
+            "backend": "redis",
+            "server": f"{parsed.hostname}:{parsed.port or 6379}{parsed.path}",
+            **self.stats,
+            "pending_writes": self._pending.unfinished_tasks,
+            "read_breaker": self.breaker.get_stats(),
+        }
@@ -0,0 +1,190 @@
+"""
+Shared retry policy for upstream calls: exponential backoff with full jitter,
+Retry-After support and a process-wide retry budget
+"""
+
+import time
+import random
+import asyncio
+import logging
+import httpx
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from typing import Dict, Any, Optional, Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+# Statuses worth retrying for requests that are safe to repeat
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+# Statuses where the server refused the request without processing it
+REFUSED_STATUSES = {429, 503}
+
+# Transport errors that happen before the request reaches the server
+NOT_SENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+
+class RetryBudget:
+    """Process-wide token bucket limiting retries to a fraction of traffic.
+
+    Every first attempt deposits `ratio` tokens and every retry spends one,
+    plus a small steady refill so low-traffic processes can still retry. During
+    an upstream outage the bucket drains and further retries are refused,
+    which keeps a failing upstream from being hit with a retry storm.
+    """
+
+    def __init__(self, ratio: float = 0.2, min_per_second: float = 0.1, max_tokens: float = 10.0):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.max_tokens = max_tokens
+        self.tokens = max_tokens
+        self._last_refill = time.monotonic()
+        self.denied = 0
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.max_tokens, self.tokens + (now - self._last_refill) * self.min_per_second)
+        self._last_refill = now
+
+    def record_request(self) -> None:
+        """Credit the budget for a first attempt"""
+        self._refill()
+        self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    def try_spend(self) -> bool:
+        """Take one retry from the budget, returning False if it is exhausted"""
+        self._refill()
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return True
+        self.denied += 1
+        return False
+
+    def get_stats(self) -> Dict[str, Any]:
+        self._refill()
+        return {
+            "tokens": round(self.tokens, 2),
+            "max_tokens": self.max_tokens,
+            "ratio": self.ratio,
+            "denied": self.denied,
+        }
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header (seconds or HTTP date) into seconds from now"""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+        if when.tzinfo is None:
+            when = when.replace(tzinfo=timezone.utc)
+        return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+class RetryPolicy:
+    """Retry an upstream call on transient failures"""
+
+    def __init__(
+        self,
+        name: str = "upstream",
+        max_retries: int = 3,
+        base_delay: float = 0.5,
+        max_delay: float = 10.0,
+        budget: Optional[RetryBudget] = None,
+    ):
+        self.name = name
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.budget = budget or RetryBudget()
+        self.stats = {
+            "calls": 0,
+            "retries": 0,
+            "retried_calls_succeeded": 0,
+            "gave_up": 0,
+            "budget_denied": 0,
+        }
+
+    def backoff(self, attempt: int) -> float:
+        """Full-jitter exponential backoff for the given retry number (0-based)"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    @staticmethod
+    def is_retryable_error(error: Exception, idempotent: bool) -> bool:
+        """Whether a transport error is safe to retry"""
+        if isinstance(error, NOT_SENT_ERRORS):
+            return True
+        # The request may have reached the server, so only repeat safe requests
+        return idempotent and isinstance(error, (httpx.TimeoutException, httpx.NetworkError,
+                                                 httpx.RemoteProtocolError))
+
+    @staticmethod
+    def is_retryable_status(status_code: int, idempotent: bool) -> bool:
+        """Whether a response status is safe to retry"""
+        if idempotent:
+            return status_code in RETRYABLE_STATUSES
+        return status_code in REFUSED_STATUSES
+
+    def _can_retry(self, attempt: int) -> bool:
+        if attempt >= self.max_retries:
+            return False
+        if not self.budget.try_spend():
+            self.stats["budget_denied"] += 1
+            logger.warning(f"🔁 Retry budget exhausted, not retrying {self.name}")
+            return False
+        return True
+
+    async def call(self, fn: Callable[[], Awaitable[httpx.Response]], idempotent: bool = True) -> httpx.Response:
+        """Call fn() and retry transient failures.
+
+        Returns the last response, even if it is an error status, so callers
+        keep their own raise_for_status() handling. Transport errors that are
+        not retried (or run out of retries) are re-raised.
+        """
+        self.stats["calls"] += 1
+        self.budget.record_request()
+        attempt = 0
+        while True:
+            try:
+                response = await fn()
+            except httpx.TransportError as e:
+                if not self.is_retryable_error(e, idempotent) or not self._can_retry(attempt):
+                    if attempt:
+                        self.stats["gave_up"] += 1
+                    raise
+                delay = self.backoff(attempt)
+                reason = type(e).__name__
+            else:
+                if not self.is_retryable_status(response.status_code, idempotent):
+                    if attempt:
+                        self.stats["retried_calls_succeeded"] += response.is_success
+                    return response
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                if retry_after is not None and retry_after > self.max_delay:
+                    # Upstream asked us to back off for longer than we're willing to wait
+                    self.stats["gave_up"] += 1
+                    return response
+                if not self._can_retry(attempt):
+                    if attempt:
+                        self.stats["gave_up"] += 1
+                    return response
+                delay = max(retry_after or 0.0, self.backoff(attempt))
+                reason = f"HTTP {response.status_code}"
+
+            attempt += 1
+            self.stats["retries"] += 1
+            logger.warning(f"🔁 Retrying {self.name} ({reason}), attempt {attempt}/{self.max_retries} in {delay:.2f}s")
+            await asyncio.sleep(delay)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get retry statistics for this upstream"""
+        return {
+            "max_retries": self.max_retries,
+            **self.stats,
+        }
@@ -0,0 +1,415 @@
+"""
+Multi-job scheduler: TRMNL webhook pushes for many plugin instances, each
+with its own location, webhook URL, view and interval, served by one task
+"""
+
+import json
+import math
+import time
+import zlib
+import heapq
+import random
+import asyncio
+import itertools
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Awaitable, Callable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+VIEWS = ("forecast", "current")
+
+# Upper bounds (seconds) of the lateness histogram buckets; later runs fall in the last, open bucket
+LATENESS_BUCKETS = (0.01, 0.1, 1.0, 5.0, 30.0, 60.0)
+
+
+@dataclass
+class ScheduledJob:
+    """One plugin instance to push to every `interval` seconds (adjustable at run time, see set_interval)"""
+    job_id: str
+    location: str
+    webhook_url: str
+    view: str = "forecast"
+    interval: float = 1800.0
+    # Run state, kept by the scheduler
+    current_interval: float = field(default=0.0, repr=False)  # Interval in effect (see set_interval)
+    next_run: float = field(default=0.0, repr=False)  # Monotonic deadline
+    last_deadline: float = field(default=0.0, repr=False)  # Deadline of the latest run
+    run_at: float = field(default=0.0, repr=False)  # Deadline plus this run's jitter
+    phase: float = field(default=0.0, repr=False)  # Stagger offset within the interval
+    off_schedule: bool = field(default=False, repr=False)  # Next run is an immediate first run, not a deadline
+    runs: int = field(default=0, repr=False)
+    failures: int = field(default=0, repr=False)
+    last_run: Optional[float] = field(default=None, repr=False)  # Wall clock
+    last_success: Optional[bool] = field(default=None, repr=False)
+
+    def __post_init__(self):
+        if self.view not in VIEWS:
+            raise ValueError(f"Job {self.job_id}: unknown view {self.view!r} (expected one of {', '.join(VIEWS)})")
+        if self.interval <= 0:
+            raise ValueError(f"Job {self.job_id}: interval must be positive")
+        self.current_interval = self.current_interval or self.interval
+
+
+def parse_jobs(config: Any) -> List[ScheduledJob]:
+    """Jobs from a parsed config: a list of job objects, or {"jobs": [...]}.
+
+    Each job needs "location" and "webhook_url"; "id", "view" ("forecast" or
+    "current") and "interval_minutes" are optional.
+    """
+    entries = config.get("jobs", []) if isinstance(config, dict) else config
+    if not isinstance(entries, list):
+        raise ValueError("Schedule config must be a list of jobs or an object with a \"jobs\" list")
+    jobs = []
+    for i, entry in enumerate(entries):
+        if not isinstance(entry, dict):
+            raise ValueError(f"Job {i + 1} must be an object, got {type(entry).__name__}")
+        for name in ("location", "webhook_url"):
+            if name not in entry:
+                raise ValueError(f"Job {i + 1} is missing '{name}'")
+            if not isinstance(entry[name], str) or not entry[name]:
+                raise ValueError(f"Job {i + 1}: {name} must be a non-empty string")
+        try:
+            interval = float(entry.get("interval_minutes", 30)) * 60
+        except (TypeError, ValueError):
+            raise ValueError(f"Job {i + 1}: interval_minutes must be a number, got {entry['interval_minutes']!r}")
+        jobs.append(ScheduledJob(
+            job_id=str(entry.get("id", f"job-{i + 1}")),
+            location=entry["location"],
+            webhook_url=entry["webhook_url"],
+            view=entry.get("view", "forecast"),
+            interval=interval
+        ))
+    ids = [job.job_id for job in jobs]
+    if len(set(ids)) != len(ids):
+        raise ValueError("Job ids must be unique")
+    return jobs
+
+
+def load_jobs(path: str) -> List[ScheduledJob]:
+    """Read jobs from a JSON file (see parse_jobs)"""
+    with open(path) as f:
+        return parse_jobs(json.load(f))
+
+
+class LatenessHistogram:
+    """How late runs started relative to their deadline, in fixed buckets"""
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENESS_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds: float) -> None:
+        seconds = max(seconds, 0.0)
+        index = next((i for i, bound in enumerate(self.buckets) if seconds <= bound), len(self.buckets))
+        self.counts[index] += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def get_stats(self) -> Dict[str, Any]:
+        count = sum(self.counts)
+        labels = [f"<={bound:g}s" for bound in self.buckets] + [f">{self.buckets[-1]:g}s"]
+        return {
+            "buckets": dict(zip(labels, self.counts)),
+            "count": count,
+            "avg_seconds": round(self.total / count, 4) if count else 0.0,
+            "max_seconds": round(self.max, 4),
+        }
+
+
+class JobScheduler:
+    """Runs jobs when due, from a min-heap ordered by next run time.
+
+    One task sleeps until the earliest job is due, starts every due job (at
+    most `max_concurrency` run at once) and pushes each back with its next
+    run time, so rescheduling is O(log n) however many jobs there are. Adding
+    or removing a job wakes the task. Superseded heap entries (removed or
+    re-added jobs) are dropped lazily when they surface. A job that is still
+    running when it is due again skips that run.
+
+    Jobs sharing an interval would otherwise all fire at the same instant.
+    With `stagger`, each job is shifted by a deterministic phase (crc32 of its
+    id modulo the interval), which spreads the jobs evenly across the
+    interval and keeps every job at the same point from one restart to the
+    next. Each run also starts up to `jitter` random seconds after its
+    deadline, so jobs that land on the same phase do not stay in lockstep.
+    The jitter does not move later deadlines.
+
+    Deadlines are absolute: the next one is the previous deadline plus the
+    interval, never "interval after the run finished", so run time does not
+    accumulate as drift. With `align` they sit on wall-clock boundaries
+    (multiples of the interval since the epoch, plus `offset` seconds), e.g.
+    :01, :16, :31 and :46 for a 15 minute interval and offset=60. Sleeping
+    uses the monotonic clock; each deadline is re-anchored to the wall clock
+    when it is computed, so clock steps or a suspended host cannot shift the
+    boundaries for good. Deadlines that pass without a run are counted as
+    missed, and how late each run started goes into a histogram.
+
+    Without `immediate_first_run` a new job first runs at its first deadline,
+    which can be up to a whole interval (plus its phase) away. With it, the
+    job runs as soon as it is added and then joins the deadlines it would
+    have had, from the first one at least half an interval later.
+
+    With a `prefetch` hook, the jobs starting together, plus every job due
+    within the next `prefetch_window` seconds, are handed to it as one batch
+    before they run (e.g. to fetch all their locations in one bulk request).
+    The next batch is only taken once that window has passed, so staggered
+    jobs are still batched rather than trickling in one by one. Runs wait for
+    the batch; a failed prefetch is logged and the runs go ahead without it.
+    """
+
+    def __init__(self, run_job: Callable[[ScheduledJob], Awaitable[bool]], max_concurrency: int = 10,
+                 clock: Callable[[], float] = time.monotonic, wall_clock: Callable[[], float] = time.time,
+                 align: bool = True, offset: float = 0.0, stagger: bool = True, jitter: float = 0.0,
+                 rng: Optional[random.Random] = None, immediate_first_run: bool = False,
+                 prefetch: Optional[Callable[[List[ScheduledJob]], Awaitable[None]]] = None,
+                 prefetch_window: float = 0.0):
+        self.run_job = run_job
+        self.clock = clock
+        self.wall_clock = wall_clock
+        self.align = align
+        self.offset = offset
+        self.stagger = stagger
+        self.jitter = jitter
+        self.immediate_first_run = immediate_first_run
+        self.prefetch = prefetch
+        self.prefetch_window = prefetch_window
+        self._prefetched_until = float("-inf")  # Jobs due before this were in the latest batch
+        self.rng = rng or random.Random()
+        self._jobs: Dict[str, ScheduledJob] = {}
+        self._heap: List[Tuple[float, int, str]] = []
+        self._entries: Dict[str, int] = {}  # Job id -> sequence number of its live heap entry
+        self._sequence = itertools.count()  # Also breaks ties so equal times never compare job ids
+        self._running: Dict[str, asyncio.Task] = {}
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._wakeup = asyncio.Event()
+        self.stats = {
+            "runs": 0,
+            "failures": 0,
+            "skipped_overlaps": 0,
+            "missed_deadlines": 0,
+            "prefetch_batches": 0,
+            "prefetched_jobs": 0,
+        }
+        self.lateness = LatenessHistogram()
+
+    def add(self, job: ScheduledJob, first_run: Optional[float] = None) -> None:
+        """Schedule a job (replacing one with the same id), first due at `first_run`.
+
+        By default the first run is now with `immediate_first_run`, otherwise
+        the job's first deadline (see _first_deadline).
+        """
+        job.phase = self.phase(job) if self.stagger else 0.0
+        job.off_schedule = first_run is None and self.immediate_first_run
+        if first_run is None:
+            first_run = self.clock() if self.immediate_first_run else self._first_deadline(job, self.clock())
+        job.next_run = first_run
+        self._jobs[job.job_id] = job
+        self._push(job)
+
+    def remove(self, job_id: str) -> Optional[ScheduledJob]:
+        self._entries.pop(job_id, None)
+        self._wakeup.set()
+        return self._jobs.pop(job_id, None)
+
+    def jobs(self) -> List[ScheduledJob]:
+        return sorted(self._jobs.values(), key=lambda job: job.run_at)
+
+    @staticmethod
+    def phase(job: ScheduledJob) -> float:
+        """Deterministic offset of `job` within its interval (millisecond resolution)"""
+        return zlib.crc32(job.job_id.encode()) % max(int(job.current_interval * 1000), 1) / 1000
+
+    def _push(self, job: ScheduledJob) -> None:
+        sequence = next(self._sequence)
+        self._entries[job.job_id] = sequence
+        # Bounded by half the interval so a run never reaches the job's next deadline
+        jitter = min(self.jitter, job.current_interval / 2)
+        job.run_at = job.next_run + (self.rng.uniform(0, jitter) if jitter > 0 else 0.0)
+        heapq.heappush(self._heap, (job.run_at, sequence, job.job_id))
+        self._wakeup.set()
+
+    def _is_live(self, entry: Tuple[float, int, str]) -> bool:
+        return self._entries.get(entry[2]) == entry[1]
+
+    def _pop_due(self, now: float) -> List[ScheduledJob]:
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            entry = heapq.heappop(self._heap)
+            if self._is_live(entry):
+                due.append(self._jobs[entry[2]])
+        return due
+
+    def next_delay(self) -> Optional[float]:
+        """Seconds until the earliest job is due (None without jobs)"""
+        while self._heap and not self._is_live(self._heap[0]):
+            heapq.heappop(self._heap)
+        if not self._heap:
+            return None
+        return max(self._heap[0][0] - self.clock(), 0.0)
+
+    def _next_boundary(self, job: ScheduledJob, after: float, nearest: bool = False) -> float:
+        """Monotonic time of the wall-clock boundary for `job` following the monotonic time `after`.
+
+        With `nearest`, `after` is taken to be a boundary already (a previous
+        deadline) and the one after it is returned, however far the wall
+        clock has moved by less than half an interval.
+        """
+        now, wall = self.clock(), self.wall_clock()
+        offset = self.offset + job.phase
+        periods = (wall + (after - now) - offset) / job.current_interval
+        boundary = (round(periods) if nearest else math.floor(periods)) + 1
+        return now + (boundary * job.current_interval + offset - wall)
+
+    def _first_deadline(self, job: ScheduledJob, after: float) -> float:
+        """First deadline after `after`: the next wall-clock boundary when aligned, else `after` plus the phase"""
+        return self._next_boundary(job, after) if self.align else after + job.phase
+
+    def _reschedule(self, job: ScheduledJob, now: float) -> None:
+        if job.off_schedule:
+            # After an immediate first run, join the deadlines the job would have had, skipping
+            # one that is too close to run again
+            job.off_schedule = False
+            deadline = self._first_deadline(job, job.next_run)
+            if deadline < job.next_run + job.current_interval / 2:
+                deadline += job.current_interval
+            job.next_run = deadline
+        elif self.align:
+            job.next_run = self._next_boundary(job, job.next_run, nearest=True)
+        else:
+            job.next_run += job.current_interval
+        if job.next_run <= now:
+            # Fell at least an interval behind (e.g. the host was suspended): skip the missed deadlines
+            missed = math.floor((now - job.next_run) / job.current_interval) + 1
+            job.next_run += missed * job.current_interval
+            self.stats["missed_deadlines"] += missed
+            logger.warning(f"⏰ Scheduled job {job.job_id} missed {missed} deadline(s)")
+        self._push(job)
+
+    def set_interval(self, job: ScheduledJob, interval: float) -> None:
+        """Change the interval of a scheduled job from its latest deadline on.
+
+        The pending deadline is replaced by the first one on the new
+        interval's grid at least half the new interval after the latest
+        deadline (and after now), so a run can call this to pick its own
+        next interval without the job running twice in quick succession.
+        """
+        if interval <= 0 or interval == job.current_interval or self._jobs.get(job.job_id) is not job:
+            return
+        job.current_interval = interval
+        if self.stagger:
+            job.phase = self.phase(job)
+        now = self.clock()
+        if self.align:
+            job.next_run = self._next_boundary(job, max(job.last_deadline + interval / 2, now))
+        else:
+            job.next_run = job.last_deadline + interval
+            if job.next_run <= now:
+                job.next_run += (math.floor((now - job.next_run) / interval) + 1) * interval
+        self._push(job)
+
+    def _start_prefetch(self, due: List[ScheduledJob], now: float) -> Optional[asyncio.Future]:
+        """Hand the due jobs, and those due within the window, to the prefetch hook as one batch"""
+        if self.prefetch is None or now < self._prefetched_until:
+            return None
+        horizon = now + self.prefetch_window
+        due_ids = {job.job_id for job in due}
+        batch = due + [job for job in self._jobs.values() if job.job_id not in due_ids and job.run_at <= horizon]
+        self._prefetched_until = horizon
+        if len(batch) < 2:
+            return None
+        self.stats["prefetch_batches"] += 1
+        self.stats["prefetched_jobs"] += len(batch)
+        return asyncio.ensure_future(self._prefetch(batch))
+
+    async def _prefetch(self, batch: List[ScheduledJob]) -> None:
+        try:
+            await self.prefetch(batch)
+        except Exception as e:
+            logger.error(f"❌ Prefetch for {len(batch)} scheduled jobs failed, running them without it: {str(e)}")
+
+    def start_due(self) -> List[asyncio.Task]:
+        """Reschedule every job that is due now and start its run; returns the started tasks"""
+        now = self.clock()
+        started = []
+        due = self._pop_due(now)
+        # Taken before rescheduling, while the due jobs' run_at is still the deadline being run
+        batch = self._start_prefetch([job for job in due if job.job_id not in self._running], now) if due else None
+        for job in due:
+            lateness = now - job.run_at
+            job.last_deadline = job.next_run
+            self._reschedule(job, now)
+            if job.job_id in self._running:
+                self.stats["skipped_overlaps"] += 1
+                self.stats["missed_deadlines"] += 1
+                logger.warning(f"⏭️ Scheduled job {job.job_id} is still running, skipping this run")
+                continue
+            self.lateness.record(lateness)
+            task = asyncio.ensure_future(self._run(job, batch))
+            self._running[job.job_id] = task
+            task.add_done_callback(lambda done, job_id=job.job_id: self._running.pop(job_id, None))
+            started.append(task)
+        return started
+
+    async def _run(self, job: ScheduledJob, batch: Optional[asyncio.Future] = None) -> None:
+        if batch is not None:
+            await batch
+        async with self._semaphore:
+            try:
+                success = await self.run_job(job)
+            except Exception as e:
+                logger.error(f"❌ Scheduled job {job.job_id} ({job.location}) failed: {str(e)}")
+                success = False
+        job.runs += 1
+        job.last_run = time.time()
+        job.last_success = success
+        self.stats["runs"] += 1
+        if not success:
+            job.failures += 1
+            self.stats["failures"] += 1
+
+    async def run_forever(self) -> None:
+        """Serve all jobs from this one task"""
+        while True:
+            self.start_due()
+            # Anything added from here on sets the event again
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.next_delay())
+            except asyncio.TimeoutError:
+                pass
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Per-job schedule and outcome"""
+        now, wall = self.clock(), self.wall_clock()
+        return {
+            **self.stats,
+            "aligned": self.align,
+            "offset_seconds": self.offset,
+            "staggered": self.stagger,
+            "immediate_first_run": self.immediate_first_run,
+            "prefetch_window_seconds": self.prefetch_window if self.prefetch is not None else None,
+            "jitter_seconds": self.jitter,
+            "lateness": self.lateness.get_stats(),
+            "job_count": len(self._jobs),
+            "running": len(self._running),
+            "jobs": [
+                {
+                    "id": job.job_id,
+                    "location": job.location,
+                    "view": job.view,
+                    "interval_seconds": job.interval,
+                    "current_interval_seconds": job.current_interval,
+                    "phase_seconds": job.phase,
+                    "next_run_in_seconds": round(max(job.run_at - now, 0.0), 1),
+                    "next_run_at": datetime.fromtimestamp(wall + job.run_at - now, timezone.utc).isoformat(),
+                    "runs": job.runs,
+                    "failures": job.failures,
+                    "last_success": job.last_success,
+                }
+                for job in self.jobs()
+            ],
+        }
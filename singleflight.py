@@ -0,0 +1,55 @@
+"""
+Single-flight request coalescing: concurrent callers asking for the same key
+share one in-flight upstream call instead of each making their own
+"""
+
+import asyncio
+import logging
+from typing import Dict, Any, Awaitable, Callable, Hashable
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    """De-duplicate concurrent async calls that share a key"""
+
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+        self.executions = 0
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Run fn() once for all concurrent callers with the same key.
+
+        The call runs in its own task so that one caller being cancelled (for
+        example a client disconnecting) does not cancel it for the others.
+        Every caller receives the same result or the same exception.
+        """
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda done, key=key: self._forget(key, done))
+            self.executions += 1
+        else:
+            self.coalesced += 1
+            logger.debug(f"Coalesced request for {key}")
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: asyncio.Future) -> None:
+        """Drop a finished call so the next caller starts a fresh one"""
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # Mark the exception as retrieved in case every caller was cancelled
+        if not task.cancelled():
+            task.exception()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get coalescing statistics"""
+        total = self.executions + self.coalesced
+        return {
+            "upstream_calls": self.executions,
+            "coalesced_calls": self.coalesced,
+            "in_flight": len(self._calls),
+            "coalesced_ratio": round(self.coalesced / total, 3) if total else 0.0,
+        }
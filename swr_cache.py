@@ -0,0 +1,123 @@
+"""
+Stale-while-revalidate cache: answer from memory immediately and refresh in
+the background once the value passes a soft TTL
+"""
+
+import time
+import asyncio
+import logging
+from typing import Dict, Any, Awaitable, Callable, Hashable, Optional, Tuple
+
+from singleflight import SingleFlight
+from persistent_store import PersistentStore
+
+logger = logging.getLogger(__name__)
+
+
+class StaleWhileRevalidateCache:
+    """In-memory values with a soft and a hard TTL.
+
+    Younger than `soft_ttl`: served as is. Between the two TTLs: served
+    immediately while one background refresh runs. Older than `hard_ttl` (or
+    missing): the caller waits for a fresh value. Loads for the same key are
+    single-flighted, so a blocking load and a background refresh never run
+    side by side.
+    """
+
+    def __init__(self, soft_ttl: float = 300.0, hard_ttl: float = 1800.0):
+        self.soft_ttl = soft_ttl
+        self.hard_ttl = hard_ttl
+        self._values: Dict[Hashable, Tuple[Any, float]] = {}
+        self._refreshes: Dict[Hashable, asyncio.Task] = {}
+        self.single_flight = SingleFlight()
+        self.stats = {
+            "fresh_hits": 0,
+            "stale_hits": 0,
+            "blocking_loads": 0,
+            "background_refreshes": 0,
+            "refresh_failures": 0,
+            "shared_hits": 0,
+        }
+        self.store: Optional[PersistentStore] = None
+        self.namespace = "swr"
+
+    def attach_store(self, store: PersistentStore, namespace: str) -> int:
+        """Reload values younger than the hard TTL and write through to the store from now on"""
+        self.store = store
+        self.namespace = namespace
+        now = time.time()
+        loaded = 0
+        for key, value, produced_at, expires_at in store.load(namespace):
+            if now < expires_at:
+                self._values[key] = (value, produced_at)
+                loaded += 1
+        return loaded
+
+    async def get(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Tuple[Any, float]:
+        """Return (value, age in seconds) for a key, loading or refreshing it as needed"""
+        cached = self._values.get(key)
+        now = time.time()
+        if (cached is None or now - cached[1] >= self.soft_ttl) and self.store is not None:
+            cached = self._read_through(key, cached)
+        if cached is None or now - cached[1] >= self.hard_ttl:
+            self.stats["blocking_loads"] += 1
+            value = await self.single_flight.do(key, lambda: self._load(key, loader))
+            return value, time.time() - self._values[key][1]
+
+        value, produced_at = cached
+        age = now - produced_at
+        if age < self.soft_ttl:
+            self.stats["fresh_hits"] += 1
+        else:
+            self.stats["stale_hits"] += 1
+            if key not in self._refreshes:
+                self.stats["background_refreshes"] += 1
+                task = asyncio.ensure_future(self._refresh(key, loader))
+                self._refreshes[key] = task
+                task.add_done_callback(lambda done, key=key: self._refreshes.pop(key, None))
+        return value, age
+
+    def _read_through(self, key: Hashable, cached: Optional[Tuple[Any, float]]) -> Optional[Tuple[Any, float]]:
+        """Prefer a newer value another worker put in the shared store over our own"""
+        row = self.store.get(self.namespace, key)
+        if row is None or (cached is not None and row[1] <= cached[1]):
+            return cached
+        self._values[key] = (row[0], row[1])
+        self.stats["shared_hits"] += 1
+        return self._values[key]
+
+    async def _load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        value = await loader()
+        produced_at = time.time()
+        self._values[key] = (value, produced_at)
+        if self.store is not None:
+            self.store.put(self.namespace, key, value, produced_at, produced_at + self.hard_ttl)
+        return value
+
+    async def _refresh(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> None:
+        try:
+            await self.single_flight.do(key, lambda: self._load(key, loader))
+            logger.info(f"🔄 Refreshed {key} in the background")
+        except Exception as e:
+            # Keep serving the previous value until the hard TTL
+            self.stats["refresh_failures"] += 1
+            logger.error(f"❌ Background refresh of {key} failed: {str(e)}")
+
+    def invalidate(self, key: Optional[Hashable] = None) -> None:
+        """Drop one value (or all) so the next request loads it again"""
+        keys = list(self._values) if key is None else [key]
+        for dropped in keys:
+            self._values.pop(dropped, None)
+            if self.store is not None:
+                self.store.delete(self.namespace, dropped)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Hit counts and current value ages"""
+        now = time.time()
+        return {
+            **self.stats,
+            "soft_ttl_seconds": self.soft_ttl,
+            "hard_ttl_seconds": self.hard_ttl,
+            "refreshing": len(self._refreshes),
+            "ages_seconds": {str(key): round(now - produced_at, 1) for key, (_, produced_at) in self._values.items()},
+        }
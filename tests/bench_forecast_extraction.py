@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Benchmark full json.loads vs selective forecast extraction
+
+Builds synthetic WeatherAPI forecast bodies (24 hour objects per day) and
+compares parse time and peak allocated memory when decoding everything
+versus skipping the hourly arrays.
+
+Usage: python3 tests/bench_forecast_extraction.py [iterations]
+"""
+
+import os
+import sys
+import json
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from forecast_extractor import extract_forecast_summary
+
+def make_body(days: int) -> bytes:
+    hour = {
+        "time_epoch": 1700000000, "time": "2024-01-01 00:00", "temp_c": 10.5, "temp_f": 50.9,
+        "is_day": 0, "condition": {"text": "Patchy rain nearby", "icon": "//cdn.weatherapi.com/x.png", "code": 1063},
+        "wind_mph": 8.1, "wind_kph": 13.0, "wind_degree": 240, "wind_dir": "WSW", "pressure_mb": 1012.0,
+        "precip_mm": 0.1, "humidity": 84, "cloud": 75, "feelslike_c": 8.9, "windchill_c": 8.9,
+        "heatindex_c": 10.5, "dewpoint_c": 7.9, "will_it_rain": 0, "chance_of_rain": 62,
+        "will_it_snow": 0, "chance_of_snow": 0, "vis_km": 10.0, "gust_kph": 20.5, "uv": 0,
+    }
+    body = {
+        "location": {"name": "London", "tz_id": "Europe/London", "localtime_epoch": 1700000000},
+        "current": {"temp_c": 11, "condition": {"text": "Partly cloudy"}, "last_updated_epoch": 1700000000},
+        "forecast": {"forecastday": [
+            {"date": "2024-01-01", "day": {"maxtemp_c": 13, "mintemp_c": 6, "daily_chance_of_rain": 62},
+             "astro": {"sunrise": "08:00 AM", "sunset": "04:00 PM"}, "hour": [hour] * 24}
+            for _ in range(days)
+        ]}
+    }
+    return json.dumps(body).encode()
+
+def measure(fn, body: bytes, iterations: int):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn(body)
+    elapsed = (time.perf_counter() - start) / iterations
+    tracemalloc.start()
+    fn(body)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed * 1000, peak / 1024
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    print("🚀 Forecast Extraction Benchmark")
+    print("=" * 72)
+    print(f"{'days':>4} {'body KB':>8} | {'json.loads ms':>13} {'peak KB':>8} | {'extractor ms':>12} {'peak KB':>8}")
+    for days in (1, 3, 14):
+        body = make_body(days)
+        full_ms, full_kb = measure(json.loads, body, iterations)
+        sel_ms, sel_kb = measure(extract_forecast_summary, body, iterations)
+        print(f"{days:>4} {len(body) / 1024:>8.1f} | {full_ms:>13.3f} {full_kb:>8.1f} | {sel_ms:>12.3f} {sel_kb:>8.1f}")
+    print("=" * 72)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Benchmark fan-out latency over HTTP/1.1 vs HTTP/2 against local stub servers
+
+Starts a plain HTTP/1.1 stub and a cleartext HTTP/2 (h2c) stub on localhost,
+both answering every request after a fixed simulated upstream delay, then
+fires the same burst of concurrent requests at each through HTTPClientPool.
+
+Requires the optional 'h2' package (pip install "httpx[http2]").
+
+Usage: python3 tests/bench_http2.py [requests] [delay_ms] [max_connections]
+"""
+
+import os
+import sys
+import time
+import asyncio
+import statistics
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from http_clients import HTTPClientPool, http2_available
+
+BODY = b'{"location": {"name": "London"}, "current": {"temp_c": 11}}'
+
+class H1Stub:
+    """Minimal keep-alive HTTP/1.1 server answering each request after a delay"""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.connections = 0
+
+    async def handle(self, reader, writer):
+        self.connections += 1
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                length = 0
+                for line in head.split(b"\r\n"):
+                    if line.lower().startswith(b"content-length:"):
+                        length = int(line.split(b":", 1)[1])
+                if length:
+                    await reader.readexactly(length)
+                await asyncio.sleep(self.delay)
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                    b"Content-Length: " + str(len(BODY)).encode() + b"\r\n\r\n" + BODY
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+class H2StubProtocol(asyncio.Protocol):
+    """Minimal h2c (prior knowledge) server answering each stream after a delay"""
+
+    def __init__(self, stub):
+        import h2.config
+        import h2.connection
+        self.stub = stub
+        self.conn = h2.connection.H2Connection(
+            config=h2.config.H2Configuration(client_side=False)
+        )
+
+    def connection_made(self, transport):
+        self.stub.connections += 1
+        self.transport = transport
+        self.conn.initiate_connection()
+        transport.write(self.conn.data_to_send())
+
+    def data_received(self, data):
+        import h2.events
+        for event in self.conn.receive_data(data):
+            if isinstance(event, h2.events.RequestReceived):
+                asyncio.ensure_future(self.respond(event.stream_id))
+            elif isinstance(event, h2.events.DataReceived):
+                self.conn.acknowledge_received_data(event.flow_controlled_length, event.stream_id)
+        self.transport.write(self.conn.data_to_send())
+
+    async def respond(self, stream_id):
+        await asyncio.sleep(self.stub.delay)
+        try:
+            self.conn.send_headers(stream_id, [
+                (":status", "200"),
+                ("content-type", "application/json"),
+                ("content-length", str(len(BODY))),
+            ])
+            self.conn.send_data(stream_id, BODY, end_stream=True)
+            self.transport.write(self.conn.data_to_send())
+        except Exception:
+            pass  # Stream was reset by the client
+
+class H2Stub:
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.connections = 0
+
+async def fan_out(pool: HTTPClientPool, url: str, count: int):
+    """Fire `count` concurrent GETs and return (wall time, per-request latencies)"""
+    async def one():
+        start = time.perf_counter()
+        response = await pool.request("GET", url, params={"q": "London"})
+        response.raise_for_status()
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    latencies = await asyncio.gather(*[one() for _ in range(count)])
+    return time.perf_counter() - start, latencies
+
+def report(label: str, wall: float, latencies, connections: int, versions):
+    latencies = sorted(latencies)
+    p50 = statistics.median(latencies) * 1000
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000
+    print(f"{label:<10} wall={wall * 1000:7.1f}ms  p50={p50:7.1f}ms  p99={p99:7.1f}ms  "
+          f"connections={connections:<3} versions={versions}")
+
+async def run(count: int, delay: float, max_connections: int):
+    loop = asyncio.get_running_loop()
+
+    h1 = H1Stub(delay)
+    h1_server = await asyncio.start_server(h1.handle, "127.0.0.1", 0)
+    h1_url = f"http://127.0.0.1:{h1_server.sockets[0].getsockname()[1]}/v1/current.json"
+
+    h2 = H2Stub(delay)
+    h2_server = await loop.create_server(lambda: H2StubProtocol(h2), "127.0.0.1", 0)
+    h2_url = f"http://127.0.0.1:{h2_server.sockets[0].getsockname()[1]}/v1/current.json"
+
+    print(f"🏁 {count} concurrent requests, {delay * 1000:.0f}ms simulated upstream latency, "
+          f"max {max_connections} connections per host")
+    print("=" * 90)
+
+    # HTTP/1.1: one request per connection at a time, capped by the pool
+    h1_pool = HTTPClientPool(max_connections=max_connections)
+    await fan_out(h1_pool, h1_url, 1)  # Warm the pool so both runs start from an open connection
+    wall, latencies = await fan_out(h1_pool, h1_url, count)
+    versions = h1_pool.get_stats()["hosts"][h1_pool._origin(h1_url)]["http_versions"]
+    report("HTTP/1.1", wall, latencies, h1.connections, versions)
+    await h1_pool.close()
+
+    # HTTP/2: streams multiplexed over a single connection (h2c prior knowledge for the stub)
+    h2_pool = HTTPClientPool(max_connections=max_connections, http2=True,
+                             client_options={"http1": False})
+    await fan_out(h2_pool, h2_url, 1)
+    wall, latencies = await fan_out(h2_pool, h2_url, count)
+    versions = h2_pool.get_stats()["hosts"][h2_pool._origin(h2_url)]["http_versions"]
+    report("HTTP/2", wall, latencies, h2.connections, versions)
+    await h2_pool.close()
+
+    h1_server.close()
+    h2_server.close()
+
+def main():
+    if not http2_available():
+        print("❌ The 'h2' package is required: pip install 'httpx[http2]'")
+        sys.exit(1)
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    delay_ms = float(sys.argv[2]) if len(sys.argv) > 2 else 50
+    max_connections = int(sys.argv[3]) if len(sys.argv) > 3 else 10
+    asyncio.run(run(count, delay_ms / 1000, max_connections))
+
+if __name__ == "__main__":
+    main()
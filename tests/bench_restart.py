@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Benchmark cold-start upstream calls after a restart, with and without the
+persistent cache store
+
+Warms a service instance (TRMNL view forecasts, current weather and quotes
+for N locations) against local WeatherAPI and Gemini stubs, then builds
+fresh instances as a restarted process would and replays the same requests,
+counting how many reach the upstreams.
+
+Usage: python3 tests/bench_restart.py [locations]
+"""
+
+import os
+import sys
+import time
+import asyncio
+import tempfile
+import httpx
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from http_clients import HTTPClientPool
+from persistent_store import PersistentStore
+from fetch_profiles import get_profile
+
+CONDITIONS = ["Blowing snow", "Freezing fog", "Patchy sleet possible", "Thundery outbreaks possible"]
+
+def upstream_stub(calls):
+    """WeatherAPI and Gemini stubs that count every request"""
+    def handler(request: httpx.Request) -> httpx.Response:
+        if "generativelanguage" in request.url.host:
+            calls["gemini"] += 1
+            text = '{"quote": "The wind was a torrent of darkness.", "author": "Alfred Noyes", "work": "The Highwayman"}'
+            return httpx.Response(200, json={"candidates": [{"content": {"parts": [{"text": text}]}}]})
+        calls["weatherapi"] += 1
+        q = request.url.params["q"]
+        body = {
+            "location": {"name": q, "tz_id": "Europe/London"},
+            "current": {"temp_c": 3, "condition": {"text": CONDITIONS[len(q) % len(CONDITIONS)]},
+                        "last_updated_epoch": int(time.time()) - 120}
+        }
+        if request.url.path.endswith("forecast.json"):
+            body["forecast"] = {"forecastday": [{"day": {"maxtemp_c": 5}, "astro": {}, "hour": []}]}
+        return httpx.Response(200, json=body)
+    return httpx.MockTransport(handler)
+
+def build_services(calls, store_path=None):
+    """Fresh service instances, as after a process restart"""
+    from main import WeatherAPIService
+    from gemini_service import GeminiQuoteService
+    from location_index import LocationIndex
+    pool = HTTPClientPool(transport=upstream_stub(calls))
+    locations = LocationIndex()
+    weather = WeatherAPIService("test_key", pool, locations=locations)
+    gemini = GeminiQuoteService("test_key", pool, locations=locations)
+    store = None
+    if store_path:
+        store = PersistentStore(store_path)
+        # Cached entries are keyed on canonical locations, so the alias index is restored too
+        locations.attach_store(store)
+        weather.cache.attach_store(store)
+        gemini.attach_store(store)
+    return weather, gemini, store
+
+async def serve(weather, gemini, locations):
+    """The requests a device fleet makes right after startup"""
+    for location in locations:
+        forecast = await weather.fetch(location, get_profile("trmnl_view"))
+        await weather.fetch(location, get_profile("quote"))
+        await gemini.get_weather_quote(location, {
+            "condition_text": forecast["current"]["condition"]["text"],
+            "temp_c": forecast["current"]["temp_c"],
+        })
+
+async def run(count):
+    locations = [f"City {i}" for i in range(count)]
+    store_path = os.path.join(tempfile.mkdtemp(), "cache.sqlite3")
+    results = {}
+    for label, path in (("no persistent store", None), ("persistent store", store_path)):
+        warm_calls = {"weatherapi": 0, "gemini": 0}
+        weather, gemini, store = build_services(warm_calls, path)
+        await serve(weather, gemini, locations)
+        if store is not None:
+            store.close()  # Commits the writes still queued, as on shutdown
+        restart_calls = {"weatherapi": 0, "gemini": 0}
+        start = time.perf_counter()
+        weather, gemini, _ = build_services(restart_calls, path)
+        await serve(weather, gemini, locations)
+        results[label] = (warm_calls, restart_calls, time.perf_counter() - start)
+    return results
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    print("🚀 Restart Benchmark")
+    print("=" * 72)
+    print(f"{count} locations: TRMNL view forecast + current weather + quote each")
+    results = asyncio.run(run(count))
+    for label, (warm, restart, elapsed) in results.items():
+        print(f"{label:>20} | first start: {warm['weatherapi']:>4} WeatherAPI {warm['gemini']:>4} Gemini"
+              f" | after restart: {restart['weatherapi']:>4} WeatherAPI {restart['gemini']:>4} Gemini"
+              f" ({elapsed * 1000:.0f}ms)")
+    print("=" * 72)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Benchmark scheduler fan-out: peak concurrent upstream calls when many jobs
+share an interval, fired together vs staggered by phase vs staggered with jitter
+
+Simulated time: the real JobScheduler decides when each job starts (fake
+monotonic and wall clocks), and each run is one upstream call of random
+duration. Peaks are for the unbounded demand; the wait column shows how
+long runs would queue behind SCHEDULER_MAX_CONCURRENCY.
+
+Usage: python3 tests/bench_scheduler_stagger.py [jobs] [hours]
+"""
+
+import os
+import sys
+import heapq
+import random
+import asyncio
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from scheduler import JobScheduler, ScheduledJob
+
+MAX_CONCURRENCY = 10
+MODES = (
+    ("together", {"stagger": False}),
+    ("staggered", {"stagger": True}),
+    ("stagger+jitter", {"stagger": True, "jitter": 10.0}),
+)
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def wall(self):
+        return 1_700_000_000.0 + self.now
+
+def simulate(job_count, hours, options):
+    """Start times of every run over `hours`, as the scheduler would issue them"""
+    clock = FakeClock()
+    starts = []
+
+    async def run_job(job):
+        starts.append(clock.now)
+        return True
+
+    async def run():
+        scheduler = JobScheduler(run_job, clock=clock, wall_clock=clock.wall, rng=random.Random(1), **options)
+        for i in range(job_count):
+            # Most devices refresh every 15 or 30 minutes
+            scheduler.add(ScheduledJob(f"device-{i}", "London", f"https://trmnl.test/{i}",
+                                       interval=900 if i % 3 else 1800))
+        while clock.now < hours * 3600:
+            clock.now += scheduler.next_delay()
+            await asyncio.gather(*scheduler.start_due())
+
+    asyncio.run(run())
+    return [start for start in starts if start < hours * 3600]
+
+def measure(starts, rng):
+    """Peak concurrent calls, busiest second, and p99/max queue wait under MAX_CONCURRENCY"""
+    calls = [(start, rng.uniform(0.3, 1.5)) for start in starts]
+    events = sorted([(start, 1) for start, _ in calls] + [(start + duration, -1) for start, duration in calls])
+    concurrent = peak = 0
+    for _, change in events:
+        concurrent += change
+        peak = max(peak, concurrent)
+    per_second = {}
+    for start, _ in calls:
+        per_second[int(start)] = per_second.get(int(start), 0) + 1
+    # Runs start in order as slots free up
+    free_at = [0.0] * MAX_CONCURRENCY
+    waits = []
+    for start, duration in sorted(calls):
+        slot = heapq.heappop(free_at)
+        begin = max(start, slot)
+        waits.append(begin - start)
+        heapq.heappush(free_at, begin + duration)
+    waits.sort()
+    return peak, max(per_second.values()), waits[int(len(waits) * 0.99)], waits[-1]
+
+def main():
+    job_count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    hours = float(sys.argv[2]) if len(sys.argv) > 2 else 2
+    print("🚀 Scheduler Stagger Benchmark")
+    print("=" * 72)
+    print(f"{job_count} jobs (15/30 min intervals) over {hours:g}h, 0.3-1.5s per upstream call, "
+          f"{MAX_CONCURRENCY} concurrent runs max")
+    for name, options in MODES:
+        starts = simulate(job_count, hours, options)
+        peak, busiest, p99_wait, max_wait = measure(starts, random.Random(2))
+        print(f"{name:>15} | {len(starts):>5} runs | peak {peak:>4} concurrent calls | "
+              f"{busiest:>4} starts in busiest second | queue wait p99 {p99_wait:6.1f}s max {max_wait:6.1f}s")
+    print("=" * 72)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Benchmark upstream calls with 1, 4 and 8 worker processes, with per-process
+caches only and with a shared SQLite or Redis cache store
+
+Each device (location) polls the TRMNL view and its quote several times;
+a load balancer sends every poll to a random worker. Workers are real
+processes started together, as uvicorn --workers would run them, talking to
+local WeatherAPI and Gemini stubs. The Redis backend uses the local
+Redis-protocol stand-in from tests/resp_server.py.
+
+Usage: python3 tests/bench_workers.py [locations] [polls per location]
+"""
+
+import os
+import sys
+import time
+import random
+import asyncio
+import tempfile
+import multiprocessing
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from http_clients import HTTPClientPool
+from persistent_store import PersistentStore
+from redis_store import RedisStore
+from fetch_profiles import get_profile
+from tests.bench_restart import upstream_stub
+from tests.resp_server import RESPServer
+
+WORKER_COUNTS = (1, 4, 8)
+
+def make_store(backend, target):
+    if backend == "sqlite":
+        return PersistentStore(target)
+    if backend == "redis":
+        return RedisStore(target)
+    return None
+
+def run_worker(backend, target, requests):
+    """One worker process: its own services, optionally attached to the shared store"""
+    from main import WeatherAPIService
+    from gemini_service import GeminiQuoteService
+    from location_index import LocationIndex
+    calls = {"weatherapi": 0, "gemini": 0}
+    pool = HTTPClientPool(transport=upstream_stub(calls))
+    locations = LocationIndex()
+    weather = WeatherAPIService("test_key", pool, locations=locations)
+    gemini = GeminiQuoteService("test_key", pool, locations=locations)
+    store = make_store(backend, target)
+    if store is not None:
+        locations.attach_store(store)
+        weather.cache.attach_store(store)
+        gemini.attach_store(store)
+
+    async def serve():
+        for location in requests:
+            forecast = await weather.fetch(location, get_profile("trmnl_view"))
+            await gemini.get_weather_quote(location, {
+                "condition_text": forecast["current"]["condition"]["text"],
+                "temp_c": forecast["current"]["temp_c"],
+                "location_id": locations.resolve(location),
+            })
+            # Polls from different devices arrive spread out in time
+            await asyncio.sleep(0.001)
+
+    asyncio.run(serve())
+    if store is not None:
+        store.close()
+    return calls
+
+def run_fleet(workers, backend, target, count, polls):
+    """Route every poll to a random worker and total the upstream calls of all workers"""
+    rng = random.Random(workers)
+    assigned = [[] for _ in range(workers)]
+    polls_in_order = [f"City {i}" for _ in range(polls) for i in range(count)]
+    for location in polls_in_order:
+        assigned[rng.randrange(workers)].append(location)
+    context = multiprocessing.get_context("fork")
+    with context.Pool(workers) as pool:
+        results = pool.starmap(run_worker, [(backend, target, requests) for requests in assigned])
+    return {upstream: sum(result[upstream] for result in results) for upstream in ("weatherapi", "gemini")}
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    polls = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    print("🚀 Worker Scaling Benchmark")
+    print("=" * 72)
+    print(f"{count} locations x {polls} polls (TRMNL view forecast + quote), random worker per poll")
+    server = RESPServer().start()
+    try:
+        for backend in ("per-process", "sqlite", "redis"):
+            for workers in WORKER_COUNTS:
+                if backend == "sqlite":
+                    target = os.path.join(tempfile.mkdtemp(), "cache.sqlite3")
+                else:
+                    target = server.url
+                    server.execute("FLUSHDB", [])
+                start = time.perf_counter()
+                calls = run_fleet(workers, backend, target, count, polls)
+                elapsed = time.perf_counter() - start
+                print(f"{backend:>12} | {workers} worker{'s' if workers > 1 else ' '} | "
+                      f"{calls['weatherapi']:>4} WeatherAPI {calls['gemini']:>4} Gemini calls ({elapsed:.1f}s)")
+    finally:
+        server.shutdown()
+        server.server_close()
+    print("=" * 72)
+
+if __name__ == "__main__":
+    main()
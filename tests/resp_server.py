@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Minimal Redis-protocol server used as a local stand-in for Redis by the
+cache store tests and benchmarks
+
+Implements the commands RedisStore uses: PING, AUTH, SELECT, GET, SET
+(with PX/EX), DEL, MGET, SCAN (MATCH, one page) and FLUSHDB.
+
+Usage: python3 tests/resp_server.py [port]
+"""
+
+import sys
+import time
+import fnmatch
+import threading
+import socketserver
+
+
+class RESPHandler(socketserver.StreamRequestHandler):
+    def read_command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        count = int(line[1:-2])
+        args = []
+        for _ in range(count):
+            length = int(self.rfile.readline()[1:-2])
+            args.append(self.rfile.read(length + 2)[:-2])
+        return args
+
+    def reply(self, value):
+        self.wfile.write(encode(value))
+
+    def handle(self):
+        while True:
+            args = self.read_command()
+            if args is None:
+                return
+            try:
+                self.reply(self.server.execute(args[0].upper().decode(), args[1:]))
+            except Exception as e:
+                self.wfile.write(f"-ERR {e}\r\n".encode())
+
+
+def encode(value) -> bytes:
+    if value is None:
+        return b"$-1\r\n"
+    if isinstance(value, str):
+        return f"+{value}\r\n".encode()
+    if isinstance(value, int):
+        return f":{value}\r\n".encode()
+    if isinstance(value, bytes):
+        return b"$%d\r\n%s\r\n" % (len(value), value)
+    return b"*%d\r\n" % len(value) + b"".join(encode(item) for item in value)
+
+
+class RESPServer(socketserver.ThreadingTCPServer):
+    """In-memory key/value server speaking enough RESP2 for RedisStore"""
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, port: int = 0):
+        super().__init__(("127.0.0.1", port), RESPHandler)
+        self.data = {}
+        self.expiry = {}
+        self.lock = threading.Lock()
+        self.commands = 0
+
+    @property
+    def url(self) -> str:
+        return f"redis://127.0.0.1:{self.server_address[1]}/0"
+
+    def start(self) -> "RESPServer":
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def _live(self, key):
+        expires = self.expiry.get(key)
+        if expires is not None and time.time() >= expires:
+            self.data.pop(key, None)
+            self.expiry.pop(key, None)
+        return self.data.get(key)
+
+    def execute(self, command, args):
+        with self.lock:
+            self.commands += 1
+            if command in ("PING", "AUTH", "SELECT", "FLUSHDB"):
+                if command == "FLUSHDB":
+                    self.data.clear()
+                    self.expiry.clear()
+                return "PONG" if command == "PING" else "OK"
+            if command == "GET":
+                return self._live(args[0])
+            if command == "MGET":
+                return [self._live(key) for key in args]
+            if command == "SET":
+                key, value = args[0], args[1]
+                self.data[key] = value
+                self.expiry.pop(key, None)
+                options = [arg.upper() for arg in args[2:]]
+                if b"PX" in options:
+                    self.expiry[key] = time.time() + int(args[2 + options.index(b"PX") + 1]) / 1000
+                elif b"EX" in options:
+                    self.expiry[key] = time.time() + int(args[2 + options.index(b"EX") + 1])
+                return "OK"
+            if command == "DEL":
+                removed = sum(1 for key in args if self.data.pop(key, None) is not None)
+                for key in args:
+                    self.expiry.pop(key, None)
+                return removed
+            if command == "SCAN":
+                pattern = args[args.index(b"MATCH") + 1].decode() if b"MATCH" in args else "*"
+                keys = [key for key in list(self.data) if self._live(key) is not None
+                        and fnmatch.fnmatchcase(key.decode(), pattern)]
+                return [b"0", keys]
+            raise ValueError(f"unknown command '{command}'")
+
+
+def main():
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 6379
+    server = RESPServer(port)
+    print(f"🧪 Redis stand-in listening on {server.url}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Test adaptive scheduled-push intervals: shorter in changing weather, longer
+when stable or at local night, within the configured bounds
+"""
+
+import os
+import sys
+import asyncio
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import pytz
+from datetime import datetime
+from adaptive_interval import AdaptiveIntervalPolicy
+from scheduler import JobScheduler, ScheduledJob
+
+# 2023-11-14 12:00 UTC, midday in London
+MIDDAY = datetime(2023, 11, 14, 12, 0, tzinfo=pytz.UTC)
+MIDNIGHT = datetime(2023, 11, 15, 0, 30, tzinfo=pytz.UTC)
+
+def weather(temp_c, condition="Partly cloudy", rain=10, tz_id="Europe/London"):
+    return {
+        "location": {"name": "London", "tz_id": tz_id},
+        "current": {"temp_c": temp_c, "condition": {"text": condition}},
+        "forecast": {"forecastday": [{"day": {"daily_chance_of_rain": rain}}]}
+    }
+
+def test_interval_decisions():
+    """Storms shorten the interval, stable weather lengthens it, night goes to the maximum"""
+    print("🌩️ Testing interval decisions")
+    policy = AdaptiveIntervalPolicy(min_interval=600, max_interval=7200)
+    job = ScheduledJob("kitchen", "London", "https://trmnl.test/a", interval=1800)
+
+    def decide(data, now=MIDDAY):
+        job.current_interval = policy.next_interval(job, data, now)
+        return job.current_interval
+
+    first = decide(weather(12))
+    stable = [decide(weather(12.3)) for _ in range(5)]
+    storm = decide(weather(7, "Moderate or heavy rain with thunder", rain=90))
+    night = decide(weather(7, "Moderate or heavy rain with thunder", rain=90), MIDNIGHT)
+    # 4 degrees over the 2 hour night interval is half a step per 30 minutes, plus the new condition
+    night_storm = decide(weather(3, "Heavy snow", rain=90), MIDNIGHT)
+    if (first == 1800 and stable == [2700, 4050, 6075, 7200, 7200] and storm == 600 and night == 7200
+            and night_storm == 720):
+        print(f"   ✅ First 1800s, stable {stable}, storm {storm}s, night {night}s, storm at night {night_storm}s")
+        return True
+    print(f"   ❌ first={first} stable={stable} storm={storm} night={night} night_storm={night_storm}")
+    return False
+
+def test_night_hours_use_location_timezone():
+    """Night is local to the location, including windows that wrap midnight"""
+    print("🌙 Testing local night hours")
+    policy = AdaptiveIntervalPolicy(night_start_hour=23, night_end_hour=6)
+    # 12:00 UTC is 21:00 in Tokyo and 07:00 in New York; 00:30 UTC is 09:30 in Tokyo
+    checks = [
+        policy.is_night("Europe/London", MIDNIGHT),
+        not policy.is_night("Europe/London", MIDDAY),
+        not policy.is_night("Asia/Tokyo", MIDNIGHT),
+        policy.is_night("America/New_York", datetime(2023, 11, 14, 7, 0, tzinfo=pytz.UTC)),
+        not policy.is_night("Not/AZone", MIDNIGHT),
+    ]
+    if all(checks):
+        print("   ✅ Night windows follow tz_id")
+        return True
+    print(f"   ❌ checks={checks}")
+    return False
+
+def test_bounds_respect_configured_interval():
+    """A job configured below the minimum or above the maximum keeps its own interval as the bound"""
+    print("📏 Testing bounds against configured intervals")
+    policy = AdaptiveIntervalPolicy(min_interval=600, max_interval=7200)
+    short = ScheduledJob("short", "London", "https://trmnl.test/a", interval=60)
+    long = ScheduledJob("long", "London", "https://trmnl.test/b", interval=4 * 3600)
+
+    def decide(job, data, now=MIDDAY):
+        job.current_interval = policy.next_interval(job, data, now)
+        return job.current_interval
+
+    short_first = decide(short, weather(12))
+    short_storm = decide(short, weather(7, "Moderate or heavy rain with thunder", rain=90))
+    long_first = decide(long, weather(12))
+    long_stable = decide(long, weather(12.1))
+    long_night = decide(long, weather(12.1), MIDNIGHT)
+    long_storm = decide(long, weather(4, "Moderate or heavy rain with thunder", rain=90))
+    if (short_first == 60 and short_storm == 60 and long_first == 4 * 3600 and long_stable == 4 * 3600
+            and long_night == 4 * 3600 and 600 <= long_storm < 3600):
+        print(f"   ✅ 1 min job stays at 60s, 4h job stays at 4h (storm {long_storm:.0f}s)")
+        return True
+    print(f"   ❌ short={short_first},{short_storm} long={long_first},{long_stable},{long_night},{long_storm}")
+    return False
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def wall(self):
+        return MIDNIGHT.timestamp() - 1800 + self.now
+
+def test_calls_saved_over_a_day():
+    """A day with a quiet night and an afternoon storm uses fewer pushes than the fixed cadence"""
+    print("📉 Testing calls saved against the fixed cadence")
+    clock = FakeClock()
+    policy = AdaptiveIntervalPolicy(min_interval=600, max_interval=7200)
+    pushes = []
+
+    def conditions(hours):
+        # The simulated day starts at midnight, and London is on UTC in November; a storm passes 15:00-17:00
+        local = hours % 24
+        if 15 <= local < 17:
+            return weather(10 - (local - 15) * 4, "Moderate or heavy rain with thunder" if local < 16 else "Heavy rain", 90)
+        return weather(11 + (0.2 if int(local) % 2 else 0))
+
+    async def run_job(job):
+        hours = clock.now / 3600
+        pushes.append(hours)
+        now = datetime.fromtimestamp(clock.wall(), pytz.UTC)
+        scheduler.set_interval(job, policy.next_interval(job, conditions(hours), now))
+        return True
+
+    scheduler = JobScheduler(run_job, clock=clock, wall_clock=clock.wall, stagger=False)
+    scheduler.add(ScheduledJob("kitchen", "London", "https://trmnl.test/a", interval=1800))
+
+    async def run():
+        while clock.now < 24 * 3600:
+            clock.now += scheduler.next_delay()
+            await asyncio.gather(*scheduler.start_due())
+
+    asyncio.run(run())
+    stats = policy.get_stats()
+    storm_gaps = [b - a for a, b in zip(pushes, pushes[1:]) if 15 <= a and b < 17]
+    fixed = 24 * 2
+    if len(pushes) < fixed and stats["calls_saved"] > 0 and storm_gaps and max(storm_gaps) <= 0.35:
+        print(f"   ✅ {len(pushes)} pushes vs {fixed} fixed, storm pushes every "
+              f"{min(storm_gaps) * 60:.0f}-{max(storm_gaps) * 60:.0f} min, stats: {stats}")
+        return True
+    print(f"   ❌ pushes={len(pushes)} storm_gaps={storm_gaps} stats={stats}")
+    return False
+
+def main():
+    """Run all adaptive interval tests"""
+    print("🚀 Adaptive Interval Test Suite")
+    print("=" * 50)
+
+    tests = [
+        test_interval_decisions,
+        test_night_hours_use_location_timezone,
+        test_bounds_respect_configured_interval,
+        test_calls_saved_over_a_day,
+    ]
+    passed = sum(1 for test in tests if test())
+
+    print("=" * 50)
+    print(f"📊 Results: {passed}/{len(tests)} tests passed")
+    sys.exit(0 if passed == len(tests) else 1)
+
+if __name__ == "__main__":
+    main()
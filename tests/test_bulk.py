@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Test WeatherAPI bulk requests against a local stub implementing the q=bulk format
+"""
+
+import os
+import sys
+import json
+import asyncio
+import httpx
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from http_clients import HTTPClientPool
+
+KNOWN = {"london": "London", "paris": "Paris", "tokyo": "Tokyo"}
+
+def location_body(q, with_forecast):
+    name = KNOWN.get(q.strip().lower())
+    if name is None:
+        return None
+    body = {"location": {"name": name}, "current": {"temp_c": len(name), "condition": {"text": "Sunny"}}}
+    if with_forecast:
+        body["forecast"] = {"forecastday": [{"day": {"maxtemp_c": 20}, "astro": {}, "hour": []}]}
+    return body
+
+def weatherapi_stub(requests_seen, bulk_allowed=True):
+    """Local WeatherAPI stub: single-location GETs and q=bulk POSTs with custom_id mapping"""
+    def handler(request: httpx.Request) -> httpx.Response:
+        with_forecast = request.url.path.endswith("forecast.json")
+        q = request.url.params.get("q")
+        requests_seen.append((request.method, q))
+        if q == "bulk":
+            if not bulk_allowed:
+                return httpx.Response(403, json={"error": {
+                    "code": 2009,
+                    "message": "API key does not have access to the resource."
+                }})
+            bulk = []
+            for item in json.loads(request.content)["locations"]:
+                query = {"custom_id": item["custom_id"], "q": item["q"]}
+                body = location_body(item["q"], with_forecast)
+                if body is None:
+                    query["error"] = {"code": 1006, "message": "No matching location found."}
+                else:
+                    query.update(body)
+                bulk.append({"query": query})
+            return httpx.Response(200, json={"bulk": bulk})
+        body = location_body(q, with_forecast)
+        if body is None:
+            return httpx.Response(400, json={"error": {"code": 1006, "message": "No matching location found."}})
+        return httpx.Response(200, json=body)
+    return httpx.MockTransport(handler)
+
+def make_service(requests_seen, bulk_allowed=True):
+    from main import WeatherAPIService
+    from retry_policy import RetryPolicy
+    return WeatherAPIService(
+        "test_key",
+        HTTPClientPool(transport=weatherapi_stub(requests_seen, bulk_allowed)),
+        RetryPolicy("weatherapi", max_retries=0)
+    )
+
+def test_bulk_maps_results_back():
+    """One bulk POST serves every location, results and errors mapped back to callers"""
+    print("📦 Testing bulk results mapping")
+
+    async def run():
+        seen = []
+        service = make_service(seen)
+        results = await service.get_forecast_bulk(["London", "paris ", "Tokyo", "Atlantis", "london"])
+        return seen, results
+
+    seen, results = asyncio.run(run())
+    ok = (
+        seen == [("POST", "bulk")]
+        and results["London"]["location"]["name"] == "London"
+        and results["london"] is results["London"]
+        and results["paris "]["location"]["name"] == "Paris"
+        and "forecast" in results["Tokyo"]
+        and results["Atlantis"]["error"]["code"] == 1006
+    )
+    if ok:
+        print("   ✅ 1 upstream request for 5 locations")
+        return True
+    print(f"   ❌ seen={seen} results={list(results)}")
+    return False
+
+def test_bulk_splits_into_chunks():
+    """Large location sets are split into bulk requests of the allowed size"""
+    print("✂️  Testing chunking")
+    from config import settings
+
+    async def run():
+        seen = []
+        service = make_service(seen)
+        original = settings.WEATHER_BULK_MAX_LOCATIONS
+        settings.WEATHER_BULK_MAX_LOCATIONS = 2
+        try:
+            results = await service.get_current_weather_bulk(["London", "Paris", "Tokyo", "Atlantis", "Nowhere"])
+        finally:
+            settings.WEATHER_BULK_MAX_LOCATIONS = original
+        return seen, results, service.get_stats()["bulk"]
+
+    seen, results, stats = asyncio.run(run())
+    if len(seen) == 3 and all(m == "POST" for m, _ in seen) and results["Tokyo"]["current"]["temp_c"] == 5:
+        print(f"   ✅ 3 bulk requests for 5 locations, stats: {stats}")
+        return True
+    print(f"   ❌ seen={seen}")
+    return False
+
+def test_falls_back_when_plan_lacks_bulk():
+    """Plans without bulk access fall back to per-location calls, then skip bulk entirely"""
+    print("↩️  Testing per-location fallback")
+
+    async def run():
+        seen = []
+        service = make_service(seen, bulk_allowed=False)
+        first = await service.get_current_weather_bulk(["London", "Paris", "Atlantis"])
+        seen_after_first = list(seen)
+        service.cache.invalidate()
+        await service.get_current_weather_bulk(["Tokyo", "Paris"])
+        return seen_after_first, seen[len(seen_after_first):], first, service.bulk_supported
+
+    first_seen, second_seen, results, supported = asyncio.run(run())
+    ok = (
+        first_seen[0] == ("POST", "bulk")
+        and sorted(q for _, q in first_seen[1:]) == ["Atlantis", "London", "Paris"]
+        and all(m == "GET" for m, _ in second_seen) and len(second_seen) == 2
+        and results["Atlantis"]["error"] == {"code": 1006, "message": "No matching location found."}
+        and results["London"]["current"]["temp_c"] == 6
+        and supported is False
+    )
+    if ok:
+        print("   ✅ Fell back once and remembered the plan limit")
+        return True
+    print(f"   ❌ first={first_seen} second={second_seen} supported={supported}")
+    return False
+
+def test_scheduled_jobs_prefetch_in_bulk():
+    """A batch of scheduled jobs is fetched with one bulk request per view; their runs hit the cache"""
+    print("🗓️  Testing scheduled job prefetch")
+    import main
+    from fetch_profiles import get_profile
+    from scheduler import ScheduledJob
+
+    async def run():
+        seen = []
+        service = make_service(seen)
+        original = main.weather_service
+        main.weather_service = service
+        try:
+            jobs = [ScheduledJob(f"job-{i}", location, f"https://trmnl.test/{i}", view=view)
+                    for i, (location, view) in enumerate([("London", "forecast"), ("Paris", "forecast"),
+                                                          ("Tokyo", "forecast"), ("Paris", "current")])]
+            await main.prefetch_scheduled_jobs(jobs)
+            prefetched = list(seen)
+            for job in jobs[:3]:
+                await service.fetch(job.location, get_profile("trmnl_view"))
+        finally:
+            main.weather_service = original
+        return prefetched, seen[len(prefetched):]
+
+    prefetched, later = asyncio.run(run())
+    # The single current-view job is left to its own run
+    if prefetched == [("POST", "bulk")] and later == []:
+        print("   ✅ 3 forecast jobs fetched in 1 bulk request, no calls from their runs")
+        return True
+    print(f"   ❌ prefetched={prefetched} later={later}")
+    return False
+
+def main():
+    """Run all bulk request tests"""
+    print("🚀 WeatherAPI Bulk Request Test Suite")
+    print("=" * 50)
+
+    tests = [
+        test_bulk_maps_results_back,
+        test_bulk_splits_into_chunks,
+        test_falls_back_when_plan_lacks_bulk,
+        test_scheduled_jobs_prefetch_in_bulk,
+    ]
+    passed = sum(1 for test in tests if test())
+
+    print("=" * 50)
+    print(f"📊 Results: {passed}/{len(tests)} tests passed")
+    sys.exit(0 if passed == len(tests) else 1)
+
+if __name__ == "__main__":
+    main()
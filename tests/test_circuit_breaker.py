@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Test per-upstream circuit breakers and stale-data serving while open
+"""
+
+import os
+import sys
+import time
+import asyncio
+import httpx
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from circuit_breaker import CircuitBreaker, CircuitOpenError, CLOSED, OPEN, HALF_OPEN
+from http_clients import HTTPClientPool
+from retry_policy import RetryPolicy
+
+def switchable_stub(state, calls):
+    """Local upstream stub that succeeds or fails depending on state['healthy']"""
+    async def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(str(request.url))
+        if not state["healthy"]:
+            return httpx.Response(503, json={"error": {"message": "unavailable"}})
+        if "generativelanguage" in request.url.host:
+            text = '{"quote": "The sun was shining", "author": "Lewis Carroll", "work": "The Walrus"}'
+            return httpx.Response(200, json={"candidates": [{"content": {"parts": [{"text": text}]}}]})
+        return httpx.Response(200, json={
+            "location": {"name": "London"},
+            "current": {"temp_c": 11, "last_updated_epoch": 1700000000}
+        })
+    return httpx.MockTransport(handler)
+
+def test_state_transitions():
+    """Breaker opens after the threshold, half-opens after the timeout and closes on a good probe"""
+    print("⚡ Testing breaker state transitions")
+    breaker = CircuitBreaker("test", failure_threshold=2, recovery_timeout=0.05)
+    states = [breaker.state]
+    for _ in range(2):
+        assert breaker.allow_request()
+        breaker.record_failure()
+    states.append(breaker.state)
+    rejected = not breaker.allow_request()
+    time.sleep(0.06)
+    probe_allowed = breaker.allow_request()
+    states.append(breaker.state)
+    second_probe_rejected = not breaker.allow_request()
+    breaker.record_success()
+    states.append(breaker.state)
+
+    if (states == [CLOSED, OPEN, HALF_OPEN, CLOSED] and rejected
+            and probe_allowed and second_probe_rejected):
+        print(f"   ✅ {' -> '.join(states)}")
+        return True
+    print(f"   ❌ states={states} rejected={rejected} probe={probe_allowed}")
+    return False
+
+def test_failed_probe_reopens():
+    """A failed half-open probe re-opens the breaker"""
+    print("🔁 Testing failed probe")
+    breaker = CircuitBreaker("test", failure_threshold=1, recovery_timeout=0.01)
+    breaker.record_failure()
+    time.sleep(0.02)
+    breaker.allow_request()
+    breaker.record_failure()
+    try:
+        breaker.check()
+    except CircuitOpenError:
+        print("   ✅ Re-opened after failed probe")
+        return True
+    print(f"   ❌ state={breaker.state}")
+    return False
+
+def test_weather_service_serves_stale_when_open():
+    """WeatherAPIService fails fast with the last good data, marked stale, while open"""
+    print("🌤️  Testing WeatherAPIService stale serving")
+    from main import WeatherAPIService
+
+    async def run():
+        state, calls = {"healthy": True}, []
+        service = WeatherAPIService(
+            "test_key",
+            HTTPClientPool(transport=switchable_stub(state, calls)),
+            RetryPolicy("weatherapi", max_retries=0),
+            CircuitBreaker("weatherapi", failure_threshold=2, recovery_timeout=60)
+        )
+        fresh = await service.get_current_weather("London")
+        service.cache.invalidate()  # Force the next requests upstream
+        state["healthy"] = False
+        for _ in range(2):
+            try:
+                await service.get_current_weather("London")
+            except Exception:
+                pass
+        calls_before = len(calls)
+        start = time.monotonic()
+        stale = await service.get_current_weather("London")
+        elapsed = time.monotonic() - start
+        return fresh, stale, len(calls) - calls_before, elapsed, service.breaker.state
+
+    fresh, stale, new_calls, elapsed, state = asyncio.run(run())
+    if ("stale" not in fresh and stale.get("stale") is True and stale["current"]["temp_c"] == 11
+            and new_calls == 0 and state == OPEN):
+        print(f"   ✅ Stale data served in {elapsed * 1000:.1f}ms without an upstream call")
+        return True
+    print(f"   ❌ stale={stale} new_calls={new_calls} state={state}")
+    return False
+
+def test_gemini_serves_stale_quote_when_open():
+    """GeminiQuoteService returns a location's own last good quote, marked stale, while open"""
+    print("📚 Testing Gemini stale quote serving")
+    from datetime import datetime, timedelta
+    from gemini_service import GeminiQuoteService
+
+    async def run():
+        state, calls = {"healthy": True}, []
+        service = GeminiQuoteService(
+            "test_key",
+            HTTPClientPool(transport=switchable_stub(state, calls)),
+            RetryPolicy("gemini", max_retries=0),
+            CircuitBreaker("gemini", failure_threshold=1, recovery_timeout=60)
+        )
+        first = await service.get_weather_quote("London", {"condition_text": "Partly cloudy"})
+        state["healthy"] = False
+        await service.get_weather_quote("Paris", {"condition_text": "Partly cloudy"})
+        # The background refresh drops London's expired quote from the cache
+        for key in service.last_update:
+            service.last_update[key] -= timedelta(hours=3)
+        await service.refresh_quotes()
+        calls_before = len(calls)
+        stale = await service.get_weather_quote("London", {"condition_text": "Partly cloudy"})
+        other = await service.get_weather_quote("Berlin", {"condition_text": "Partly cloudy"})
+        return first, stale, other, len(calls) - calls_before
+
+    first, stale, other, new_calls = asyncio.run(run())
+    if (first and not first.stale and stale and stale.stale and stale.location == first.location
+            and other is None and new_calls == 0):
+        print(f"   ✅ London's stale quote by {stale.author} served without calling Gemini, none for Berlin")
+        return True
+    print(f"   ❌ first={first} stale={stale} other={other} new_calls={new_calls}")
+    return False
+
+def test_webhook_breakers_listed_per_job():
+    """Each scheduled job's webhook has its own breaker, named after the job and shown in /upstreams/status"""
+    print("🪝 Testing per-webhook breakers")
+    import main
+    from scheduler import ScheduledJob
+    jobs = [ScheduledJob("kitchen", "London", "https://example.test/kitchen"),
+            ScheduledJob("office", "Paris", "https://example.test/office")]
+    try:
+        services = [main.get_webhook_service(job) for job in jobs]
+        services[0].breaker.record_failure()
+        upstreams = asyncio.run(main.get_upstreams_status()).data["upstreams"]
+    finally:
+        for job in jobs:
+            main.webhook_services.pop(job.webhook_url, None)
+    kitchen, office = upstreams.get("trmnl:kitchen"), upstreams.get("trmnl:office")
+    if (services[0] is not services[1] and "trmnl" in upstreams and kitchen and office
+            and kitchen["breaker"]["consecutive_failures"] == 1 and office["breaker"]["consecutive_failures"] == 0):
+        print(f"   ✅ Listed: {sorted(upstreams)}")
+        return True
+    print(f"   ❌ upstreams={sorted(upstreams)}")
+    return False
+
+def main():
+    """Run all circuit breaker tests"""
+    print("🚀 Circuit Breaker Test Suite")
+    print("=" * 50)
+
+    tests = [
+        test_state_transitions,
+        test_failed_probe_reopens,
+        test_weather_service_serves_stale_when_open,
+        test_gemini_serves_stale_quote_when_open,
+        test_webhook_breakers_listed_per_job,
+    ]
+    passed = sum(1 for test in tests if test())
+
+    print("=" * 50)
+    print(f"📊 Results: {passed}/{len(tests)} tests passed")
+    sys.exit(0 if passed == len(tests) else 1)
+
+if __name__ == "__main__":
+    main()
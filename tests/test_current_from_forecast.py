@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Test answering current-weather requests from a fresh cached forecast
+"""
+
+import os
+import sys
+import asyncio
+import httpx
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from http_clients import HTTPClientPool
+
+def forecast_stub(calls):
+    """Local WeatherAPI stub returning current (+ forecast) blocks and counting calls"""
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request.url.path.rsplit("/", 1)[-1])
+        current = {"temp_c": 11, "condition": {"text": "Partly cloudy"}, "last_updated_epoch": 1700000000}
+        if request.url.params.get("aqi") == "yes":
+            current["air_quality"] = {"us-epa-index": 1}
+        body = {"location": {"name": "London", "tz_id": "Europe/London"}, "current": current}
+        if request.url.path.endswith("forecast.json"):
+            body["forecast"] = {"forecastday": [{"day": {"maxtemp_c": 13}, "astro": {}, "hour": []}]}
+        return httpx.Response(200, json=body)
+    return httpx.MockTransport(handler)
+
+def make_service(calls):
+    from main import WeatherAPIService
+    return WeatherAPIService("test_key", HTTPClientPool(transport=forecast_stub(calls)))
+
+def test_current_served_from_forecast():
+    """A current request right after a forecast for the same location costs no upstream call"""
+    print("♻️  Testing current weather derived from forecast")
+
+    async def run():
+        calls = []
+        service = make_service(calls)
+        await service.get_forecast("London", days=1, include_air_quality=True)
+        current = await service.get_current_weather("london", include_air_quality=True)
+        return calls, current, service.get_stats()["current_from_forecast"]
+
+    calls, current, stats = asyncio.run(run())
+    if (calls == ["forecast.json"] and "forecast" not in current
+            and current["current"]["air_quality"] and stats["upstream_calls_saved"] == 1):
+        print(f"   ✅ 1 upstream call for 2 requests, stats: {stats}")
+        return True
+    print(f"   ❌ calls={calls} stats={stats}")
+    return False
+
+def test_aqi_forecast_serves_plain_current():
+    """A forecast with air quality serves a current request without it (air quality stripped)"""
+    print("🌫️  Testing air quality handling")
+
+    async def run():
+        calls = []
+        service = make_service(calls)
+        await service.get_forecast("London", include_air_quality=True)
+        plain = await service.get_current_weather("London", include_air_quality=False)
+        service.cache.clear()
+        await service.get_forecast("Paris", include_air_quality=False)
+        with_aqi = await service.get_current_weather("Paris", include_air_quality=True)
+        return calls, plain, with_aqi
+
+    calls, plain, with_aqi = asyncio.run(run())
+    if ("air_quality" not in plain["current"] and "air_quality" in with_aqi["current"]
+            and calls == ["forecast.json", "forecast.json", "current.json"]):
+        print("   ✅ Stripped air quality, and fetched upstream when the forecast lacked it")
+        return True
+    print(f"   ❌ calls={calls}")
+    return False
+
+def test_old_forecast_not_used():
+    """Expired cached forecasts are not reused"""
+    print("⌛ Testing freshness limit")
+
+    async def run():
+        calls = []
+        service = make_service(calls)
+        await service.get_forecast("London")
+        service.cache.invalidate()
+        await service.get_current_weather("London")
+        return calls
+
+    calls = asyncio.run(run())
+    if calls == ["forecast.json", "current.json"]:
+        print("   ✅ Old forecast ignored")
+        return True
+    print(f"   ❌ calls={calls}")
+    return False
+
+def main():
+    """Run all current-from-forecast tests"""
+    print("🚀 Current From Forecast Test Suite")
+    print("=" * 50)
+
+    tests = [
+        test_current_served_from_forecast,
+        test_aqi_forecast_serves_plain_current,
+        test_old_forecast_not_used,
+    ]
+    passed = sum(1 for test in tests if test())
+
+    print("=" * 50)
+    print(f"📊 Results: {passed}/{len(tests)} tests passed")
+    sys.exit(0 if passed == len(tests) else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Test named WeatherAPI fetch profiles and per-profile size/latency stats
+"""
+
+import os
+import sys
+import asyncio
+import httpx
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from fetch_profiles import FetchProfile, get_profile
+from http_clients import HTTPClientPool
+
+def recording_stub(seen):
+    """Local WeatherAPI stub recording each request's endpoint and query options"""
+    def handler(request: httpx.Request) -> httpx.Response:
+        params = dict(request.url.params)
+        params.pop("key", None)
+        seen.append((request.url.path.rsplit("/", 1)[-1], params))
+        body = {"location": {"name": "London"}, "current": {"temp_c": 11, "condition": {"text": "Sunny"}}}
+        if request.url.path.endswith("forecast.json"):
+            hours = 1 if "hour" in params else 24
+            body["forecast"] = {"forecastday": [
+                {"day": {"maxtemp_c": 13}, "astro": {}, "hour": [{"temp_c": 10}] * hours}
+                for _ in range(int(params["days"]))
+            ]}
+        return httpx.Response(200, json=body)
+    return httpx.MockTransport(handler)
+
+def make_service(seen):
+    from main import WeatherAPIService
+    return WeatherAPIService("test_key", HTTPClientPool(transport=recording_stub(seen)))
+
+def test_profile_params():
+    """Profiles map to the expected WeatherAPI query options"""
+    print("🧾 Testing profile query parameters")
+    view = get_profile("trmnl_view").params()
+    full = get_profile("forecast", days=20, aqi=True).params()
+    quote = get_profile("quote").params()
+    ok = (
+        view == {"aqi": "yes", "days": 1, "alerts": "no", "hour": 12}
+        and full == {"aqi": "yes", "days": 14, "alerts": "no"}
+        and quote == {"aqi": "no"}
+    )
+    if ok:
+        print("   ✅ trmnl_view, forecast and quote parameters as expected")
+        return True
+    print(f"   ❌ view={view} full={full} quote={quote}")
+    return False
+
+def test_profiles_get_separate_keys():
+    """Profiles with different options never share coalescing or last-good keys"""
+    print("🔑 Testing request keys")
+    lean = get_profile("trmnl_view").key("london")
+    full = get_profile("forecast", days=1, aqi=True).key("london")
+    alerts = FetchProfile("alerts", "forecast", aqi=True, alerts=True, hourly=False).key("london")
+    if len({lean, full, alerts}) == 3:
+        print("   ✅ Distinct keys")
+        return True
+    print(f"   ❌ lean={lean} full={full} alerts={alerts}")
+    return False
+
+def test_service_uses_profile_and_tracks_stats():
+    """fetch() sends the profile's options and records size and latency per profile"""
+    print("📏 Testing per-profile stats")
+
+    async def run():
+        seen = []
+        service = make_service(seen)
+        view = await service.fetch("London", get_profile("trmnl_view"))
+        full = await service.get_forecast("London", days=3)
+        await service.fetch("Paris", get_profile("quote"))
+        return seen, view, full, service.get_stats()["profiles"]
+
+    seen, view, full, stats = asyncio.run(run())
+    ok = (
+        [endpoint for endpoint, _ in seen] == ["forecast.json", "forecast.json", "current.json"]
+        and seen[0][1]["hour"] == "12"
+        and view["forecast"]["forecastday"][0]["hour"] == []
+        and len(full["forecast"]["forecastday"][0]["hour"]) == 24
+        and set(stats) == {"trmnl_view", "forecast", "quote"}
+        and stats["trmnl_view"]["avg_bytes"] < stats["forecast"]["avg_bytes"]
+        and stats["quote"]["latency_p95_ms"] is not None
+    )
+    if ok:
+        print(f"   ✅ Stats: { {name: s['avg_bytes'] for name, s in stats.items()} } bytes")
+        return True
+    print(f"   ❌ seen={seen} stats={stats}")
+    return False
+
+def main():
+    """Run all fetch profile tests"""
+    print("🚀 Fetch Profile Test Suite")
+    print("=" * 50)
+
+    tests = [
+        test_profile_params,
+        test_profiles_get_separate_keys,
+        test_service_uses_profile_and_tracks_stats,
+    ]
+    passed = sum(1 for test in tests if test())
+
+    print("=" * 50)
+    print(f"📊 Results: {passed}/{len(tests)} tests passed")
+    sys.exit(0 if passed == len(tests) else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Test selective forecast extraction (hourly arrays skipped while reading the body)
+"""
+
+import os
+import sys
+import json
+import asyncio
+import httpx
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from forecast_extractor import ForecastExtractor, extract_forecast_summary
+from http_clients import HTTPClientPool
+
+def make_forecast(days=3, tricky=False):
+    """Synthetic WeatherAPI forecast body"""
+    condition = 'Rain "heavy" \\ [showers] ]' if tricky else "Sunny"
+    hour = {"time": "2024-01-01 00:00", "temp_c": 10.5, "condition": {"text": condition},
+            "chance_of_rain": 20, "nested": [[1, 2], ["]", "["]] if tricky else []}
+    return {
+        "location": {"name": "London", "tz_id": "Europe/London"},
+        "current": {"temp_c": 11, "condition": {"text": "Partly cloudy"}, "last_updated_epoch": 1700000000},
+        "forecast": {"forecastday": [
+            {"date": f"2024-01-0{d + 1}", "day": {"maxtemp_c": 13, "condition": {"text": condition}},
+             "astro": {"sunrise": "08:00 AM"}, "hour": [dict(hour, time=f"h{h}") for h in range(24)]}
+            for d in range(days)
+        ]}
+    }
+
+def expected_summary(body):
+    summary = json.loads(json.dumps(body))
+    for day in summary["forecast"]["forecastday"]:
+        day["hour"] = []
+    return summary
+
+def test_matches_json_loads():
+    """Output equals json.loads with hourly arrays emptied"""
+    print("🔍 Testing extraction against json.loads")
+    body = make_forecast(days=3)
+    result = extract_forecast_summary(json.dumps(body).encode())
+    if result == expected_summary(body):
+        print("   ✅ Identical summary")
+        return True
+    print("   ❌ Summary mismatch")
+    return False
+
+def test_any_chunk_size():
+    """Chunk boundaries anywhere (including mid-key and mid-escape) give the same result"""
+    print("✂️  Testing chunk boundaries with escapes and nested arrays")
+    body = make_forecast(days=2, tricky=True)
+    raw = json.dumps(body, indent=1).encode()
+    expected = expected_summary(body)
+    failures = []
+    for size in list(range(1, 40)) + [64, 333, 4096, len(raw)]:
+        extractor = ForecastExtractor()
+        for start in range(0, len(raw), size):
+            extractor.feed(raw[start:start + size])
+        if extractor.result() != expected:
+            failures.append(size)
+    if not failures:
+        print("   ✅ All chunk sizes agree")
+        return True
+    print(f"   ❌ Failed chunk sizes: {failures[:10]}")
+    return False
+
+def test_truncated_body_rejected():
+    """A body cut off inside an hourly array raises ValueError"""
+    print("🚫 Testing truncated body")
+    raw = json.dumps(make_forecast(days=1)).encode()
+    try:
+        extract_forecast_summary(raw[:raw.index(b'"hour"') + 40])
+    except ValueError:
+        print("   ✅ ValueError raised")
+        return True
+    print("   ❌ Truncated body accepted")
+    return False
+
+def test_service_skips_hourly():
+    """get_forecast(hourly=False) returns the summary and is cached separately from full forecasts"""
+    print("🌤️  Testing WeatherAPIService integration")
+    from main import WeatherAPIService
+
+    async def run():
+        calls = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            calls.append(1)
+            return httpx.Response(200, json=make_forecast(days=int(request.url.params["days"])))
+
+        service = WeatherAPIService("test_key", HTTPClientPool(transport=httpx.MockTransport(handler)))
+        summary = await service.get_forecast("London", days=3, hourly=False)
+        full = await service.get_forecast("London", days=3)
+        return summary, full, len(calls)
+
+    summary, full, calls = asyncio.run(run())
+    ok = (
+        calls == 2
+        and all(day["hour"] == [] for day in summary["forecast"]["forecastday"])
+        and len(full["forecast"]["forecastday"][0]["hour"]) == 24
+        and summary["current"] == full["current"]
+    )
+    if ok:
+        print("   ✅ Summary without hours, full forecast untouched")
+        return True
+    print(f"   ❌ calls={calls}")
+    return False
+
+def main():
+    """Run all forecast extraction tests"""
+    print("🚀 Forecast Extraction Test Suite")
+    print("=" * 50)
+
+    tests = [
+        test_matches_json_loads,
+        test_any_chunk_size,
+        test_truncated_body_rejected,
+        test_service_skips_hourly,
+    ]
+    passed = sum(1 for test in tests if test())
+
+    print("=" * 50)
+    print(f"📊 Results: {passed}/{len(tests)} tests passed")
+    sys.exit(0 if passed == len(tests) else 1)
+
+if __name__ == "__main__":
+    main()
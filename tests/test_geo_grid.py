@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Test geohash quantization of coordinate queries
+"""
+
+import os
+import sys
+import random
+import asyncio
+import httpx
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from geo_grid import GeoGrid, geohash_encode, geohash_center, haversine_km, parse_lat_lon
+from http_clients import HTTPClientPool
+
+def test_geohash_round_trip():
+    """Known geohash values, and cell centres that encode back to their own cell"""
+    print("🧭 Testing geohash encoding")
+    known = geohash_encode(57.64911, 10.40744, 11) == "u4pruydqqvj"
+    center = geohash_center("u4pruydqqvj")
+    round_trip = geohash_encode(*center, 11) == "u4pruydqqvj"
+    parsed = (parse_lat_lon(" 51.5072, -0.1276 ") == (51.5072, -0.1276)
+              and parse_lat_lon("London") is None and parse_lat_lon("91,0") is None)
+    if known and round_trip and parsed and haversine_km(center, (57.64911, 10.40744)) < 0.001:
+        print("   ✅ Encoding, centre and parsing agree")
+        return True
+    print(f"   ❌ known={known} round_trip={round_trip} parsed={parsed}")
+    return False
+
+def test_nearby_coordinates_share_a_query():
+    """Coordinates differing in the fourth decimal map to one query; names pass through"""
+    print("📍 Testing quantization")
+    grid = GeoGrid(6)
+    queries = {grid.quantize(q) for q in ("51.5072,-0.1276", "51.5074,-0.1279", "51.5071,-0.1273")}
+    named = grid.quantize("London")
+    stats = grid.get_stats()
+    disabled = GeoGrid(0).quantize("51.5072,-0.1276")
+    if (len(queries) == 1 and named == "London" and disabled == "51.5072,-0.1276"
+            and stats["shared_cell_queries"] == 2 and stats["max_error_km"] < 0.7):
+        print(f"   ✅ 3 coordinates -> {queries.pop()}, stats: {stats}")
+        return True
+    print(f"   ❌ queries={queries} stats={stats}")
+    return False
+
+def test_distance_error_bounded_by_precision():
+    """Across random points, the error never exceeds half a cell diagonal"""
+    print("📏 Testing distance error")
+    rng = random.Random(7)
+    # Half the diagonal of a cell at the equator for each precision, in km
+    bounds = {5: 3.5, 6: 0.7, 7: 0.11}
+    for precision, bound in bounds.items():
+        grid = GeoGrid(precision)
+        for _ in range(2000):
+            grid.quantize(f"{rng.uniform(-60, 60):.4f},{rng.uniform(-180, 180):.4f}")
+        stats = grid.get_stats()
+        if stats["max_error_km"] > bound:
+            print(f"   ❌ precision {precision}: {stats}")
+            return False
+        print(f"   ✅ precision {precision}: avg {stats['avg_error_km']} km, max {stats['max_error_km']} km")
+    return True
+
+def test_service_shares_cached_response():
+    """Nearby devices cause one upstream call between them"""
+    print("🌤️  Testing WeatherAPIService with a geo grid")
+    from main import WeatherAPIService
+
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request.url.params["q"])
+        return httpx.Response(200, json={
+            "location": {"name": "Westminster", "region": "London", "country": "United Kingdom"},
+            "current": {"temp_c": 9, "last_updated_epoch": 4_000_000_000},
+            "forecast": {"forecastday": []}
+        })
+
+    async def run():
+        service = WeatherAPIService("test_key", HTTPClientPool(transport=httpx.MockTransport(handler)),
+                                    geo_grid=GeoGrid(6))
+        for q in ("51.5072,-0.1276", "51.5074,-0.1279", "51.5071,-0.1273"):
+            await service.get_forecast(q)
+        bulk = await service.get_current_weather_bulk(["51.5073,-0.1275", "51.5070,-0.1277"])
+        return bulk, service.get_stats()
+
+    bulk, stats = asyncio.run(run())
+    if len(calls) == 1 and len(bulk) == 2 and stats["cache"]["hits"] >= 2:
+        print(f"   ✅ 1 upstream call for 5 requests, geo grid: {stats['geo_grid']}")
+        return True
+    print(f"   ❌ calls={calls} stats={stats['geo_grid']}")
+    return False
+
+def main():
+    """Run all geo grid tests"""
+    print("🚀 Geo Grid Test Suite")
+    print("=" * 50)
+
+    tests = [
+        test_geohash_round_trip,
+        test_nearby_coordinates_share_a_query,
+        test_distance_error_bounded_by_precision,
+        test_service_shares_cached_response,
+    ]
+    passed = sum(1 for test in tests if test())
+
+    print("=" * 50)
+    print(f"📊 Results: {passed}/{len(tests)} tests passed")
+    sys.exit(0 if passed == len(tests) else 1)
+
+if __name__ == "__main__":
+    main()
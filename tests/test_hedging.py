@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Test hedged WeatherAPI requests against a local stub with a slow tail
+"""
+
+import os
+import sys
+import asyncio
+import httpx
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from hedging import HedgePolicy, LatencyTracker
+from http_clients import HTTPClientPool
+
+def test_percentile():
+    """Nearest-rank percentiles over the rolling window"""
+    print("📈 Testing latency percentiles")
+    tracker = LatencyTracker(window=100)
+    for ms in range(1, 101):
+        tracker.record(ms / 1000)
+    p50, p99 = tracker.percentile(50), tracker.percentile(99)
+    if p50 == 0.05 and p99 == 0.099:
+        print(f"   ✅ p50={p50} p99={p99}")
+        return True
+    print(f"   ❌ p50={p50} p99={p99}")
+    return False
+
+def warm(policy, seconds=0.01, count=20):
+    for _ in range(count):
+        policy.latencies.record(seconds)
+
+def test_hedge_wins_and_loser_cancelled():
+    """A slow primary is hedged, the fast hedge wins and the primary is cancelled"""
+    print("🏇 Testing hedge against a slow primary")
+
+    async def run():
+        policy = HedgePolicy(min_samples=20, max_hedge_ratio=1.0, min_delay=0.01)
+        warm(policy)
+        policy.tokens = 1.0
+        delays = [0.5, 0.01]
+        cancelled = []
+
+        async def call():
+            delay = delays.pop(0)
+            try:
+                await asyncio.sleep(delay)
+                return delay
+            except asyncio.CancelledError:
+                cancelled.append(delay)
+                raise
+
+        result = await policy.run(call)
+        await asyncio.sleep(0)
+        return result, cancelled, policy.stats
+
+    result, cancelled, stats = asyncio.run(run())
+    if result == 0.01 and cancelled == [0.5] and stats["hedged"] == 1 and stats["hedge_wins"] == 1:
+        print(f"   ✅ Hedge won, primary cancelled, stats: {stats}")
+        return True
+    print(f"   ❌ result={result} cancelled={cancelled} stats={stats}")
+    return False
+
+def test_hedge_rate_is_capped():
+    """With a 10% cap, at most ~10% of slow calls are hedged"""
+    print("🧢 Testing hedge rate cap")
+
+    async def run():
+        policy = HedgePolicy(max_hedge_ratio=0.1)
+        policy.hedge_delay = lambda: 0.001  # Every call is "slow" relative to this threshold
+
+        async def slow():
+            await asyncio.sleep(0.01)
+            return "ok"
+
+        for _ in range(50):
+            await policy.run(slow)
+        return policy.stats
+
+    stats = asyncio.run(run())
+    if 0 < stats["hedged"] <= 5 and stats["rate_limited"] > 0:
+        print(f"   ✅ {stats['hedged']} hedges for {stats['calls']} calls")
+        return True
+    print(f"   ❌ stats={stats}")
+    return False
+
+def test_no_hedge_before_min_samples():
+    """No hedging until enough latency samples are collected"""
+    print("🐣 Testing warm-up")
+
+    async def run():
+        policy = HedgePolicy(min_samples=20, max_hedge_ratio=1.0)
+        policy.tokens = 5
+
+        async def call():
+            await asyncio.sleep(0.005)
+            return "ok"
+
+        for _ in range(5):
+            await policy.run(call)
+        return policy.stats
+
+    stats = asyncio.run(run())
+    if stats["hedged"] == 0:
+        print("   ✅ No hedges during warm-up")
+        return True
+    print(f"   ❌ stats={stats}")
+    return False
+
+def test_weather_service_hedges_slow_upstream():
+    """WeatherAPIService sends a hedged request when the upstream stalls"""
+    print("🌤️  Testing WeatherAPIService hedging")
+    from main import WeatherAPIService
+
+    async def run():
+        calls = []
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            calls.append(1)
+            # The first request after warm-up stalls; its hedge answers quickly
+            await asyncio.sleep(1.0 if len(calls) == 21 else 0.005)
+            return httpx.Response(200, json={"location": {"name": request.url.params["q"]}, "current": {"temp_c": 11}})
+
+        hedge_policy = HedgePolicy(min_samples=20, max_hedge_ratio=0.5, min_delay=0.01)
+        service = WeatherAPIService("test_key", HTTPClientPool(transport=httpx.MockTransport(handler)),
+                                    hedge_policy=hedge_policy)
+        for i in range(20):
+            await service.get_current_weather(f"Warmup {i}")
+        data = await service.get_current_weather("London")
+        return data, len(calls), service.get_stats()["hedging"]
+
+    data, calls, stats = asyncio.run(run())
+    if data["current"]["temp_c"] == 11 and calls == 22 and stats["hedge_wins"] == 1:
+        print(f"   ✅ Hedged response returned, stats: {stats}")
+        return True
+    print(f"   ❌ calls={calls} stats={stats}")
+    return False
+
+def main():
+    """Run all hedging tests"""
+    print("🚀 Hedged Requests Test Suite")
+    print("=" * 50)
+
+    tests = [
+        test_percentile,
+        test_hedge_wins_and_loser_cancelled,
+        test_hedge_rate_is_capped,
+        test_no_hedge_before_min_samples,
+        test_weather_service_hedges_slow_upstream,
+    ]
+    passed = sum(1 for test in tests if test())
+
+    print("=" * 50)
+    print(f"📊 Results: {passed}/{len(tests)} tests passed")
+    sys.exit(0 if passed == len(tests) else 1)
+
+if __name__ == "__main__":
+    main()
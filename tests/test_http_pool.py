@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Test the shared outbound HTTP client pool against a local stub transport
+"""
+
+import os
+import sys
+import asyncio
+import httpx
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from http_clients import HTTPClientPool, parse_host_limits
+
+def stub_transport():
+    """Local stub that answers every request with a small JSON body"""
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, json={"host": request.url.host})
+    return httpx.MockTransport(handler)
+
+def test_one_client_per_host():
+    """Requests to the same host reuse one client, other hosts get their own"""
+    print("🔌 Testing one pooled client per upstream host")
+
+    async def run():
+        pool = HTTPClientPool(transport=stub_transport())
+        pool.start(["http://api.weatherapi.com/v1", "https://usetrmnl.com/api/custom_plugins/x"])
+        first = pool.get_client("http://api.weatherapi.com/v1/current.json")
+        second = pool.get_client("http://api.weatherapi.com/v1/forecast.json")
+        other = pool.get_client("https://usetrmnl.com/api/custom_plugins/y")
+        await pool.close()
+        return first is second and first is not other
+
+    if asyncio.run(run()):
+        print("   ✅ Clients shared per host")
+        return True
+    print("   ❌ Expected one client per host")
+    return False
+
+def test_usage_stats():
+    """Pool stats count requests and peak concurrency per host"""
+    print("📊 Testing pool usage statistics")
+
+    async def run():
+        pool = HTTPClientPool(transport=stub_transport(), host_limits={"usetrmnl.com": 4})
+        await asyncio.gather(*[
+            pool.request("GET", "http://api.weatherapi.com/v1/current.json") for _ in range(5)
+        ])
+        await pool.request("POST", "https://usetrmnl.com/api/custom_plugins/x", json={})
+        stats = pool.get_stats()
+        await pool.close()
+        return stats
+
+    stats = asyncio.run(run())
+    weather = stats["hosts"]["http://api.weatherapi.com:80"]
+    trmnl = stats["hosts"]["https://usetrmnl.com:443"]
+    if weather["requests"] == 5 and weather["in_flight"] == 0 and trmnl["max_connections"] == 4:
+        print(f"   ✅ Stats: {weather}")
+        return True
+    print(f"   ❌ Unexpected stats: {stats}")
+    return False
+
+def test_parse_host_limits():
+    """Per-host connection caps are parsed from the settings string"""
+    print("⚙️  Testing per-host limit parsing")
+    limits = parse_host_limits("usetrmnl.com=4, API.weatherapi.com=20,bad,x=y")
+    if limits == {"usetrmnl.com": 4, "api.weatherapi.com": 20}:
+        print(f"   ✅ Parsed: {limits}")
+        return True
+    print(f"   ❌ Unexpected limits: {limits}")
+    return False
+
+def main():
+    """Run all HTTP pool tests"""
+    print("🚀 HTTP Client Pool Test Suite")
+    print("=" * 50)
+
+    tests = [test_one_client_per_host, test_usage_stats, test_parse_host_limits]
+    passed = sum(1 for test in tests if test())
+
+    print("=" * 50)
+    print(f"📊 Results: {passed}/{len(tests)} tests passed")
+    sys.exit(0 if passed == len(tests) else 1)
+
+if __name__ == "__main__":
+    main()
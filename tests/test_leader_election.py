@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Test lease-based leader election: one leader at a time, fast failover when
+it dies or shuts down, and worker processes sharing one lease file
+"""
+
+import os
+import sys
+import time
+import signal
+import asyncio
+import tempfile
+import multiprocessing
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from leader_election import LeaseElection
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def __call__(self):
+        return self.now
+
+def lease_path():
+    return os.path.join(tempfile.mkdtemp(), "leader.sqlite3")
+
+def test_single_leader():
+    """The first candidate takes the lease; the others follow while it renews"""
+    print("👑 Testing a single leader")
+    path, clock = lease_path(), FakeClock()
+    nodes = [LeaseElection(path, node_id=f"node-{i}", ttl=15, clock=clock) for i in range(3)]
+    rounds = []
+    for _ in range(5):
+        rounds.append([node.poll(lambda: None, lambda: None) for node in nodes])
+        clock.now += 5
+    leader = nodes[1].current_leader()
+    if (all(r == [True, False, False] for r in rounds) and leader["node_id"] == "node-0" and leader["term"] == 1
+            and nodes[0].stats["renewals"] == 4):
+        print(f"   ✅ node-0 led all 5 rounds, leader as seen by node-1: {leader}")
+        return True
+    print(f"   ❌ rounds={rounds} leader={leader}")
+    return False
+
+def test_failover_and_step_down():
+    """A leader that stops renewing is replaced after the TTL and steps down when it comes back"""
+    print("🔁 Testing failover on lease expiry")
+    path, clock = lease_path(), FakeClock()
+    events = []
+    a = LeaseElection(path, node_id="a", ttl=15, clock=clock)
+    b = LeaseElection(path, node_id="b", ttl=15, clock=clock)
+    a.poll(lambda: events.append("a elected"), lambda: events.append("a deposed"))
+    b.poll(lambda: events.append("b elected"), lambda: events.append("b deposed"))
+    # a stalls; b keeps polling
+    clock.now += 10
+    b.poll(lambda: events.append("b elected"), lambda: events.append("b deposed"))
+    clock.now += 6
+    b.poll(lambda: events.append("b elected"), lambda: events.append("b deposed"))
+    a.poll(lambda: events.append("a elected"), lambda: events.append("a deposed"))
+    leader = a.current_leader()
+    if events == ["a elected", "b elected", "a deposed"] and leader["node_id"] == "b" and leader["term"] == 2:
+        print(f"   ✅ Events: {events}, term {leader['term']}")
+        return True
+    print(f"   ❌ events={events} leader={leader}")
+    return False
+
+def test_release_hands_over_immediately():
+    """A leader shutting down releases the lease, so the next poll elsewhere takes over"""
+    print("👋 Testing release on shutdown")
+    path, clock = lease_path(), FakeClock()
+    a = LeaseElection(path, node_id="a", ttl=15, clock=clock)
+    b = LeaseElection(path, node_id="b", ttl=15, clock=clock)
+    a.poll(lambda: None, lambda: None)
+    a.release()
+    taken = b.poll(lambda: None, lambda: None)
+    stats = b.get_stats()
+    if taken and stats["is_leader"] and stats["leader"]["node_id"] == "b" and not a.is_leader:
+        print("   ✅ b took over without waiting for the TTL")
+        return True
+    print(f"   ❌ taken={taken} stats={stats}")
+    return False
+
+def candidate(path, node_id, log_path):
+    """One worker process: poll the lease and log leadership changes"""
+    def log(event):
+        with open(log_path, "a") as f:
+            f.write(f"{time.time()} {node_id} {event}\n")
+
+    election = LeaseElection(path, node_id=node_id, ttl=0.6, renew_interval=0.1)
+    asyncio.run(election.run(lambda: log("elected"), lambda: log("deposed")))
+
+def read_log(log_path):
+    if not os.path.exists(log_path):
+        return []
+    with open(log_path) as f:
+        return [(float(at), node, event) for at, node, event in (line.split() for line in f)]
+
+def test_processes_fail_over_when_leader_dies():
+    """Three worker processes: exactly one leads, and a killed leader is replaced within TTL + renew interval"""
+    print("💀 Testing failover between processes")
+    directory = tempfile.mkdtemp()
+    path, log_path = os.path.join(directory, "leader.sqlite3"), os.path.join(directory, "events.log")
+    LeaseElection(path).close()  # Create the file before the candidates race for it
+    processes = {f"worker-{i}": multiprocessing.Process(target=candidate, args=(path, f"worker-{i}", log_path))
+                 for i in range(3)}
+    for process in processes.values():
+        process.start()
+    try:
+        time.sleep(1.0)
+        first = [entry for entry in read_log(log_path) if entry[2] == "elected"]
+        if len(first) != 1:
+            print(f"   ❌ Expected one leader, got {first}")
+            return False
+        leader = first[0][1]
+        killed_at = time.time()
+        os.kill(processes[leader].pid, signal.SIGKILL)
+        time.sleep(1.5)
+        elected = [entry for entry in read_log(log_path) if entry[2] == "elected"]
+    finally:
+        for process in processes.values():
+            if process.is_alive():
+                process.terminate()
+            process.join()
+    if len(elected) != 2 or elected[1][1] == leader:
+        print(f"   ❌ Expected one new leader after the kill, got {elected}")
+        return False
+    failover = elected[1][0] - killed_at
+    if 0 < failover <= 0.6 + 0.1 + 0.3:
+        print(f"   ✅ {leader} killed, {elected[1][1]} took over after {failover:.2f}s (TTL 0.6s)")
+        return True
+    print(f"   ❌ failover took {failover:.2f}s")
+    return False
+
+def test_unusable_lease_path_falls_back_to_local():
+    """A lease path that cannot be opened is logged and startup runs the leader tasks locally"""
+    print("🚧 Testing an unusable lease path")
+    import main
+    from config import settings
+    directory = tempfile.mkdtemp()
+    blocker = os.path.join(directory, "not-a-directory")
+    open(blocker, "w").close()
+    original = settings.LEADER_LEASE_PATH
+    opened = []
+    try:
+        # A parent that is a file (OSError) and a path that is a directory (sqlite3.Error)
+        for path in (os.path.join(blocker, "leader.sqlite3"), directory):
+            settings.LEADER_LEASE_PATH = path
+            opened.append(main.open_leader_election())
+    finally:
+        settings.LEADER_LEASE_PATH = original
+    if opened == [None, None]:
+        print("   ✅ Both paths fell back to running the leader tasks locally")
+        return True
+    print(f"   ❌ opened={opened}")
+    return False
+
+def main():
+    """Run all leader election tests"""
+    print("🚀 Leader Election Test Suite")
+    print("=" * 50)
+
+    tests = [
+        test_single_leader,
+        test_failover_and_step_down,
+        test_release_hands_over_immediately,
+        test_processes_fail_over_when_leader_dies,
+        test_unusable_lease_path_falls_back_to_local,
+    ]
+    passed = sum(1 for test in tests if test())
+
+    print("=" * 50)
+    print(f"📊 Results: {passed}/{len(tests)} tests passed")
+    sys.exit(0 if passed == len(tests) else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Test location canonicalization and the persistent alias index
+"""
+
+import os
+import sys
+import asyncio
+import tempfile
+import httpx
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from location_index import LocationIndex, canonical_id
+from persistent_store import PersistentStore
+from http_clients import HTTPClientPool
+from geo_grid import GeoGrid
+
+LONDON = {"name": "London", "region": "City of London, Greater London", "country": "United Kingdom"}
+
+def geocoding_stub(calls):
+    """Local WeatherAPI stub resolving every spelling of London to the same place"""
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request.url.params["q"])
+        return httpx.Response(200, json={
+            "location": LONDON,
+            "current": {"temp_c": 11, "condition": {"text": "Blowing snow"}, "last_updated_epoch": 4_000_000_000}
+        })
+    return httpx.MockTransport(handler)
+
+def test_aliases_resolve_to_canonical():
+    """Learned spellings, and the place's full name, resolve to one canonical id"""
+    print("🗺️  Testing alias resolution")
+    index = LocationIndex()
+    unknown = index.resolve("  London,  UK ")
+    canonical = index.learn("London, UK", {"location": LONDON})
+    index.learn("51.51,-0.13", {"location": LONDON})
+    resolved = {index.resolve(q) for q in ("london, uk", "51.51,-0.13",
+                                           "London, City of London, Greater London, United Kingdom")}
+    if unknown == "london, uk" and resolved == {canonical} and canonical_id({"id": 2801268}) == "id:2801268":
+        print(f"   ✅ 3 spellings -> {canonical}")
+        return True
+    print(f"   ❌ unknown={unknown} resolved={resolved}")
+    return False
+
+def test_weather_cache_shared_across_spellings():
+    """Once learned, every spelling of a location hits the same cached response"""
+    print("🌤️  Testing WeatherAPIService canonical keys")
+    from main import WeatherAPIService
+
+    async def run():
+        calls = []
+        service = WeatherAPIService("test_key", HTTPClientPool(transport=geocoding_stub(calls)))
+        for q in ("London, UK", "51.51,-0.13", "london, uk ", "51.51,-0.13",
+                  "London, City of London, Greater London, United Kingdom"):
+            await service.get_current_weather(q)
+        return calls, service.get_stats()["locations"]
+
+    calls, stats = asyncio.run(run())
+    # Coordinates go upstream as the centre of their geo-grid cell
+    if calls == ["London, UK", GeoGrid(6).quantize("51.51,-0.13")] and stats["canonical_locations"] == 1:
+        print(f"   ✅ 2 upstream calls for 5 requests, stats: {stats}")
+        return True
+    print(f"   ❌ calls={calls} stats={stats}")
+    return False
+
+def test_quotes_keyed_on_canonical_location():
+    """Quotes generated for one spelling are reused for another"""
+    print("📚 Testing quote cache keys")
+    from gemini_service import GeminiQuoteService
+    index = LocationIndex()
+    index.learn("51.51,-0.13", {"location": LONDON})
+    gemini_calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        gemini_calls.append(1)
+        text = '{"quote": "Snow was general all over Ireland.", "author": "James Joyce", "work": "The Dead"}'
+        return httpx.Response(200, json={"candidates": [{"content": {"parts": [{"text": text}]}}]})
+
+    async def run():
+        service = GeminiQuoteService("test_key", HTTPClientPool(transport=httpx.MockTransport(handler)),
+                                     locations=index)
+        first = await service.get_weather_quote(
+            "London", {"condition_text": "Blowing snow", "location_id": canonical_id(LONDON)})
+        second = await service.get_weather_quote("51.51,-0.13", {"condition_text": "Blowing snow"})
+        return first, second
+
+    first, second = asyncio.run(run())
+    if first is second and len(gemini_calls) == 1:
+        print("   ✅ One Gemini call for two spellings")
+        return True
+    print(f"   ❌ gemini_calls={len(gemini_calls)}")
+    return False
+
+def test_alias_index_persists():
+    """The alias index is reloaded from the persistent store"""
+    print("💾 Testing alias persistence")
+    path = os.path.join(tempfile.mkdtemp(), "cache.sqlite3")
+    index = LocationIndex()
+    store = PersistentStore(path)
+    index.attach_store(store)
+    canonical = index.learn("London, UK", {"location": LONDON})
+    store.flush()  # Writes are committed in the background
+
+    restarted = LocationIndex()
+    loaded = restarted.attach_store(PersistentStore(path))
+    if loaded == 2 and restarted.resolve("london, uk") == canonical:
+        print("   ✅ Aliases restored")
+        return True
+    print(f"   ❌ loaded={loaded}")
+    return False
+
+def main():
+    """Run all location index tests"""
+    print("🚀 Location Index Test Suite")
+    print("=" * 50)
+
+    tests = [
+        test_aliases_resolve_to_canonical,
+        test_weather_cache_shared_across_spellings,
+        test_quotes_keyed_on_canonical_location,
+        test_alias_index_persists,
+    ]
+    passed = sum(1 for test in tests if test())
+
+    print("=" * 50)
+    print(f"📊 Results: {passed}/{len(tests)} tests passed")
+    sys.exit(0 if passed == len(tests) else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Test that locations WeatherAPI cannot resolve are answered from the negative cache
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import httpx
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from fastapi import HTTPException
+from weather_cache import NegativeCache
+from http_clients import HTTPClientPool
+
+NO_MATCH = {"error": {"code": 1006, "message": "No matching location found."}}
+
+def weatherapi_stub(calls):
+    """Local WeatherAPI stub that only knows London"""
+    def handler(request: httpx.Request) -> httpx.Response:
+        q = request.url.params.get("q")
+        calls.append(q)
+        if q == "bulk":
+            bulk = []
+            for item in json.loads(request.content)["locations"]:
+                query = {"custom_id": item["custom_id"], "q": item["q"]}
+                if item["q"] == "London":
+                    query.update({"location": {"name": "London"}, "current": {"temp_c": 9}})
+                else:
+                    query.update(NO_MATCH)
+                bulk.append({"query": query})
+            return httpx.Response(200, json={"bulk": bulk})
+        if q != "London":
+            return httpx.Response(400, json=NO_MATCH)
+        return httpx.Response(200, json={"location": {"name": "London"}, "current": {"temp_c": 9}})
+    return httpx.MockTransport(handler)
+
+def test_expiry():
+    """Entries are forgotten after the TTL"""
+    print("⏰ Testing negative cache TTL")
+    cache = NegativeCache(ttl=0.05)
+    cache.put("lodnon", "No matching location found.")
+    remembered = cache.get("lodnon")
+    time.sleep(0.06)
+    forgotten = cache.get("lodnon")
+    if remembered and forgotten is None and cache.get_stats()["hits"] == 1:
+        print("   ✅ Remembered, then expired")
+        return True
+    print(f"   ❌ remembered={remembered} forgotten={forgotten}")
+    return False
+
+def test_unknown_location_answered_from_memory():
+    """Retrying a misspelled location costs one upstream call, then fast 400s"""
+    print("🚫 Testing repeated unknown location")
+    from main import WeatherAPIService
+
+    async def run():
+        calls = []
+        service = WeatherAPIService("test_key", HTTPClientPool(transport=weatherapi_stub(calls)))
+        statuses = []
+        for request in (service.get_current_weather, service.get_forecast, service.get_current_weather):
+            try:
+                await request("Lodnon")
+            except HTTPException as e:
+                statuses.append((e.status_code, e.detail))
+        return calls, statuses, service.get_stats()["negative_cache"]
+
+    calls, statuses, stats = asyncio.run(run())
+    if (calls == ["Lodnon"] and statuses == [(400, "No matching location found.")] * 3
+            and stats["hits"] == 2 and stats["entries"] == 1):
+        print(f"   ✅ 1 upstream call for 3 requests, stats: {stats}")
+        return True
+    print(f"   ❌ calls={calls} statuses={statuses} stats={stats}")
+    return False
+
+def test_bulk_remembers_unknown_locations():
+    """Unknown locations in a bulk response are not sent upstream again"""
+    print("📦 Testing bulk negative results")
+    from main import WeatherAPIService
+
+    async def run():
+        calls = []
+        service = WeatherAPIService("test_key", HTTPClientPool(transport=weatherapi_stub(calls)))
+        await service.get_current_weather_bulk(["London", "Lodnon", "Pariss"])
+        service.cache.invalidate()
+        second = await service.get_current_weather_bulk(["London", "Lodnon", "Pariss"])
+        return calls, second
+
+    calls, second = asyncio.run(run())
+    if calls == ["bulk", "London"] and second["Pariss"]["error"]["code"] == 1006 and "current" in second["London"]:
+        print("   ✅ Second round only re-fetched the valid location")
+        return True
+    print(f"   ❌ calls={calls}")
+    return False
+
+def main():
+    """Run all negative cache tests"""
+    print("🚀 Negative Cache Test Suite")
+    print("=" * 50)
+
+    tests = [
+        test_expiry,
+        test_unknown_location_answered_from_memory,
+        test_bulk_remembers_unknown_locations,
+    ]
+    passed = sum(1 for test in tests if test())
+
+    print("=" * 50)
+    print(f"📊 Results: {passed}/{len(tests)} tests passed")
+    sys.exit(0 if passed == len(tests) else 1)
+
+if __name__ == "__main__":
+    main()
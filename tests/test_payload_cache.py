@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Test that transformed payloads are cached per upstream version and rebuilt
+when the location's quote changes
+"""
+
+import os
+import sys
+import asyncio
+import httpx
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from datetime import timedelta
+from data_transformer import WeatherDataTransformer
+from gemini_service import GeminiQuoteService
+from http_clients import HTTPClientPool
+
+LONDON = {"name": "London", "region": "City of London, Greater London", "country": "United Kingdom",
+          "tz_id": "Europe/London"}
+
+def forecast(version, temp_c=4):
+    return {
+        "location": LONDON,
+        "current": {"temp_c": temp_c, "condition": {"text": "Freezing fog"}, "last_updated_epoch": version},
+        "forecast": {"forecastday": [{"day": {"maxtemp_c": 6}, "astro": {"sunrise": "07:40 AM"}, "hour": []}]}
+    }
+
+def gemini_stub(calls):
+    """Gemini stub returning a different quote on every call"""
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(1)
+        text = f'{{"quote": "Fog, number {len(calls)}.", "author": "Charles Dickens", "work": "Bleak House"}}'
+        return httpx.Response(200, json={"candidates": [{"content": {"parts": [{"text": text}]}}]})
+    return httpx.MockTransport(handler)
+
+def make_transformer(calls):
+    gemini = GeminiQuoteService("test_key", HTTPClientPool(transport=gemini_stub(calls)))
+    return WeatherDataTransformer(gemini), gemini
+
+def test_built_once_per_version():
+    """Repeated transforms of one upstream version reuse the payload; a new version rebuilds it"""
+    print("🧱 Testing payload reuse per upstream version")
+    calls = []
+    transformer, _ = make_transformer(calls)
+
+    async def run():
+        first = await transformer.transform_forecast(forecast(1_700_000_000))
+        again = await transformer.transform_forecast(forecast(1_700_000_000))
+        current = await transformer.transform_current_weather(forecast(1_700_000_000))
+        newer = await transformer.transform_forecast(forecast(1_700_000_900, temp_c=7))
+        return first, again, current, newer
+
+    first, again, current, newer = asyncio.run(run())
+    stats = transformer.payloads.get_stats()
+    if (again is first and current is not first and newer["temp_c"] == 7 and len(calls) == 1
+            and stats["hits"] == 1 and stats["entries"] == 2):
+        print(f"   ✅ Built 3 times for 4 transforms, 1 Gemini call, stats: {stats}")
+        return True
+    print(f"   ❌ calls={len(calls)} stats={stats}")
+    return False
+
+def test_quote_refresh_invalidates():
+    """Refreshing a location's quote rebuilds its payload with the new quote"""
+    print("📚 Testing invalidation on quote refresh")
+    calls = []
+    transformer, gemini = make_transformer(calls)
+
+    async def run():
+        before = await transformer.transform_forecast(forecast(1_700_000_000))
+        for key in gemini.last_update:
+            gemini.last_update[key] -= gemini.update_interval + timedelta(minutes=1)
+        await gemini.refresh_quotes()
+        after = await transformer.transform_forecast(forecast(1_700_000_000))
+        return before, after
+
+    before, after = asyncio.run(run())
+    stats = transformer.payloads.get_stats()
+    if ("number 1" in before["weather_quote"]["quote"] and "number 2" in after["weather_quote"]["quote"]
+            and stats["invalidations"] >= 1):
+        print(f"   ✅ New quote picked up, stats: {stats}")
+        return True
+    print(f"   ❌ before={before.get('weather_quote')} after={after.get('weather_quote')} stats={stats}")
+    return False
+
+def test_unversioned_data_not_cached():
+    """Responses without last_updated_epoch are transformed every time"""
+    print("🚫 Testing unversioned responses")
+    transformer = WeatherDataTransformer()
+    data = forecast(None)
+
+    async def run():
+        return await transformer.transform_forecast(data), await transformer.transform_forecast(data)
+
+    first, second = asyncio.run(run())
+    if first is not second and first == second and transformer.payloads.get_stats()["entries"] == 0:
+        print("   ✅ Rebuilt, nothing cached")
+        return True
+    print(f"   ❌ stats={transformer.payloads.get_stats()}")
+    return False
+
+def test_stale_input_is_marked():
+    """Data served stale while WeatherAPI is down yields a payload marked stale, without touching the cached one"""
+    print("⚠️  Testing stale markers")
+    calls = []
+    transformer, _ = make_transformer(calls)
+
+    async def run():
+        fresh = await transformer.transform_forecast(forecast(1_700_000_000))
+        stale = await transformer.transform_forecast({**forecast(1_700_000_000), "stale": True, "stale_age_seconds": 1200})
+        again = await transformer.transform_current_weather({**forecast(1_700_000_000), "stale": True, "stale_age_seconds": 5})
+        fresh_again = await transformer.transform_forecast(forecast(1_700_000_000))
+        return fresh, stale, again, fresh_again
+
+    fresh, stale, again, fresh_again = asyncio.run(run())
+    if ("stale" not in fresh and stale["stale"] is True and stale["stale_age_seconds"] == 1200
+            and stale["temp_c"] == fresh["temp_c"] and again["stale_age_seconds"] == 5
+            and fresh_again is fresh and "stale" not in fresh_again and len(calls) == 1):
+        print("   ✅ Stale payloads carry stale_age_seconds, the cached fresh payload is unchanged")
+        return True
+    print(f"   ❌ fresh={fresh.get('stale')} stale={stale.get('stale')} again={again.get('stale_age_seconds')}")
+    return False
+
+def test_payload_without_quote_not_cached():
+    """A payload built while Gemini was unavailable is rebuilt, with its quote, once Gemini is back"""
+    print("🚫 Testing quote-less payloads")
+    calls = []
+    transformer, gemini = make_transformer(calls)
+
+    async def run():
+        healthy = gemini.breaker.allow_request
+        gemini.breaker.allow_request = lambda: False
+        try:
+            without = await transformer.transform_forecast(forecast(1_700_000_000))
+        finally:
+            gemini.breaker.allow_request = healthy
+        with_quote = await transformer.transform_forecast(forecast(1_700_000_000))
+        again = await transformer.transform_forecast(forecast(1_700_000_000))
+        return without, with_quote, again
+
+    without, with_quote, again = asyncio.run(run())
+    if "weather_quote" not in without and "weather_quote" in with_quote and again is with_quote and len(calls) == 1:
+        print("   ✅ Quote-less payload not cached, rebuilt with the quote, then reused")
+        return True
+    print(f"   ❌ without={'weather_quote' in without} with={'weather_quote' in with_quote} calls={len(calls)}")
+    return False
+
+def main():
+    """Run all payload cache tests"""
+    print("🚀 Payload Cache Test Suite")
+    print("=" * 50)
+
+    tests = [
+        test_built_once_per_version,
+        test_quote_refresh_invalidates,
+        test_stale_input_is_marked,
+        test_payload_without_quote_not_cached,
+        test_unversioned_data_not_cached,
+    ]
+    passed = sum(1 for test in tests if test())
+
+    print("=" * 50)
+    print(f"📊 Results: {passed}/{len(tests)} tests passed")
+    sys.exit(0 if passed == len(tests) else 1)
+
+if __name__ == "__main__":
+    main()
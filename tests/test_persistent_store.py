@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Test the persistent SQLite cache store and cache reloads after a restart
+"""
+
+import os
+import sys
+import time
+import asyncio
+import sqlite3
+import tempfile
+import httpx
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from persistent_store import PersistentStore
+from weather_cache import WeatherCache
+from swr_cache import StaleWhileRevalidateCache
+from http_clients import HTTPClientPool
+
+def temp_store_path():
+    return os.path.join(tempfile.mkdtemp(), "cache.sqlite3")
+
+def test_roundtrip_and_wal():
+    """Rows round-trip with tuple keys, and the database runs in WAL mode"""
+    print("💾 Testing store round-trip")
+    store = PersistentStore(temp_store_path())
+    key = ("forecast", "london", 1, True, False, False)
+    store.put("weather", key, {"current": {"temp_c": 11}}, 100.0, time.time() + 60)
+    rows = store.load("weather")
+    mode = store._db.execute("PRAGMA journal_mode").fetchone()[0]
+    if rows and rows[0][0] == key and rows[0][1]["current"]["temp_c"] == 11 and mode == "wal":
+        print("   ✅ Tuple key and JSON value restored, journal_mode=wal")
+        return True
+    print(f"   ❌ rows={rows} mode={mode}")
+    return False
+
+def test_retention_and_compaction():
+    """Rows expired longer than the retention window are not loaded and get compacted"""
+    print("🧹 Testing retention and compaction")
+    store = PersistentStore(temp_store_path(), retention=100)
+    now = time.time()
+    store.put("weather", "fresh", 1, now, now + 60)
+    store.put("weather", "recently_expired", 2, now - 120, now - 50)
+    store.put("weather", "ancient", 3, now - 1000, now - 500)
+    loaded = sorted(key for key, *_ in store.load("weather"))
+    deleted = store.compact()
+    if loaded == ["fresh", "recently_expired"] and deleted == 1:
+        print("   ✅ Ancient row skipped and compacted, recently expired kept for stale serving")
+        return True
+    print(f"   ❌ loaded={loaded} deleted={deleted}")
+    return False
+
+def test_writes_do_not_wait_for_locks():
+    """A write while another worker holds the database lock returns at once and is committed later"""
+    print("🔒 Testing background writes")
+    path = temp_store_path()
+    store = PersistentStore(path)
+    other_worker = sqlite3.connect(path, isolation_level=None)
+    other_worker.execute("BEGIN IMMEDIATE")  # Hold the write lock
+
+    start = time.monotonic()
+    store.put("weather", "london", {"temp_c": 11}, time.time(), time.time() + 60)
+    blocked = time.monotonic() - start
+    pending = not store.flush(timeout=0.2)
+    read_while_locked = store.get("weather", "london")
+    other_worker.execute("COMMIT")
+    committed = store.flush()
+    row = store.get("weather", "london")
+    if blocked < 0.05 and pending and read_while_locked is None and committed and row and row[0] == {"temp_c": 11}:
+        print(f"   ✅ put returned in {blocked * 1000:.1f}ms, committed once the lock was released")
+        return True
+    print(f"   ❌ blocked={blocked} pending={pending} committed={committed} row={row}")
+    return False
+
+def test_caches_reload_after_restart():
+    """Weather responses and TRMNL views written through are reloaded by new instances"""
+    print("🔁 Testing cache reload")
+    path = temp_store_path()
+    key = ("current", "london", None, False, False, False)
+    data = {"current": {"temp_c": 11, "last_updated_epoch": time.time()}}
+
+    store = PersistentStore(path)
+    cache = WeatherCache()
+    cache.attach_store(store)
+    cache.put(key, data)
+    views = StaleWhileRevalidateCache(soft_ttl=60, hard_ttl=600)
+    views.attach_store(store, "trmnl_view")
+
+    async def build():
+        return {"temp_c": 11}
+
+    asyncio.run(views.get(("trmnl_view", "London"), build))
+    store.close()
+
+    store = PersistentStore(path)
+    restored_cache = WeatherCache()
+    restored_views = StaleWhileRevalidateCache(soft_ttl=60, hard_ttl=600)
+    loaded = restored_cache.attach_store(store), restored_views.attach_store(store, "trmnl_view")
+
+    async def fail():
+        raise AssertionError("view should have been restored")
+
+    view, _ = asyncio.run(restored_views.get(("trmnl_view", "London"), fail))
+    if loaded == (1, 1) and restored_cache.get(key) == data and view == {"temp_c": 11}:
+        print("   ✅ Weather response and TRMNL view restored")
+        return True
+    print(f"   ❌ loaded={loaded}")
+    return False
+
+def test_quotes_reload_after_restart():
+    """Generated Gemini quotes are restored into a new GeminiQuoteService"""
+    print("📚 Testing quote reload")
+    from gemini_service import GeminiQuoteService
+    path = temp_store_path()
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        text = '{"quote": "It was a dark and stormy night.", "author": "Bulwer-Lytton", "work": "Paul Clifford"}'
+        return httpx.Response(200, json={"candidates": [{"content": {"parts": [{"text": text}]}}]})
+
+    async def run():
+        service = GeminiQuoteService("test_key", HTTPClientPool(transport=httpx.MockTransport(handler)))
+        store = PersistentStore(path)
+        service.attach_store(store)
+        await service.get_weather_quote("London", {"condition_text": "Blowing snow"})
+        store.flush()  # Writes are committed in the background
+
+        restarted = GeminiQuoteService("test_key", HTTPClientPool(transport=httpx.MockTransport(handler)))
+        loaded = restarted.attach_store(PersistentStore(path))
+        quote = await restarted.get_weather_quote("London", {"condition_text": "Blowing snow"})
+        return loaded, quote, restarted.quota.stats["calls"]
+
+    loaded, quote, calls = asyncio.run(run())
+    if loaded == 1 and quote and quote.author == "Bulwer-Lytton" and calls == 0:
+        print("   ✅ Quote restored without calling Gemini")
+        return True
+    print(f"   ❌ loaded={loaded} quote={quote} calls={calls}")
+    return False
+
+def main():
+    """Run all persistent store tests"""
+    print("🚀 Persistent Store Test Suite")
+    print("=" * 50)
+
+    tests = [
+        test_roundtrip_and_wal,
+        test_retention_and_compaction,
+        test_writes_do_not_wait_for_locks,
+        test_caches_reload_after_restart,
+        test_quotes_reload_after_restart,
+    ]
+    passed = sum(1 for test in tests if test())
+
+    print("=" * 50)
+    print(f"📊 Results: {passed}/{len(tests)} tests passed")
+    sys.exit(0 if passed == len(tests) else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Test upstream quota budgeting: window limits, token bucket, background pacing
+"""
+
+import os
+import sys
+import time
+import asyncio
+import httpx
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from quota import UpstreamQuota, QuotaExceededError, background
+from http_clients import HTTPClientPool
+
+def refused(quota, urgent=None):
+    try:
+        asyncio.run(quota.acquire(urgent))
+    except QuotaExceededError:
+        return True
+    return False
+
+def test_window_limit_and_projection():
+    """Calls past a window limit are refused; stats project exhaustion"""
+    print("🪙 Testing window limits")
+    quota = UpstreamQuota("test", per_day=5)
+    quota.record_call(5)
+    stats = quota.get_stats()["windows"]["day"]
+    if refused(quota) and stats["remaining"] == 0 and stats["exhausts_before_reset"]:
+        print(f"   ✅ Refused after 5 calls, day window: {stats}")
+        return True
+    print(f"   ❌ stats={stats}")
+    return False
+
+def test_token_bucket_smooths_bursts():
+    """An empty per-minute bucket refuses urgent calls that would wait too long"""
+    print("🪣 Testing token bucket")
+    quota = UpstreamQuota("test", per_minute=60, max_urgent_wait=0.1)
+    quota.record_call(10)  # Bucket holds 10 seconds' worth at 1 call/second
+    if refused(quota, urgent=True) and quota.stats["rejected"] == 1:
+        print("   ✅ Burst beyond bucket capacity refused")
+        return True
+    print(f"   ❌ stats={quota.stats}")
+    return False
+
+def test_background_reserve():
+    """Background work cannot use the share reserved for user-facing calls"""
+    print("🛡️  Testing background reserve")
+    quota = UpstreamQuota("test", per_day=10, background_reserve=0.5)
+    quota.record_call(5)
+
+    async def background_acquire():
+        with background():
+            await quota.acquire()
+
+    try:
+        asyncio.run(background_acquire())
+        background_refused = False
+    except QuotaExceededError:
+        background_refused = True
+    if background_refused and not refused(quota):
+        print("   ✅ Background refused at 50%, user-facing call allowed")
+        return True
+    print("   ❌ Reserve not enforced")
+    return False
+
+def test_background_calls_are_paced():
+    """Background calls are spaced evenly over what is left of the window"""
+    print("⏱️  Testing background pacing")
+    quota = UpstreamQuota("test", per_day=1000, background_reserve=0.2)
+    now = time.time()
+    quota._window("day", now)["end"] = now + 10  # 10s left for 800 background calls
+    quota._last_background_call = now
+
+    start = time.monotonic()
+    asyncio.run(quota.acquire(urgent=False))
+    waited = time.monotonic() - start
+    if 0.005 <= waited < 0.5 and quota.stats["background_paced"] == 1:
+        print(f"   ✅ Waited {waited * 1000:.1f}ms before the background call")
+        return True
+    print(f"   ❌ waited={waited} stats={quota.stats}")
+    return False
+
+def test_concurrent_background_calls_are_spaced():
+    """Background callers waiting at the same time each get their own slot"""
+    print("🚦 Testing pacing of concurrent background calls")
+    quota = UpstreamQuota("test", per_day=100, background_reserve=0.2)
+    now = time.time()
+    quota._window("day", now)["end"] = now + 4  # 4s left for 80 background calls: one every 50ms
+
+    async def run():
+        start = time.monotonic()
+
+        async def call():
+            await quota.acquire(urgent=False)
+            return time.monotonic() - start
+
+        return await asyncio.gather(*(call() for _ in range(5)))
+
+    started = sorted(asyncio.run(run()))
+    gaps = [b - a for a, b in zip(started, started[1:])]
+    if started[0] < 0.02 and min(gaps) >= 0.04 and quota.stats["background_paced"] == 4:
+        print(f"   ✅ Started at {[round(at, 3) for at in started]}s")
+        return True
+    print(f"   ❌ started={started} stats={quota.stats}")
+    return False
+
+def test_weather_service_serves_stale_when_exhausted():
+    """WeatherAPIService serves last good data, or 429, once its quota is used up"""
+    print("🌤️  Testing WeatherAPIService quota handling")
+    from fastapi import HTTPException
+    from main import WeatherAPIService
+
+    async def run():
+        def handler(request: httpx.Request) -> httpx.Response:
+            return httpx.Response(200, json={"location": {"name": "London"}, "current": {"temp_c": 11}})
+
+        service = WeatherAPIService("test_key", HTTPClientPool(transport=httpx.MockTransport(handler)),
+                                    quota=UpstreamQuota("weatherapi", per_day=1))
+        await service.get_current_weather("London")
+        service.cache.invalidate()
+        stale = await service.get_current_weather("London")
+        try:
+            await service.get_current_weather("Paris")
+            status = None
+        except HTTPException as e:
+            status = e.status_code
+        return stale, status, service.quota.stats
+
+    stale, status, stats = asyncio.run(run())
+    if stale.get("stale") and status == 429 and stats["calls"] == 1:
+        print(f"   ✅ Stale data served, unknown location got 429, stats: {stats}")
+        return True
+    print(f"   ❌ stale={stale} status={status} stats={stats}")
+    return False
+
+def test_paced_rejection_reported_separately():
+    """A background call refused for pacing is not reported as an exhausted quota"""
+    print("🚦 Testing pacing rejections")
+    from fastapi import HTTPException
+    from main import WeatherAPIService
+
+    async def run():
+        def handler(request: httpx.Request) -> httpx.Response:
+            return httpx.Response(200, json={"location": {"name": "London"}, "current": {"temp_c": 11}})
+
+        # 8 background calls left in an hour: one every 450s, far beyond the 1s allowed wait
+        quota = UpstreamQuota("weatherapi", per_day=10, max_background_wait=1.0)
+        now = time.time()
+        quota._window("day", now)["end"] = now + 3600
+        quota._last_background_call = now
+        service = WeatherAPIService("test_key", HTTPClientPool(transport=httpx.MockTransport(handler)), quota=quota)
+        try:
+            with background():
+                await service.get_current_weather("Paris")
+            error = None
+        except HTTPException as e:
+            error = e
+        return error, quota.stats
+
+    error, stats = asyncio.run(run())
+    if (error is not None and error.status_code == 503 and "paced" in error.detail
+            and int(error.headers["Retry-After"]) > 400 and stats["paced_rejections"] == 1 and stats["calls"] == 0):
+        print(f"   ✅ {error.status_code} {error.detail!r}, stats: {stats}")
+        return True
+    print(f"   ❌ error={error} stats={stats}")
+    return False
+
+def main():
+    """Run all quota tests"""
+    print("🚀 Upstream Quota Test Suite")
+    print("=" * 50)
+
+    tests = [
+        test_window_limit_and_projection,
+        test_token_bucket_smooths_bursts,
+        test_background_reserve,
+        test_background_calls_are_paced,
+        test_concurrent_background_calls_are_spaced,
+        test_weather_service_serves_stale_when_exhausted,
+        test_paced_rejection_reported_separately,
+    ]
+    passed = sum(1 for test in tests if test())
+
+    print("=" * 50)
+    print(f"📊 Results: {passed}/{len(tests)} tests passed")
+    sys.exit(0 if passed == len(tests) else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Test the shared upstream retry policy against a local stub transport
+"""
+
+import os
+import sys
+import time
+import asyncio
+import httpx
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from http_clients import HTTPClientPool
+from retry_policy import RetryPolicy, RetryBudget, parse_retry_after
+
+def scripted_stub(outcomes, calls):
+    """Local stub that replays a list of outcomes: status codes, (status, headers) or exceptions"""
+    async def handler(request: httpx.Request) -> httpx.Response:
+        outcome = outcomes[min(len(calls), len(outcomes) - 1)]
+        calls.append(request.method)
+        if isinstance(outcome, Exception):
+            raise outcome
+        if isinstance(outcome, tuple):
+            return httpx.Response(outcome[0], headers=outcome[1], json={})
+        return httpx.Response(outcome, json={})
+    return httpx.MockTransport(handler)
+
+def run_policy(outcomes, method="GET", idempotent=True, policy=None):
+    calls = []
+    pool = HTTPClientPool(transport=scripted_stub(outcomes, calls))
+    policy = policy or RetryPolicy("test", max_retries=3, base_delay=0.001, max_delay=0.05)
+
+    async def run():
+        try:
+            response = await policy.call(lambda: pool.request(method, "http://upstream.test/x"), idempotent=idempotent)
+            return response.status_code
+        except Exception as e:
+            return type(e).__name__
+
+    return asyncio.run(run()), calls, policy
+
+def test_retries_transient_5xx():
+    """A GET that hits 503 then 200 succeeds after one retry"""
+    print("🔁 Testing retry on transient 5xx")
+    result, calls, policy = run_policy([503, 200])
+    if result == 200 and len(calls) == 2 and policy.stats["retried_calls_succeeded"] == 1:
+        print(f"   ✅ Succeeded after retry, stats: {policy.get_stats()}")
+        return True
+    print(f"   ❌ result={result} calls={len(calls)}")
+    return False
+
+def test_gives_up_after_max_retries():
+    """Persistent 502s are retried MAX_RETRIES times and the last response returned"""
+    print("🛑 Testing max retries")
+    result, calls, policy = run_policy([502])
+    if result == 502 and len(calls) == 4 and policy.stats["gave_up"] == 1:
+        print("   ✅ Gave up after 3 retries")
+        return True
+    print(f"   ❌ result={result} calls={len(calls)}")
+    return False
+
+def test_client_errors_not_retried():
+    """4xx responses such as bad locations are returned immediately"""
+    print("🚫 Testing 4xx is not retried")
+    result, calls, _ = run_policy([400, 200])
+    if result == 400 and len(calls) == 1:
+        print("   ✅ 400 returned without retry")
+        return True
+    print(f"   ❌ result={result} calls={len(calls)}")
+    return False
+
+def test_non_idempotent_only_retries_unsent():
+    """POSTs retry connect errors but not read timeouts or 500s"""
+    print("📮 Testing non-idempotent retry rules")
+    connect, connect_calls, _ = run_policy([httpx.ConnectError("refused"), 200], "POST", idempotent=False)
+    timeout, timeout_calls, _ = run_policy([httpx.ReadTimeout("slow"), 200], "POST", idempotent=False)
+    server, server_calls, _ = run_policy([500, 200], "POST", idempotent=False)
+    if (connect == 200 and len(connect_calls) == 2 and timeout == "ReadTimeout"
+            and len(timeout_calls) == 1 and server == 500 and len(server_calls) == 1):
+        print("   ✅ Only unsent POSTs were retried")
+        return True
+    print(f"   ❌ connect={connect} timeout={timeout} server={server}")
+    return False
+
+def test_honours_retry_after():
+    """A 429 with Retry-After waits at least that long before retrying"""
+    print("⏳ Testing Retry-After")
+    start = time.monotonic()
+    result, calls, _ = run_policy([(429, {"Retry-After": "0.2"}), 200],
+                                  policy=RetryPolicy("test", base_delay=0.001, max_delay=1.0))
+    elapsed = time.monotonic() - start
+    too_long, long_calls, _ = run_policy([(429, {"Retry-After": "120"}), 200],
+                                         policy=RetryPolicy("test", base_delay=0.001, max_delay=1.0))
+    if result == 200 and elapsed >= 0.2 and too_long == 429 and len(long_calls) == 1:
+        print(f"   ✅ Waited {elapsed:.2f}s, and refused a 120s Retry-After")
+        return True
+    print(f"   ❌ result={result} elapsed={elapsed:.2f} too_long={too_long}")
+    return False
+
+def test_budget_stops_retry_storm():
+    """An empty process-wide budget refuses retries across policies"""
+    print("🪣 Testing retry budget")
+    budget = RetryBudget(ratio=0.0, min_per_second=0.0, max_tokens=2)
+    first = RetryPolicy("a", base_delay=0.001, budget=budget)
+    second = RetryPolicy("b", base_delay=0.001, budget=budget)
+    _, first_calls, _ = run_policy([503], policy=first)
+    _, second_calls, _ = run_policy([503], policy=second)
+    if len(first_calls) == 3 and len(second_calls) == 1 and budget.denied == 2:
+        print(f"   ✅ Budget shared and exhausted: {budget.get_stats()}")
+        return True
+    print(f"   ❌ first={len(first_calls)} second={len(second_calls)} budget={budget.get_stats()}")
+    return False
+
+def test_parse_retry_after():
+    """Retry-After accepts seconds and HTTP dates"""
+    print("📅 Testing Retry-After parsing")
+    seconds = parse_retry_after("5")
+    past = parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT")
+    if seconds == 5.0 and past == 0.0 and parse_retry_after("soon") is None:
+        print("   ✅ Parsed seconds and dates")
+        return True
+    print(f"   ❌ seconds={seconds} past={past}")
+    return False
+
+def main():
+    """Run all retry policy tests"""
+    print("🚀 Retry Policy Test Suite")
+    print("=" * 50)
+
+    tests = [
+        test_retries_transient_5xx,
+        test_gives_up_after_max_retries,
+        test_client_errors_not_retried,
+        test_non_idempotent_only_retries_unsent,
+        test_honours_retry_after,
+        test_budget_stops_retry_storm,
+        test_parse_retry_after,
+    ]
+    passed = sum(1 for test in tests if test())
+
+    print("=" * 50)
+    print(f"📊 Results: {passed}/{len(tests)} tests passed")
+    sys.exit(0 if passed == len(tests) else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+"""
+Test the multi-job heap scheduler and job file loading
+"""
+
+import os
+import sys
+import json
+import random
+import asyncio
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from scheduler import JobScheduler, ScheduledJob, parse_jobs, load_jobs
+
+class FakeClock:
+    """Monotonic clock driven by the test, with a wall clock that can be stepped separately"""
+    def __init__(self, epoch=1_700_000_123.0):
+        self.now = 0.0
+        self.epoch = epoch
+
+    def __call__(self):
+        return self.now
+
+    def wall(self):
+        return self.epoch + self.now
+
+def test_parse_jobs():
+    """Jobs load from a file; bad entries are rejected with a clear error"""
+    print("📋 Testing job file parsing")
+    path = os.path.join(tempfile.mkdtemp(), "jobs.json")
+    with open(path, "w") as f:
+        json.dump({"jobs": [
+            {"id": "kitchen", "location": "London", "webhook_url": "https://trmnl.test/a", "interval_minutes": 15},
+            {"location": "Paris", "webhook_url": "https://trmnl.test/b", "view": "current"},
+        ]}, f)
+    jobs = load_jobs(path)
+    errors = []
+    for bad in ([{"location": "London"}],
+                [{"location": "London", "webhook_url": "u", "view": "hourly"}],
+                [{"id": "a", "location": "x", "webhook_url": "u"}, {"id": "a", "location": "y", "webhook_url": "v"}],
+                ["London"],
+                [{"location": "London", "webhook_url": "u", "interval_minutes": None}],
+                [{"location": None, "webhook_url": "u"}]):
+        try:
+            parse_jobs(bad)
+        except ValueError as e:
+            errors.append(str(e))
+    if ([(job.job_id, job.view, job.interval) for job in jobs] == [("kitchen", "forecast", 900), ("job-2", "current", 1800)]
+            and len(errors) == 6):
+        print(f"   ✅ 2 jobs loaded, 6 bad configs rejected ({errors[0]}; {errors[3]}; {errors[4]})")
+        return True
+    print(f"   ❌ jobs={jobs} errors={errors}")
+    return False
+
+def test_jobs_run_on_their_own_intervals():
+    """Each job runs at its own interval from one heap"""
+    print("⏰ Testing per-job intervals")
+    clock = FakeClock()
+    ran = []
+
+    async def run_job(job):
+        ran.append((clock.now, job.job_id))
+        return True
+
+    async def run():
+        scheduler = JobScheduler(run_job, clock=clock, align=False, stagger=False)
+        for job_id, interval in (("a", 10), ("b", 25), ("c", 60)):
+            scheduler.add(ScheduledJob(job_id, job_id, "https://trmnl.test/" + job_id, interval=interval))
+        while clock.now <= 60:
+            await asyncio.gather(*scheduler.start_due())
+            clock.now += 5
+        return scheduler
+
+    scheduler = asyncio.run(run())
+    counts = {job_id: sum(1 for _, ran_id in ran if ran_id == job_id) for job_id in "abc"}
+    b_times = [at for at, job_id in ran if job_id == "b"]
+    if counts == {"a": 7, "b": 3, "c": 2} and b_times == [0, 25, 50] and scheduler.stats["runs"] == 12:
+        print(f"   ✅ Runs per job over 60s: {counts}")
+        return True
+    print(f"   ❌ counts={counts} b_times={b_times}")
+    return False
+
+def test_remove_and_readd():
+    """Removed jobs stop running; re-adding a job replaces its old heap entry"""
+    print("🔁 Testing remove and re-add")
+    clock = FakeClock()
+    ran = []
+
+    async def run_job(job):
+        ran.append(job.job_id)
+        return True
+
+    async def run():
+        scheduler = JobScheduler(run_job, clock=clock, align=False, stagger=False)
+        scheduler.add(ScheduledJob("a", "London", "https://trmnl.test/a", interval=10))
+        scheduler.add(ScheduledJob("b", "Paris", "https://trmnl.test/b", interval=10))
+        scheduler.remove("b")
+        scheduler.add(ScheduledJob("a", "London", "https://trmnl.test/a", interval=10), first_run=5)
+        first = scheduler.start_due()
+        clock.now = 5
+        second = scheduler.start_due()
+        await asyncio.gather(*first, *second)
+        return scheduler, scheduler.next_delay()
+
+    scheduler, delay = asyncio.run(run())
+    if ran == ["a"] and delay == 10 and scheduler.get_stats()["job_count"] == 1:
+        print("   ✅ Only the re-added job ran, once")
+        return True
+    print(f"   ❌ ran={ran} delay={delay}")
+    return False
+
+def test_aligned_deadlines_do_not_drift():
+    """Runs land on wall-clock boundaries plus the offset, however long each run takes"""
+    print("🎯 Testing wall-clock aligned deadlines")
+    clock = FakeClock()
+    started = []
+
+    async def run_job(job):
+        started.append(clock.wall())
+        clock.now += 7  # Fetch, quote and push time must not push later runs back
+        return True
+
+    async def run():
+        scheduler = JobScheduler(run_job, clock=clock, wall_clock=clock.wall, offset=60, stagger=False)
+        scheduler.add(ScheduledJob("a", "London", "https://trmnl.test/a", interval=900))
+        for i in range(8):
+            if i == 4:
+                clock.epoch -= 30  # NTP steps the wall clock back
+            clock.now += scheduler.next_delay()
+            await asyncio.gather(*scheduler.start_due())
+        return scheduler.get_stats()
+
+    stats = asyncio.run(run())
+    # The deadline already pending when the clock stepped moves with it; the ones after are re-anchored
+    phases = [round(at % 900, 6) for at in started]
+    gaps = {round(b - a) for a, b in zip(started[5:], started[6:])}
+    if phases == [60.0] * 4 + [30.0] + [60.0] * 3 and gaps == {900} and stats["missed_deadlines"] == 0 and stats["lateness"]["max_seconds"] == 0:
+        print("   ✅ 8 runs a minute past 15 minute boundaries, back on them right after a clock step")
+        return True
+    print(f"   ❌ phases={phases} gaps={gaps} stats={stats}")
+    return False
+
+def test_missed_deadlines_and_lateness():
+    """A suspended host skips the deadlines it slept through and records how late it ran"""
+    print("💤 Testing missed deadlines")
+    clock = FakeClock()
+
+    async def run_job(job):
+        return True
+
+    async def run():
+        scheduler = JobScheduler(run_job, clock=clock, wall_clock=clock.wall, stagger=False)
+        scheduler.add(ScheduledJob("a", "London", "https://trmnl.test/a", interval=900))
+        clock.now += scheduler.next_delay() + 0.05
+        await asyncio.gather(*scheduler.start_due())
+        clock.now += scheduler.next_delay() + 2.5 * 900
+        await asyncio.gather(*scheduler.start_due())
+        return scheduler, scheduler.get_stats()
+
+    scheduler, stats = asyncio.run(run())
+    buckets = stats["lateness"]["buckets"]
+    next_wall = clock.wall() + scheduler.next_delay()
+    if (stats["missed_deadlines"] == 2 and buckets["<=0.1s"] == 1 and buckets[">60s"] == 1
+            and round(next_wall % 900, 6) == 0 and stats["runs"] == 2):
+        print(f"   ✅ Missed {stats['missed_deadlines']} deadlines, lateness: {buckets}")
+        return True
+    print(f"   ❌ stats={stats}")
+    return False
+
+def test_stagger_and_jitter():
+    """Jobs sharing an interval get stable phases spread across it; jitter never moves deadlines"""
+    print("🌊 Testing staggered phases and jitter")
+    clock = FakeClock(epoch=1_700_000_100.0)
+    jobs = [ScheduledJob(f"device-{i}", "London", f"https://trmnl.test/{i}", interval=900) for i in range(200)]
+    started = {}
+
+    async def run_job(job):
+        started.setdefault(job.job_id, []).append(clock.wall())
+        return True
+
+    async def run():
+        scheduler = JobScheduler(run_job, clock=clock, wall_clock=clock.wall, jitter=5, rng=random.Random(7))
+        for job in jobs:
+            scheduler.add(job)
+        while clock.now < 1800:
+            clock.now += scheduler.next_delay()
+            await asyncio.gather(*scheduler.start_due())
+        return scheduler
+
+    scheduler = asyncio.run(run())
+    phases = [JobScheduler.phase(job) for job in jobs]
+    per_slot = [sum(1 for phase in phases if slot * 90 <= phase < (slot + 1) * 90) for slot in range(10)]
+    # Every run starts within the jitter bound after its own phase, on every cycle
+    offsets = [(at - job.phase) % 900 for job in jobs for at in started[job.job_id]]
+    stable = phases == [JobScheduler.phase(ScheduledJob(job.job_id, "x", "u", interval=900)) for job in jobs]
+    if (stable and min(per_slot) >= 8 and max(per_slot) <= 32 and max(offsets) <= 5
+            and len(set(round(offset, 3) for offset in offsets)) > 100 and scheduler.stats["missed_deadlines"] == 0):
+        print(f"   ✅ Jobs per 90s slot: {per_slot}, all runs within 5s after their phase")
+        return True
+    print(f"   ❌ per_slot={per_slot} max_offset={max(offsets):.2f} stats={scheduler.stats}")
+    return False
+
+def test_immediate_first_run():
+    """With immediate_first_run every job runs at once, then on its regular deadlines at least half an interval later"""
+    print("⚡ Testing the immediate first run")
+    results = {}
+    for align in (True, False):
+        clock = FakeClock()
+        jobs = [ScheduledJob(f"device-{i}", "London", f"https://trmnl.test/{i}", interval=900) for i in range(20)]
+        started = {}
+
+        async def run_job(job):
+            started.setdefault(job.job_id, []).append(clock.now)
+            return True
+
+        async def run():
+            scheduler = JobScheduler(run_job, clock=clock, wall_clock=clock.wall, align=align,
+                                     immediate_first_run=True)
+            for job in jobs:
+                scheduler.add(job)
+            while clock.now < 3600:
+                clock.now += scheduler.next_delay()
+                await asyncio.gather(*scheduler.start_due())
+            return scheduler
+
+        scheduler = asyncio.run(run())
+        firsts = [started[job.job_id][0] for job in jobs]
+        seconds = [started[job.job_id][1] - started[job.job_id][0] for job in jobs]
+        # From the second run on, each job is on its own phase (of the wall clock when aligned)
+        origin = clock.epoch if align else 0.0
+        offsets = [(at + origin - job.phase) % 900 for job in jobs for at in started[job.job_id][1:]]
+        on_phase = all(min(offset, 900 - offset) < 1e-6 for offset in offsets)
+        results[align] = (max(firsts) == 0 and 450 <= min(seconds) and max(seconds) < 1350 and on_phase
+                          and scheduler.stats["missed_deadlines"] == 0)
+    if all(results.values()):
+        print("   ✅ All jobs ran at startup, then joined their staggered deadlines (aligned and not)")
+        return True
+    print(f"   ❌ results={results}")
+    return False
+
+def test_prefetch_batches_upcoming_jobs():
+    """Jobs due within the prefetch window are handed over as one batch before any of them runs"""
+    print("📦 Testing prefetch batches")
+    clock = FakeClock()
+    jobs = [ScheduledJob(f"device-{i}", "London", f"https://trmnl.test/{i}", interval=900) for i in range(30)]
+    batches, runs = [], []
+
+    async def prefetch(batch):
+        batches.append((clock.now, {job.job_id for job in batch}))
+
+    async def run_job(job):
+        runs.append((clock.now, job.job_id))
+        return True
+
+    async def run():
+        scheduler = JobScheduler(run_job, clock=clock, wall_clock=clock.wall, prefetch=prefetch, prefetch_window=300)
+        for job in jobs:
+            scheduler.add(job)
+        while clock.now < 1800:
+            clock.now += scheduler.next_delay()
+            await asyncio.gather(*scheduler.start_due())
+        return scheduler
+
+    scheduler = asyncio.run(run())
+    # Every run was covered by a batch taken at most one window before it
+    covered = [any(at - 300 <= taken <= at and job_id in ids for taken, ids in batches) for at, job_id in runs]
+    stats = scheduler.stats
+    if (all(covered) and len(batches) <= len(runs) // 5 and stats["prefetch_batches"] == len(batches)
+            and stats["prefetched_jobs"] >= len(runs)):
+        print(f"   ✅ {len(runs)} runs covered by {len(batches)} prefetch batches")
+        return True
+    print(f"   ❌ uncovered={covered.count(False)} runs={len(runs)} batches={len(batches)} stats={stats}")
+    return False
+
+def test_run_forever_skips_overlaps_and_counts_failures():
+    """The scheduler task runs jobs in real time, skipping runs that would overlap"""
+    print("🏃 Testing the scheduler task")
+
+    async def run_job(job):
+        if job.job_id == "slow":
+            await asyncio.sleep(0.12)
+        return job.job_id != "failing"
+
+    async def run():
+        scheduler = JobScheduler(run_job)
+        for job_id in ("fast", "slow", "failing"):
+            scheduler.add(ScheduledJob(job_id, job_id, "https://trmnl.test/" + job_id, interval=0.05))
+        task = asyncio.create_task(scheduler.run_forever())
+        await asyncio.sleep(0.33)
+        task.cancel()
+        return scheduler.get_stats()
+
+    stats = asyncio.run(run())
+    runs = {job["id"]: job["runs"] for job in stats["jobs"]}
+    if runs["fast"] >= 5 and runs["slow"] <= 3 and stats["skipped_overlaps"] >= 2 and stats["failures"] == runs["failing"]:
+        print(f"   ✅ Runs: {runs}, skipped overlaps: {stats['skipped_overlaps']}, failures: {stats['failures']}")
+        return True
+    print(f"   ❌ stats={stats}")
+    return False
+
+def test_default_job_fallback():
+    """Without a readable, valid jobs file the service schedules the default job"""
+    print("🏠 Testing the default job")
+    import main
+    from config import settings
+    original = settings.SCHEDULE_JOBS_FILE
+    try:
+        settings.SCHEDULE_JOBS_FILE = ""
+        default = main.load_scheduled_jobs()
+        settings.SCHEDULE_JOBS_FILE = os.path.join(tempfile.mkdtemp(), "missing.json")
+        fallback = main.load_scheduled_jobs()
+        malformed = []
+        for config in (["London"], [{"location": "London", "webhook_url": "u", "interval_minutes": None}]):
+            settings.SCHEDULE_JOBS_FILE = os.path.join(tempfile.mkdtemp(), "jobs.json")
+            with open(settings.SCHEDULE_JOBS_FILE, "w") as f:
+                json.dump(config, f)
+            malformed.append(main.load_scheduled_jobs())
+    finally:
+        settings.SCHEDULE_JOBS_FILE = original
+    if (len(default) == 1 and default[0].location == settings.DEFAULT_LOCATION
+            and default[0].interval == settings.UPDATE_INTERVAL_MINUTES * 60 and fallback == default
+            and malformed == [default, default]):
+        print(f"   ✅ Default job: {default[0]}")
+        return True
+    print(f"   ❌ default={default} fallback={fallback}")
+    return False
+
+def main():
+    """Run all scheduler tests"""
+    print("🚀 Scheduler Test Suite")
+    print("=" * 50)
+
+    tests = [
+        test_parse_jobs,
+        test_jobs_run_on_their_own_intervals,
+        test_remove_and_readd,
+        test_aligned_deadlines_do_not_drift,
+        test_missed_deadlines_and_lateness,
+        test_stagger_and_jitter,
+        test_immediate_first_run,
+        test_prefetch_batches_upcoming_jobs,
+        test_run_forever_skips_overlaps_and_counts_failures,
+        test_default_job_fallback,
+    ]
+    passed = sum(1 for test in tests if test())
+
+    print("=" * 50)
+    print(f"📊 Results: {passed}/{len(tests)} tests passed")
+    sys.exit(0 if passed == len(tests) else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Test cache sharing between workers through the SQLite and Redis cache stores
+"""
+
+import os
+import sys
+import time
+import socket
+import asyncio
+import tempfile
+import httpx
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from persistent_store import PersistentStore
+from redis_store import RedisStore, RESPClient
+from swr_cache import StaleWhileRevalidateCache
+from http_clients import HTTPClientPool
+from fetch_profiles import get_profile
+from tests.resp_server import RESPServer
+
+def upstream_stub(calls):
+    """WeatherAPI and Gemini stubs that count every request"""
+    def handler(request: httpx.Request) -> httpx.Response:
+        if "generativelanguage" in request.url.host:
+            calls["gemini"] += 1
+            text = '{"quote": "Snow was general all over Ireland.", "author": "James Joyce", "work": "The Dead"}'
+            return httpx.Response(200, json={"candidates": [{"content": {"parts": [{"text": text}]}}]})
+        calls["weatherapi"] += 1
+        return httpx.Response(200, json={
+            "location": {"name": "London", "region": "City of London, Greater London", "country": "United Kingdom"},
+            "current": {"temp_c": 1, "condition": {"text": "Blowing snow"}, "last_updated_epoch": int(time.time()) - 60},
+            "forecast": {"forecastday": [{"day": {"maxtemp_c": 3}, "astro": {}, "hour": []}]}
+        })
+    return httpx.MockTransport(handler)
+
+def build_worker(calls, store):
+    """One worker process's services, attached to the shared store"""
+    from main import WeatherAPIService
+    from gemini_service import GeminiQuoteService
+    from location_index import LocationIndex
+    pool = HTTPClientPool(transport=upstream_stub(calls))
+    locations = LocationIndex()
+    locations.attach_store(store)
+    weather = WeatherAPIService("test_key", pool, locations=locations)
+    weather.cache.attach_store(store)
+    gemini = GeminiQuoteService("test_key", pool, locations=locations)
+    gemini.attach_store(store)
+    views = StaleWhileRevalidateCache()
+    views.attach_store(store, "trmnl_view")
+    return weather, gemini, views
+
+async def serve(worker, location):
+    weather, gemini, views = worker
+    data = await weather.fetch(location, get_profile("trmnl_view"))
+    await gemini.get_weather_quote(location, {"condition_text": "Blowing snow", "temp_c": 1})
+
+    async def build():
+        return {"location": data["location"]["name"], "built_by": id(worker)}
+
+    view, _ = await views.get(("trmnl_view", weather.locations.resolve(location)), build)
+    return view
+
+def run_workers(make_store):
+    """Three workers started together; the first request goes to worker 0, the rest to the others"""
+    async def run():
+        calls = {"weatherapi": 0, "gemini": 0}
+        stores = [make_store() for _ in range(3)]
+        workers = [build_worker(calls, store) for store in stores]
+        views = [await serve(workers[0], "London, UK")]
+        stores[0].flush()  # Redis writes are sent in the background
+        for worker, store in zip(workers[1:], stores[1:]):
+            views.append(await serve(worker, "London, UK"))
+            views.append(await serve(worker, "london, uk"))
+            store.flush()
+        return calls, views, workers
+    return asyncio.run(run())
+
+def check_sharing(label, make_store):
+    calls, views, workers = run_workers(make_store)
+    weather_shared = sum(worker[0].cache.get_stats()["shared_hits"] for worker in workers)
+    if (calls == {"weatherapi": 1, "gemini": 1} and all(view == views[0] for view in views)
+            and weather_shared == 2):
+        print(f"   ✅ {label}: 1 WeatherAPI call and 1 Gemini call for 3 workers, one shared TRMNL view")
+        return True
+    print(f"   ❌ {label}: calls={calls} weather_shared={weather_shared}")
+    return False
+
+def test_sqlite_store_shared_between_workers():
+    """Workers opening the same SQLite file answer from each other's responses"""
+    print("💾 Testing SQLite shared cache")
+    path = os.path.join(tempfile.mkdtemp(), "cache.sqlite3")
+    return check_sharing("SQLite", lambda: PersistentStore(path))
+
+def test_redis_store_shared_between_workers():
+    """Workers using the same Redis-protocol server answer from each other's responses"""
+    print("🧪 Testing Redis shared cache against a local stand-in")
+    server = RESPServer().start()
+    try:
+        return check_sharing("Redis", lambda: RedisStore(server.url))
+    finally:
+        server.shutdown()
+        server.server_close()
+
+def test_local_eviction_keeps_shared_rows():
+    """A worker evicting from its own small cache leaves the shared rows for the other workers"""
+    print("🧹 Testing local eviction with a shared store")
+    from weather_cache import WeatherCache
+    from location_index import LocationIndex
+    path = os.path.join(tempfile.mkdtemp(), "cache.sqlite3")
+    small, other = WeatherCache(max_bytes=300), WeatherCache()
+    small.attach_store(PersistentStore(path))
+    other.attach_store(PersistentStore(path))
+    now = int(time.time())
+    for i in range(5):
+        for _ in range(i + 1):
+            small.get(("forecast", f"city-{i}"))  # Newer cities are more popular, so TinyLFU admits them
+        small.put(("forecast", f"city-{i}"), {"current": {"temp_c": i, "last_updated_epoch": now}, "pad": "x" * 80})
+    aliases, other_aliases = LocationIndex(max_aliases=1), LocationIndex()
+    aliases.attach_store(PersistentStore(path))
+    other_aliases.attach_store(PersistentStore(path))
+    aliases._add("london, uk", "london|city of london, greater london|united kingdom")
+    aliases._add("paris", "paris|ile-de-france|france")
+    shared = [other.get(("forecast", f"city-{i}")) is not None for i in range(5)]
+    if (small.get_stats()["evictions"] >= 3 and all(shared) and len(aliases._aliases) == 1
+            and other_aliases._read_through("london, uk") is not None):
+        print(f"   ✅ {small.get_stats()['evictions']} local evictions, all 5 rows still shared")
+        return True
+    print(f"   ❌ shared={shared} stats={small.get_stats()}")
+    return False
+
+def test_redis_store_rows():
+    """Rows round-trip with their timestamps, load by namespace and expire after retention"""
+    print("🔁 Testing RedisStore rows")
+    server = RESPServer().start()
+    try:
+        store = RedisStore(server.url, retention=0.05)
+        now = time.time()
+        store.put("weather", ("forecast", "london", 1), {"temp_c": 4}, now, now + 0.05)
+        store.put("quotes", "london_Fog", {"quote": "q"}, now, now + 60)
+        store.flush()
+        row = store.get("weather", ("forecast", "london", 1))
+        loaded = store.load("weather")
+        time.sleep(0.15)
+        expired = store.get("weather", ("forecast", "london", 1))
+        store.delete("quotes", "london_Fog")
+        store.flush()
+        deleted = store.get("quotes", "london_Fog")
+    finally:
+        server.shutdown()
+        server.server_close()
+    if (row == ({"temp_c": 4}, now, now + 0.05) and loaded == [(("forecast", "london", 1), {"temp_c": 4}, now, now + 0.05)]
+            and expired is None and deleted is None):
+        print(f"   ✅ Stats: {store.get_stats()}")
+        return True
+    print(f"   ❌ row={row} loaded={loaded} expired={expired} deleted={deleted}")
+    return False
+
+def test_redis_outage_is_a_miss():
+    """A lost Redis connection is logged and treated as a miss, never raised"""
+    print("⚡ Testing Redis outage")
+    server = RESPServer().start()
+    store = RedisStore(server.url)
+    server.shutdown()
+    server.server_close()
+    store.client.close()
+    store._write_client.close()  # The stand-in keeps serving open connections after shutdown
+    now = time.time()
+    store.put("weather", ("current", "london"), {"temp_c": 4}, now, now + 60)
+    store.flush()
+    row = store.get("weather", ("current", "london"))
+    stats = store.get_stats()
+    if row is None and stats["write_errors"] == 1 and stats["read_errors"] == 1:
+        print("   ✅ Errors counted, nothing raised")
+        return True
+    print(f"   ❌ row={row} stats={stats}")
+    return False
+
+def test_slow_redis_does_not_stall_requests():
+    """Reads from a server that never answers time out quickly, then the breaker skips Redis"""
+    print("🐢 Testing a Redis server that stops answering")
+    server = RESPServer().start()
+    silent = socket.socket()
+    silent.bind(("127.0.0.1", 0))
+    silent.listen(16)  # Accepts connections (backlog) but never replies
+    try:
+        store = RedisStore(server.url, client=RESPClient("127.0.0.1", silent.getsockname()[1], timeout=0.05),
+                           failure_threshold=3)
+        timings = []
+        for _ in range(10):
+            start = time.monotonic()
+            row = store.get("weather", ("current", "london"))
+            timings.append(time.monotonic() - start)
+        start = time.monotonic()
+        now = time.time()
+        for i in range(100):
+            store.put("weather", ("current", f"city-{i}"), {"temp_c": i}, now, now + 60)
+        put_time = time.monotonic() - start
+        store.flush()
+        stats = store.get_stats()
+        store.close()
+    finally:
+        silent.close()
+        server.shutdown()
+        server.server_close()
+    if (row is None and max(timings[:3]) < 0.2 and max(timings[3:]) < 0.005 and stats["skipped_reads"] == 7
+            and stats["read_breaker"]["state"] == "open" and put_time < 0.05 and stats["writes"] == 100):
+        print(f"   ✅ 3 reads timed out after ~{max(timings[:3]) * 1000:.0f}ms, 7 skipped, "
+              f"100 writes queued in {put_time * 1000:.1f}ms")
+        return True
+    print(f"   ❌ timings={timings} put_time={put_time} stats={stats}")
+    return False
+
+def main():
+    """Run all shared cache tests"""
+    print("🚀 Shared Cache Test Suite")
+    print("=" * 50)
+
+    tests = [
+        test_sqlite_store_shared_between_workers,
+        test_redis_store_shared_between_workers,
+        test_local_eviction_keeps_shared_rows,
+        test_redis_store_rows,
+        test_redis_outage_is_a_miss,
+        test_slow_redis_does_not_stall_requests,
+    ]
+    passed = sum(1 for test in tests if test())
+
+    print("=" * 50)
+    print(f"📊 Results: {passed}/{len(tests)} tests passed")
+    sys.exit(0 if passed == len(tests) else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Test single-flight coalescing of concurrent identical WeatherAPI fetches
+"""
+
+import os
+import sys
+import asyncio
+import httpx
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from singleflight import SingleFlight
+from http_clients import HTTPClientPool
+
+def counting_weather_stub(calls, delay=0.05, status=200):
+    """Local WeatherAPI stub that counts upstream requests"""
+    async def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(str(request.url))
+        await asyncio.sleep(delay)
+        if status != 200:
+            return httpx.Response(status, json={"error": {"code": 9999, "message": "Internal application error."}})
+        return httpx.Response(200, json={
+            "location": {"name": request.url.params.get("q")},
+            "current": {"temp_c": 11, "condition": {"text": "Sunny"}}
+        })
+    return httpx.MockTransport(handler)
+
+def test_concurrent_callers_share_one_call():
+    """Concurrent calls with one key run fn once and all get its result"""
+    print("🔀 Testing concurrent callers share one call")
+
+    async def run():
+        flight = SingleFlight()
+        runs = []
+
+        async def fetch():
+            runs.append(1)
+            await asyncio.sleep(0.05)
+            return {"temp_c": 11}
+
+        results = await asyncio.gather(*[flight.do("london", fetch) for _ in range(5)])
+        return runs, results, flight.get_stats()
+
+    runs, results, stats = asyncio.run(run())
+    if len(runs) == 1 and all(r == {"temp_c": 11} for r in results) and stats["coalesced_calls"] == 4:
+        print(f"   ✅ One execution, stats: {stats}")
+        return True
+    print(f"   ❌ runs={len(runs)} stats={stats}")
+    return False
+
+def test_errors_propagate_to_every_caller():
+    """Every waiting caller sees the upstream error, and the next call retries"""
+    print("💥 Testing error propagation")
+
+    async def run():
+        flight = SingleFlight()
+        attempts = []
+
+        async def failing():
+            attempts.append(1)
+            await asyncio.sleep(0.01)
+            raise ValueError("upstream down")
+
+        results = await asyncio.gather(*[flight.do("k", failing) for _ in range(3)], return_exceptions=True)
+        await asyncio.gather(flight.do("k", failing), return_exceptions=True)
+        return attempts, results
+
+    attempts, results = asyncio.run(run())
+    if all(isinstance(r, ValueError) for r in results) and len(attempts) == 2:
+        print("   ✅ All callers got ValueError and the next call ran fresh")
+        return True
+    print(f"   ❌ attempts={len(attempts)} results={results}")
+    return False
+
+def test_cancelled_caller_does_not_cancel_others():
+    """Cancelling the first caller leaves the shared call running for the rest"""
+    print("🛑 Testing caller cancellation")
+
+    async def run():
+        flight = SingleFlight()
+
+        async def fetch():
+            await asyncio.sleep(0.05)
+            return "ok"
+
+        first = asyncio.ensure_future(flight.do("k", fetch))
+        second = asyncio.ensure_future(flight.do("k", fetch))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        return await second
+
+    if asyncio.run(run()) == "ok":
+        print("   ✅ Remaining caller got the result")
+        return True
+    print("   ❌ Remaining caller did not get the result")
+    return False
+
+def test_weather_service_coalesces_normalized_locations():
+    """WeatherAPIService coalesces fetches whose locations differ only in case/whitespace"""
+    print("🌤️  Testing WeatherAPIService coalescing")
+    from main import WeatherAPIService
+
+    async def run():
+        calls = []
+        service = WeatherAPIService("test_key", HTTPClientPool(transport=counting_weather_stub(calls)))
+        await asyncio.gather(
+            service.get_forecast("London", days=1, include_air_quality=True),
+            service.get_forecast("london ", days=1, include_air_quality=True),
+            service.get_forecast(" LONDON", days=1, include_air_quality=True),
+            service.get_forecast("London", days=3, include_air_quality=True),
+        )
+        return calls, service.get_stats()["coalescing"]
+
+    calls, stats = asyncio.run(run())
+    if len(calls) == 2 and stats["coalesced_calls"] == 2:
+        print(f"   ✅ 2 upstream calls for 4 requests, stats: {stats}")
+        return True
+    print(f"   ❌ calls={len(calls)} stats={stats}")
+    return False
+
+def main():
+    """Run all single-flight tests"""
+    print("🚀 Single-Flight Coalescing Test Suite")
+    print("=" * 50)
+
+    tests = [
+        test_concurrent_callers_share_one_call,
+        test_errors_propagate_to_every_caller,
+        test_cancelled_caller_does_not_cancel_others,
+        test_weather_service_coalesces_normalized_locations,
+    ]
+    passed = sum(1 for test in tests if test())
+
+    print("=" * 50)
+    print(f"📊 Results: {passed}/{len(tests)} tests passed")
+    sys.exit(0 if passed == len(tests) else 1)
+
+if __name__ == "__main__":
+    main()
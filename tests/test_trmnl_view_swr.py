@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Test stale-while-revalidate serving of the TRMNL view
+"""
+
+import os
+import sys
+import asyncio
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from swr_cache import StaleWhileRevalidateCache
+
+def counting_loader(results, delay=0.0):
+    """Loader returning 1, 2, 3... (or raising when the next result is an exception)"""
+    calls = []
+
+    async def load():
+        calls.append(1)
+        await asyncio.sleep(delay)
+        result = results[len(calls) - 1]
+        if isinstance(result, Exception):
+            raise result
+        return result
+    return load, calls
+
+def age(cache, key, seconds):
+    value, produced_at = cache._values[key]
+    cache._values[key] = (value, produced_at - seconds)
+
+def test_stale_served_with_single_refresh():
+    """Past the soft TTL, every caller gets the old value at once and one refresh runs"""
+    print("🔄 Testing soft TTL")
+
+    async def run():
+        cache = StaleWhileRevalidateCache(soft_ttl=10, hard_ttl=100)
+        load, calls = counting_loader(["v1", "v2"], delay=0.05)
+        await cache.get("view", load)
+        age(cache, "view", 20)
+        served = await asyncio.gather(*[cache.get("view", load) for _ in range(10)])
+        await asyncio.sleep(0.1)
+        after, after_age = await cache.get("view", load)
+        return served, after, after_age, len(calls), cache.stats
+
+    served, after, after_age, calls, stats = asyncio.run(run())
+    ok = (
+        all(value == "v1" and age_s >= 20 for value, age_s in served)
+        and after == "v2" and after_age < 1
+        and calls == 2 and stats["background_refreshes"] == 1
+    )
+    if ok:
+        print(f"   ✅ 10 stale answers, 1 background refresh, stats: {stats}")
+        return True
+    print(f"   ❌ served={served[:2]} after={after} calls={calls} stats={stats}")
+    return False
+
+def test_hard_ttl_blocks():
+    """Past the hard TTL, the caller waits for a fresh value"""
+    print("🧱 Testing hard TTL")
+
+    async def run():
+        cache = StaleWhileRevalidateCache(soft_ttl=10, hard_ttl=100)
+        load, calls = counting_loader(["v1", "v2"])
+        await cache.get("view", load)
+        age(cache, "view", 200)
+        return await cache.get("view", load), cache.stats
+
+    (value, value_age), stats = asyncio.run(run())
+    if value == "v2" and value_age < 1 and stats["blocking_loads"] == 2:
+        print("   ✅ Fresh value loaded inline")
+        return True
+    print(f"   ❌ value={value} stats={stats}")
+    return False
+
+def test_failed_refresh_keeps_value():
+    """A failing background refresh keeps serving the previous value"""
+    print("🛟 Testing failed refresh")
+
+    async def run():
+        cache = StaleWhileRevalidateCache(soft_ttl=10, hard_ttl=100)
+        load, _ = counting_loader(["v1", RuntimeError("upstream down")])
+        await cache.get("view", load)
+        age(cache, "view", 20)
+        await cache.get("view", load)
+        await asyncio.sleep(0.01)
+        return await cache.get("view", load), cache.stats
+
+    (value, _), stats = asyncio.run(run())
+    if value == "v1" and stats["refresh_failures"] == 1:
+        print("   ✅ Previous value still served")
+        return True
+    print(f"   ❌ value={value} stats={stats}")
+    return False
+
+def test_endpoint_reports_data_age():
+    """GET /weather/trmnl-view answers from memory and reports the data age"""
+    print("📱 Testing GET /weather/trmnl-view")
+    import main
+    from fastapi import BackgroundTasks
+
+    async def run():
+        builds = []
+
+        async def fake_build(location):
+            builds.append(location)
+            return {"location": location, "temperature": 11}
+
+        original = main.build_trmnl_view
+        main.build_trmnl_view = fake_build
+        main.trmnl_view_cache.invalidate()
+        try:
+            first = await main.get_weather_trmnl_view_default(BackgroundTasks())
+            second = await main.get_weather_trmnl_view_default(BackgroundTasks())
+        finally:
+            main.build_trmnl_view = original
+        return first, second, builds
+
+    first, second, builds = asyncio.run(run())
+    if len(builds) == 1 and second.data == first.data and second.data_age_seconds == 0:
+        print("   ✅ One build for two requests, data_age_seconds reported")
+        return True
+    print(f"   ❌ builds={builds} second={second}")
+    return False
+
+def test_age_follows_weather_data():
+    """A payload built now from weather fetched 20 minutes ago (e.g. served stale) reports 20 minutes"""
+    print("🕰️  Testing data age from the weather entry")
+    import time
+    import main
+    from fastapi import BackgroundTasks
+    from fetch_profiles import get_profile
+
+    async def run():
+        async def fake_build(location):
+            return {"location": location, "temperature": 11, "stale": True}
+
+        location = main.settings.DEFAULT_LOCATION
+        profile = get_profile("trmnl_view")
+        key = profile.key(main.location_index.resolve(main.weather_service.geo_grid.quantize(location)))
+        main.weather_service.cache.put(key, {"location": {"name": location}}, fetched_at=time.time() - 1200)
+        original = main.build_trmnl_view
+        main.build_trmnl_view = fake_build
+        main.trmnl_view_cache.invalidate()
+        try:
+            return await main.get_weather_trmnl_view_default(BackgroundTasks())
+        finally:
+            main.build_trmnl_view = original
+            main.weather_service.cache.clear()
+            main.trmnl_view_cache.invalidate()
+
+    response = asyncio.run(run())
+    if 1200 <= response.data_age_seconds < 1210:
+        print(f"   ✅ data_age_seconds={response.data_age_seconds} for a payload built just now")
+        return True
+    print(f"   ❌ response={response}")
+    return False
+
+def main():
+    """Run all TRMNL view stale-while-revalidate tests"""
+    print("🚀 TRMNL View Stale-While-Revalidate Test Suite")
+    print("=" * 50)
+
+    tests = [
+        test_stale_served_with_single_refresh,
+        test_hard_ttl_blocks,
+        test_failed_refresh_keeps_value,
+        test_endpoint_reports_data_age,
+        test_age_follows_weather_data,
+    ]
+    passed = sum(1 for test in tests if test())
+
+    print("=" * 50)
+    print(f"📊 Results: {passed}/{len(tests)} tests passed")
+    sys.exit(0 if passed == len(tests) else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Test the upstream-cadence-aware WeatherAPI response cache
+"""
+
+import os
+import sys
+import time
+import asyncio
+import httpx
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from weather_cache import WeatherCache
+from http_clients import HTTPClientPool
+
+def test_expiry_follows_upstream_cadence():
+    """Entries expire at last_updated_epoch + interval + grace, never sooner than min_ttl"""
+    print("⏰ Testing cadence-aware expiry")
+    cache = WeatherCache(update_interval=900, grace=60, min_ttl=30)
+    now = 1_700_000_000
+    recent = cache.expires_at({"current": {"last_updated_epoch": now - 300}}, now)
+    overdue = cache.expires_at({"current": {"last_updated_epoch": now - 2000}}, now)
+    missing = cache.expires_at({"location": {}}, now)
+    if recent == now + 660 and overdue == now + 30 and missing == now + 30:
+        print("   ✅ 660s left for a 5 minute old update, min TTL when overdue or unknown")
+        return True
+    print(f"   ❌ recent={recent - now} overdue={overdue - now} missing={missing - now}")
+    return False
+
+def test_eviction_and_stats():
+    """Least recently used entries are evicted past max_bytes; hits, misses and sizes are counted"""
+    print("📊 Testing eviction and stats")
+    fresh = {"current": {"last_updated_epoch": time.time()}}
+    size = WeatherCache.entry_size(fresh)
+    cache = WeatherCache(max_bytes=2 * size)
+    for requests, name in enumerate(("a", "b", "c"), start=1):
+        # Each newcomer is requested more often than the entry it displaces
+        for _ in range(requests):
+            cache.get((name,))
+        cache.put((name,), fresh)
+    hit = cache.get(("c",))
+    evicted = cache.get_entry(("a",))
+    stats = cache.get_stats()
+    if (hit is fresh and evicted is None and stats["evictions"] == 1 and stats["hits"] == 1
+            and stats["size_bytes"] == 2 * size and stats["entries"] == 2):
+        print(f"   ✅ Stats: {stats}")
+        return True
+    print(f"   ❌ stats={stats}")
+    return False
+
+def test_admission_protects_hot_entries():
+    """A scan of one-off locations cannot flush frequently requested ones"""
+    print("🛡️  Testing TinyLFU admission")
+    fresh = {"current": {"last_updated_epoch": time.time()}}
+    cache = WeatherCache(max_bytes=10 * WeatherCache.entry_size(fresh))
+    hot = [("hot", i) for i in range(5)]
+    for _ in range(5):
+        for key in hot:
+            if cache.get(key) is None:
+                cache.put(key, fresh)
+    for i in range(200):
+        key = ("one-off", i)
+        if cache.get(key) is None:
+            cache.put(key, fresh)
+    hot_hits = sum(1 for key in hot if cache.get(key) is not None)
+    stats = cache.get_stats()
+    if hot_hits == len(hot) and stats["rejections"] > 0 and stats["size_bytes"] <= stats["max_bytes"]:
+        print(f"   ✅ All {hot_hits} hot entries survived 200 one-offs, stats: {stats}")
+        return True
+    print(f"   ❌ hot_hits={hot_hits} stats={stats}")
+    return False
+
+def test_fresh_items_by_location():
+    """Entries are listed per (endpoint, location) from the index, which follows puts, evictions and clear"""
+    print("🗂️  Testing per-location lookups")
+    fresh = {"current": {"last_updated_epoch": time.time()}}
+    size = WeatherCache.entry_size(fresh)
+    cache = WeatherCache(max_bytes=4 * size)
+    keys = [("forecast", "london", 1, True, False, False), ("forecast", "paris", 1, True, False, False),
+            ("forecast", "london", 3, False, True, False), ("current", "london", None, False, False, False)]
+    for key in keys:
+        cache.put(key, fresh)
+    listed = sorted(key for key, _ in cache.fresh_items(("forecast", "london")))
+    for _ in range(3):
+        cache.get(("forecast", "berlin", 1, True, False, False))
+    cache.put(("forecast", "berlin", 1, True, False, False), fresh)  # Evicts the oldest London forecast
+    after_eviction = [key for key, _ in cache.fresh_items(("forecast", "london"))]
+    cache.clear()
+    after_clear = list(cache.fresh_items(("forecast", "paris")))
+    if listed == sorted([keys[0], keys[2]]) and after_eviction == [keys[2]] and after_clear == []:
+        print("   ✅ 2 London forecasts listed, 1 after an eviction, none after clear")
+        return True
+    print(f"   ❌ listed={listed} after_eviction={after_eviction} after_clear={after_clear}")
+    return False
+
+def test_service_answers_from_cache():
+    """Repeated requests within the upstream update window cost one upstream call"""
+    print("🌤️  Testing WeatherAPIService caching")
+    from main import WeatherAPIService
+
+    async def run():
+        calls = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            calls.append(request.url.params.get("q"))
+            return httpx.Response(200, json={
+                "location": {"name": "London"},
+                "current": {"temp_c": 11, "last_updated_epoch": int(time.time()) - 60}
+            })
+
+        service = WeatherAPIService("test_key", HTTPClientPool(transport=httpx.MockTransport(handler)))
+        for location in ("London", "london ", "LONDON"):
+            await service.get_current_weather(location)
+        await service.get_current_weather("London", include_air_quality=True)
+        return calls, service.get_stats()["cache"]
+
+    calls, stats = asyncio.run(run())
+    if calls == ["London", "London"] and stats["hits"] == 2:
+        print(f"   ✅ 2 upstream calls for 4 requests (aqi is part of the key), stats: {stats}")
+        return True
+    print(f"   ❌ calls={calls} stats={stats}")
+    return False
+
+def main():
+    """Run all weather cache tests"""
+    print("🚀 Weather Cache Test Suite")
+    print("=" * 50)
+
+    tests = [
+        test_expiry_follows_upstream_cadence,
+        test_eviction_and_stats,
+        test_admission_protects_hot_entries,
+        test_fresh_items_by_location,
+        test_service_answers_from_cache,
+    ]
+    passed = sum(1 for test in tests if test())
+
+    print("=" * 50)
+    print(f"📊 Results: {passed}/{len(tests)} tests passed")
+    sys.exit(0 if passed == len(tests) else 1)
+
+if __name__ == "__main__":
+    main()
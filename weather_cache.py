@@ -0,0 +1,276 @@
+"""
+WeatherAPI response cache whose entries expire when WeatherAPI is next
+expected to publish new data, rather than after a fixed TTL
+"""
+
+import json
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Any, Optional, Iterator, Set, Tuple
+
+from persistent_store import PersistentStore
+from frequency_sketch import FrequencySketch
+
+
+@dataclass
+class CacheEntry:
+    """A cached upstream response"""
+    data: Dict[str, Any]
+    fetched_at: float
+    expires_at: float
+    size: int = 0
+
+    def is_fresh(self, now: float) -> bool:
+        return now < self.expires_at
+
+
+class WeatherCache:
+    """Response cache keyed by request key (normalized location plus options).
+
+    WeatherAPI refreshes `current` about every `update_interval` seconds and
+    reports when it last did in `current.last_updated_epoch`. An entry stays
+    fresh until that time plus one interval (and `grace` for publishing
+    delays). If the upstream is already overdue when we fetch, the entry is
+    rechecked after `min_ttl`. Responses without a timestamp get `min_ttl`.
+
+    Expired entries are kept so they can still be served as stale data while
+    the upstream is unavailable. Entries are bounded by their serialized size
+    (`max_bytes`), not their number. When a new key does not fit, the least
+    recently used entries that would have to make room are compared with it
+    on recent access frequency (TinyLFU): the newcomer is only admitted if it
+    is requested more often than each of them, so a burst of one-off lookups
+    cannot flush the hot scheduled locations.
+
+    Keys are also indexed by their (endpoint, location) prefix, so the
+    entries for one location can be listed without scanning the cache.
+    """
+
+    def __init__(self, update_interval: float = 900.0, grace: float = 60.0, min_ttl: float = 60.0,
+                 max_bytes: int = 32 * 1024 * 1024):
+        self.update_interval = update_interval
+        self.grace = grace
+        self.min_ttl = min_ttl
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[tuple, CacheEntry]" = OrderedDict()
+        self._by_prefix: Dict[tuple, Set[tuple]] = {}
+        self._bytes = 0
+        self.sketch = FrequencySketch()
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "expired": 0,
+            "evictions": 0,
+            "admissions": 0,
+            "rejections": 0,
+            "shared_hits": 0,
+        }
+        self._hit_age_total = 0.0
+        self._hit_age_max = 0.0
+        self.store: Optional[PersistentStore] = None
+        self.namespace = "weather"
+
+    def attach_store(self, store: PersistentStore, namespace: str = "weather") -> int:
+        """Reload entries from a persistent store and write through to it from now on"""
+        self.store = store
+        self.namespace = namespace
+        rows = store.load(namespace)
+        for key, data, fetched_at, expires_at in rows:
+            self._replace(key, CacheEntry(data, fetched_at, expires_at, self.entry_size(data)))
+        # Rows come back oldest first, so the budget keeps the most recent ones
+        while self._bytes > self.max_bytes:
+            self._evict_oldest()
+        return len(rows)
+
+    def _persist(self, key: tuple, entry: CacheEntry) -> None:
+        if self.store is not None:
+            self.store.put(self.namespace, key, entry.data, entry.fetched_at, entry.expires_at)
+
+    @staticmethod
+    def entry_size(data: Dict[str, Any]) -> int:
+        """Serialized size of a response, the unit of the byte budget"""
+        return len(json.dumps(data, separators=(",", ":"), default=str))
+
+    def _replace(self, key: tuple, entry: CacheEntry) -> None:
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._bytes -= previous.size
+        else:
+            self._by_prefix.setdefault(key[:2], set()).add(key)
+        self._entries[key] = entry
+        self._bytes += entry.size
+
+    def _evict_oldest(self) -> None:
+        # Local only: other workers sharing the store may still rely on the row, which expires on its own
+        key, entry = self._entries.popitem(last=False)
+        self._bytes -= entry.size
+        keys = self._by_prefix[key[:2]]
+        keys.discard(key)
+        if not keys:
+            del self._by_prefix[key[:2]]
+        self.stats["evictions"] += 1
+
+    def _read_through(self, key: tuple, now: float) -> Optional[CacheEntry]:
+        """A fresh entry another worker put in the shared store, installed locally"""
+        row = self.store.get(self.namespace, key)
+        if row is None or now >= row[2]:
+            return None
+        data, fetched_at, expires_at = row
+        entry = CacheEntry(data, fetched_at, expires_at, self.entry_size(data))
+        self._replace(key, entry)
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            self._evict_oldest()
+        self.stats["shared_hits"] += 1
+        return entry
+
+    def _admit(self, key: tuple, size: int) -> bool:
+        """Whether a new key of this size may evict the least recently used entries it needs room from"""
+        if size > self.max_bytes:
+            return False
+        needed = self._bytes + size - self.max_bytes
+        if needed <= 0:
+            return True
+        frequency = self.sketch.estimate(key)
+        for victim_key, victim in self._entries.items():
+            if needed <= 0:
+                break
+            if self.sketch.estimate(victim_key) >= frequency:
+                return False
+            needed -= victim.size
+        return True
+
+    def expires_at(self, data: Dict[str, Any], fetched_at: float) -> float:
+        """When WeatherAPI is next expected to have newer data than this response"""
+        last_updated = data.get("current", {}).get("last_updated_epoch")
+        if not isinstance(last_updated, (int, float)):
+            return fetched_at + self.min_ttl
+        return max(last_updated + self.update_interval + self.grace, fetched_at + self.min_ttl)
+
+    def get(self, key: tuple) -> Optional[Dict[str, Any]]:
+        """Return fresh cached data for a key, or None"""
+        self.sketch.increment(key)
+        entry = self._entries.get(key)
+        now = time.time()
+        if (entry is None or not entry.is_fresh(now)) and self.store is not None:
+            entry = self._read_through(key, now) or entry
+        if entry is None:
+            self.stats["misses"] += 1
+            return None
+        if not entry.is_fresh(now):
+            self.stats["misses"] += 1
+            self.stats["expired"] += 1
+            return None
+        age = now - entry.fetched_at
+        self._entries.move_to_end(key)
+        self.stats["hits"] += 1
+        self._hit_age_total += age
+        self._hit_age_max = max(self._hit_age_max, age)
+        return entry.data
+
+    def get_entry(self, key: tuple) -> Optional[CacheEntry]:
+        """Return the entry for a key whether or not it is fresh (no stats recorded)"""
+        return self._entries.get(key)
+
+    def put(self, key: tuple, data: Dict[str, Any], fetched_at: Optional[float] = None) -> Optional[CacheEntry]:
+        """Store a response; returns None if the admission policy turned a new key away"""
+        fetched_at = time.time() if fetched_at is None else fetched_at
+        entry = CacheEntry(data, fetched_at, self.expires_at(data, fetched_at), self.entry_size(data))
+        # Refreshing a key that is already cached never needs admission
+        if key not in self._entries:
+            if not self._admit(key, entry.size):
+                self.stats["rejections"] += 1
+                return None
+            self.stats["admissions"] += 1
+        self._replace(key, entry)
+        while self._bytes > self.max_bytes:
+            self._evict_oldest()
+        self._persist(key, entry)
+        return entry
+
+    def fresh_items(self, prefix: Optional[tuple] = None) -> Iterator[Tuple[tuple, CacheEntry]]:
+        """Iterate over entries that have not expired yet, optionally only those of one (endpoint, location)"""
+        now = time.time()
+        keys = list(self._by_prefix.get(prefix, ())) if prefix is not None else list(self._entries)
+        for key in keys:
+            entry = self._entries[key]
+            if entry.is_fresh(now):
+                yield key, entry
+
+    def invalidate(self, key: Optional[tuple] = None) -> None:
+        """Expire one entry (or all), keeping the data for stale serving"""
+        for entry_key in ([key] if key is not None else list(self._entries)):
+            entry = self._entries.get(entry_key)
+            if entry is not None:
+                entry.expires_at = 0.0
+                self._persist(entry_key, entry)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._by_prefix.clear()
+        self._bytes = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Hit/miss counts and entry ages"""
+        now = time.time()
+        lookups = self.stats["hits"] + self.stats["misses"]
+        fresh = sum(1 for entry in self._entries.values() if entry.is_fresh(now))
+        ages = [now - entry.fetched_at for entry in self._entries.values()]
+        return {
+            **self.stats,
+            "hit_ratio": round(self.stats["hits"] / lookups, 3) if lookups else 0.0,
+            "entries": len(self._entries),
+            "size_bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "fresh_entries": fresh,
+            "avg_hit_age_seconds": round(self._hit_age_total / self.stats["hits"], 1) if self.stats["hits"] else None,
+            "max_hit_age_seconds": round(self._hit_age_max, 1),
+            "oldest_entry_age_seconds": round(max(ages), 1) if ages else None,
+        }
+
+
+class NegativeCache:
+    """Locations WeatherAPI could not resolve, remembered for `ttl` seconds.
+
+    A misspelled location fails the same way on every request, so answering
+    it from memory saves an upstream call (and quota) each time a client or
+    the scheduler retries it.
+    """
+
+    def __init__(self, ttl: float = 3600.0, max_entries: int = 10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self.stats = {
+            "hits": 0,
+            "stored": 0,
+        }
+
+    def get(self, location_id: str) -> Optional[str]:
+        """Return the upstream error message for a location known to be invalid, or None"""
+        entry = self._entries.get(location_id)
+        if entry is None:
+            return None
+        message, expires_at = entry
+        if time.time() >= expires_at:
+            del self._entries[location_id]
+            return None
+        self.stats["hits"] += 1
+        return message
+
+    def put(self, location_id: str, message: str) -> None:
+        self._entries[location_id] = (message, time.time() + self.ttl)
+        self._entries.move_to_end(location_id)
+        self.stats["stored"] += 1
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Negative hits served (each one an upstream call saved) and current entries"""
+        return {
+            **self.stats,
+            "entries": len(self._entries),
+            "ttl_seconds": self.ttl,
+        }